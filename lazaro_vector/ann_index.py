@@ -0,0 +1,268 @@
+"""
+Snapshot local de embeddings + índice ANN (IVF) en proceso, sin red.
+
+- `exportar_embeddings`: recorre por cursor (id > último id) las filas con embedding de
+  bibliotecalegal (o bibliotecalegal_fragmentos) y las escribe en un directorio:
+    vectores.f32  matriz float32 (filas x dimensión), normalizada a norma 1, para np.memmap
+    ids.json      id de cada fila, en el mismo orden (y nombre_norma / norma_id si existen)
+    meta.json     dimensión, cantidad de filas, tabla de origen
+- `IndiceIVF`: k-means sobre los vectores; cada consulta solo compara contra las listas de los
+  `nprobe` centroides más cercanos. Con vectores normalizados, el producto punto es la similitud
+  coseno, la misma que `1 - (embedding <=> query)` de match_normativas / match_fragmentos.
+
+Uso:
+    python ann_index.py exportar --directorio snapshot_embeddings [--tabla bibliotecalegal_fragmentos]
+    python ann_index.py construir --directorio snapshot_embeddings [--nlist 256]
+    python benchmarks/bench_ann.py --directorio snapshot_embeddings
+"""
+import os
+import json
+import time
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+DIRECTORIO_SNAPSHOT = os.getenv("ANN_DIRECTORIO", os.path.join(os.path.dirname(__file__), "snapshot_embeddings"))
+TAMANO_PAGINA_EXPORTACION = int(os.getenv("ANN_TAMANO_PAGINA", "500"))
+NPROBE = int(os.getenv("ANN_NPROBE", "8"))
+ARCHIVO_VECTORES = "vectores.f32"
+ARCHIVO_IDS = "ids.json"
+ARCHIVO_META = "meta.json"
+ARCHIVO_INDICE = "indice_ivf.npz"
+# Columnas extra que se guardan junto al id para poder mostrar resultados sin consultar Supabase
+COLUMNAS_EXTRA = {"bibliotecalegal": ["nombre_norma"], "bibliotecalegal_fragmentos": ["norma_id", "encabezado"]}
+
+
+def _vector_desde_postgrest(valor) -> Optional[np.ndarray]:
+    # PostgREST devuelve las columnas vector como texto "[0.1,0.2,...]"
+    if valor is None:
+        return None
+    if isinstance(valor, str):
+        valor = json.loads(valor)
+    return np.asarray(valor, dtype=np.float32)
+
+
+def normalizar(vectores: np.ndarray) -> np.ndarray:
+    normas = np.linalg.norm(vectores, axis=-1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return (vectores / normas).astype(np.float32, copy=False)
+
+
+def exportar_embeddings(supabase, directorio: str = DIRECTORIO_SNAPSHOT, tabla: str = "bibliotecalegal",
+                        tamano_pagina: int = TAMANO_PAGINA_EXPORTACION) -> Dict:
+    """Escribe el snapshot de la columna embedding de `tabla` en `directorio` y retorna su meta."""
+    os.makedirs(directorio, exist_ok=True)
+    extras = COLUMNAS_EXTRA.get(tabla, [])
+    columnas = ", ".join(["id", *extras, "embedding"])
+    ids: List = []
+    metadatos: Dict[str, List] = {c: [] for c in extras}
+    dimension = None
+    ruta_tmp = os.path.join(directorio, ARCHIVO_VECTORES + ".tmp")
+    ultimo_id = None
+    with open(ruta_tmp, "wb") as salida:
+        while True:
+            consulta = supabase.table(tabla).select(columnas).not_.is_("embedding", "null")
+            if ultimo_id is not None:
+                consulta = consulta.gt("id", ultimo_id)
+            response = consulta.order("id").limit(tamano_pagina).execute()
+            filas = response.data if hasattr(response, 'data') else response["data"]
+            if not filas:
+                break
+            bloque = []
+            for fila in filas:
+                vector = _vector_desde_postgrest(fila.get("embedding"))
+                if vector is None:
+                    continue
+                if dimension is None:
+                    dimension = vector.shape[0]
+                if vector.shape[0] != dimension:
+                    print(f"[WARN] id={fila['id']} tiene dimensión {vector.shape[0]} (se esperaba {dimension}). Se salta.")
+                    continue
+                bloque.append(vector)
+                ids.append(fila["id"])
+                for c in extras:
+                    metadatos[c].append(fila.get(c))
+            if bloque:
+                salida.write(normalizar(np.vstack(bloque)).tobytes())
+            ultimo_id = filas[-1]["id"]
+            print(f"[EXPORTAR] {len(ids)} vectores exportados...")
+            if len(filas) < tamano_pagina:
+                break
+    os.replace(ruta_tmp, os.path.join(directorio, ARCHIVO_VECTORES))
+    with open(os.path.join(directorio, ARCHIVO_IDS), "w", encoding="utf-8") as f:
+        json.dump({"ids": ids, **metadatos}, f, ensure_ascii=False)
+    meta = {"tabla": tabla, "filas": len(ids), "dimension": dimension or 0, "normalizado": True,
+            "exportado_en": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    with open(os.path.join(directorio, ARCHIVO_META), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta
+
+
+def cargar_snapshot(directorio: str = DIRECTORIO_SNAPSHOT) -> Tuple[np.ndarray, Dict, Dict]:
+    """Retorna (matriz memmap de solo lectura, ids/metadatos, meta)."""
+    with open(os.path.join(directorio, ARCHIVO_META), encoding="utf-8") as f:
+        meta = json.load(f)
+    with open(os.path.join(directorio, ARCHIVO_IDS), encoding="utf-8") as f:
+        ids = json.load(f)
+    if not meta["filas"]:
+        return np.zeros((0, meta["dimension"]), dtype=np.float32), ids, meta
+    matriz = np.memmap(os.path.join(directorio, ARCHIVO_VECTORES), dtype=np.float32, mode="r",
+                       shape=(meta["filas"], meta["dimension"]))
+    return matriz, ids, meta
+
+
+def kmeans(vectores: np.ndarray, k: int, iteraciones: int = 20, muestra: Optional[int] = 50000,
+           semilla: int = 0) -> np.ndarray:
+    """
+    K-means (Lloyd) en NumPy con distancia euclídea. Entrena sobre una muestra de a lo sumo
+    `muestra` filas; los centroides vacíos se reinician con puntos al azar.
+    """
+    rng = np.random.default_rng(semilla)
+    n = vectores.shape[0]
+    if muestra and n > muestra:
+        datos = np.asarray(vectores[np.sort(rng.choice(n, muestra, replace=False))], dtype=np.float32)
+    else:
+        datos = np.asarray(vectores, dtype=np.float32)
+    k = min(k, datos.shape[0])
+    centroides = datos[rng.choice(datos.shape[0], k, replace=False)].copy()
+    normas_datos = (datos ** 2).sum(axis=1)
+    for _ in range(iteraciones):
+        asignacion = asignar(datos, centroides, normas_datos)
+        # Sumas por grupo con reduceat sobre los datos ordenados por asignación (np.add.at es muy lento)
+        orden = np.argsort(asignacion, kind="stable")
+        conteos = np.bincount(asignacion, minlength=k)
+        vacios = conteos == 0
+        inicios = np.concatenate(([0], np.cumsum(conteos)[:-1]))[~vacios]
+        centroides[~vacios] = np.add.reduceat(datos[orden], inicios, axis=0) / conteos[~vacios, None]
+        if vacios.any():
+            centroides[vacios] = datos[rng.choice(datos.shape[0], int(vacios.sum()), replace=False)]
+    return centroides
+
+
+def asignar(datos: np.ndarray, centroides: np.ndarray, normas_datos: Optional[np.ndarray] = None,
+            bloque: int = 8192) -> np.ndarray:
+    """Índice del centroide más cercano (euclídeo) de cada fila, por bloques para acotar memoria."""
+    normas_centroides = (centroides ** 2).sum(axis=1)
+    asignacion = np.empty(datos.shape[0], dtype=np.int64)
+    for i in range(0, datos.shape[0], bloque):
+        parte = np.asarray(datos[i:i + bloque], dtype=np.float32)
+        normas = normas_datos[i:i + bloque] if normas_datos is not None else (parte ** 2).sum(axis=1)
+        distancias = normas[:, None] - 2.0 * parte @ centroides.T + normas_centroides[None, :]
+        asignacion[i:i + bloque] = distancias.argmin(axis=1)
+    return asignacion
+
+
+def _top_k(similitudes: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, similitudes.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidatos = np.argpartition(-similitudes, k - 1)[:k]
+    return candidatos[np.argsort(-similitudes[candidatos])]
+
+
+def busqueda_exacta(matriz: np.ndarray, consulta: np.ndarray, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+    """Fuerza bruta: (posiciones, similitudes) de los k vectores más similares a `consulta` normalizada."""
+    similitudes = np.asarray(matriz) @ consulta
+    posiciones = _top_k(similitudes, k)
+    return posiciones, similitudes[posiciones]
+
+
+class IndiceIVF:
+    """Índice de archivo invertido sobre una matriz normalizada (posiblemente memmap)."""
+
+    def __init__(self, matriz: np.ndarray, centroides: np.ndarray, orden: np.ndarray, inicios: np.ndarray):
+        self.matriz = matriz
+        self.centroides = centroides
+        # Posiciones de la matriz agrupadas por lista: la lista c ocupa orden[inicios[c]:inicios[c + 1]]
+        self.orden = orden
+        self.inicios = inicios
+
+    @classmethod
+    def construir(cls, matriz: np.ndarray, nlist: Optional[int] = None, iteraciones: int = 20,
+                  semilla: int = 0) -> "IndiceIVF":
+        n = matriz.shape[0]
+        if nlist is None:
+            nlist = max(1, int(4 * np.sqrt(n)))
+        centroides = normalizar(kmeans(matriz, nlist, iteraciones=iteraciones, semilla=semilla))
+        asignacion = asignar(matriz, centroides)
+        orden = np.argsort(asignacion, kind="stable")
+        inicios = np.zeros(centroides.shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(asignacion, minlength=centroides.shape[0]), out=inicios[1:])
+        return cls(matriz, centroides, orden, inicios)
+
+    def buscar(self, consulta: np.ndarray, k: int = 5, nprobe: int = NPROBE) -> Tuple[np.ndarray, np.ndarray]:
+        """(posiciones, similitudes) aproximadas de los k vecinos de `consulta` (se normaliza aquí)."""
+        consulta = normalizar(np.asarray(consulta, dtype=np.float32))
+        listas = _top_k(self.centroides @ consulta, nprobe)
+        candidatos = np.concatenate([self.orden[self.inicios[c]:self.inicios[c + 1]] for c in listas])
+        if candidatos.size == 0:
+            return candidatos, np.empty(0, dtype=np.float32)
+        candidatos.sort()  # lectura secuencial del memmap
+        similitudes = np.asarray(self.matriz[candidatos]) @ consulta
+        mejores = _top_k(similitudes, k)
+        return candidatos[mejores], similitudes[mejores]
+
+    def guardar(self, directorio: str = DIRECTORIO_SNAPSHOT):
+        np.savez(os.path.join(directorio, ARCHIVO_INDICE), centroides=self.centroides, orden=self.orden,
+                 inicios=self.inicios)
+
+    @classmethod
+    def cargar(cls, directorio: str = DIRECTORIO_SNAPSHOT, matriz: Optional[np.ndarray] = None) -> "IndiceIVF":
+        if matriz is None:
+            matriz, _, _ = cargar_snapshot(directorio)
+        datos = np.load(os.path.join(directorio, ARCHIVO_INDICE))
+        return cls(matriz, datos["centroides"], datos["orden"], datos["inicios"])
+
+
+class BuscadorLocal:
+    """Atajo para consultas: carga snapshot + índice y devuelve filas con id y similitud."""
+
+    def __init__(self, directorio: str = DIRECTORIO_SNAPSHOT, nprobe: int = NPROBE):
+        self.matriz, self.ids, self.meta = cargar_snapshot(directorio)
+        self.indice = IndiceIVF.cargar(directorio, self.matriz)
+        self.nprobe = nprobe
+
+    def buscar(self, consulta: List[float], k: int = 5, umbral: Optional[float] = None) -> List[Dict]:
+        posiciones, similitudes = self.indice.buscar(np.asarray(consulta, dtype=np.float32), k, self.nprobe)
+        resultados = []
+        for pos, sim in zip(posiciones.tolist(), similitudes.tolist()):
+            if umbral is not None and sim <= umbral:
+                continue
+            fila = {"id": self.ids["ids"][pos], "similarity": sim}
+            for columna, valores in self.ids.items():
+                if columna != "ids":
+                    fila[columna] = valores[pos]
+            resultados.append(fila)
+        return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_exportar = sub.add_parser("exportar", help="Snapshot de embeddings desde Supabase")
+    p_exportar.add_argument("--directorio", default=DIRECTORIO_SNAPSHOT)
+    p_exportar.add_argument("--tabla", default="bibliotecalegal", choices=sorted(COLUMNAS_EXTRA))
+    p_construir = sub.add_parser("construir", help="Entrena el índice IVF sobre el snapshot")
+    p_construir.add_argument("--directorio", default=DIRECTORIO_SNAPSHOT)
+    p_construir.add_argument("--nlist", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.comando == "exportar":
+        from dotenv import load_dotenv
+        from supabase import create_client
+        load_dotenv()
+        supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+        meta = exportar_embeddings(supabase, args.directorio, args.tabla)
+        print(f"[FIN] {meta['filas']} vectores de {meta['dimension']} dimensiones en {args.directorio}")
+    else:
+        matriz, _, meta = cargar_snapshot(args.directorio)
+        inicio = time.perf_counter()
+        indice = IndiceIVF.construir(matriz, args.nlist)
+        indice.guardar(args.directorio)
+        print(f"[FIN] Índice IVF con {indice.centroides.shape[0]} listas sobre {meta['filas']} vectores "
+              f"en {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: recall@k y latencia del índice IVF local vs. búsqueda exacta (y opcionalmente pgvector).
+
+Datos:
+- Un snapshot exportado con `python ann_index.py exportar` (`--directorio`), o
+- Vectores sintéticos agrupados (`--sintetico N`), para medir sin Supabase.
+
+Las consultas son vectores del propio conjunto con ruido. Con `--pgvector` además se mide la
+latencia de `match_normativas` por red (requiere SUPABASE_URL y SUPABASE_KEY) y cuánto coincide
+su top-k con el del índice local.
+
+Uso (desde lazaro_vector/):
+    python benchmarks/bench_ann.py --sintetico 20000 [--nprobe 1 4 8 16] [--k 5]
+    python benchmarks/bench_ann.py --directorio snapshot_embeddings [--pgvector]
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from ann_index import IndiceIVF, busqueda_exacta, cargar_snapshot, normalizar
+
+
+def datos_sinteticos(n: int, dimension: int = 768, grupos: int = 200, semilla: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(semilla)
+    centros = rng.standard_normal((grupos, dimension)).astype(np.float32)
+    asignacion = rng.integers(0, grupos, n)
+    return normalizar(centros[asignacion] + 0.6 * rng.standard_normal((n, dimension)).astype(np.float32))
+
+
+def consultas_desde(matriz: np.ndarray, cantidad: int, semilla: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(semilla)
+    base = np.asarray(matriz[rng.choice(matriz.shape[0], cantidad, replace=False)])
+    return normalizar(base + 0.3 * rng.standard_normal(base.shape).astype(np.float32) / np.sqrt(base.shape[1]))
+
+
+def percentil_ms(tiempos, p) -> float:
+    return float(np.percentile(tiempos, p) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directorio", default=None)
+    parser.add_argument("--sintetico", type=int, default=20000)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--pgvector", action="store_true")
+    args = parser.parse_args()
+
+    if args.directorio:
+        matriz, _, meta = cargar_snapshot(args.directorio)
+        origen = f"snapshot {args.directorio} ({meta['tabla']})"
+    else:
+        matriz = datos_sinteticos(args.sintetico)
+        origen = f"sintético ({args.sintetico} vectores)"
+    consultas = consultas_desde(matriz, min(args.consultas, matriz.shape[0]))
+    print(f"[DATOS] {origen}: {matriz.shape[0]} x {matriz.shape[1]}, {consultas.shape[0]} consultas, k={args.k}")
+
+    inicio = time.perf_counter()
+    indice = IndiceIVF.construir(matriz, args.nlist)
+    print(f"[INDICE] {indice.centroides.shape[0]} listas construidas en {time.perf_counter() - inicio:.1f}s")
+
+    exactos, tiempos = [], []
+    for q in consultas:
+        t0 = time.perf_counter()
+        posiciones, _ = busqueda_exacta(matriz, q, args.k)
+        tiempos.append(time.perf_counter() - t0)
+        exactos.append(set(posiciones.tolist()))
+    print(f"{'método':<16} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    print(f"{'exacto':<16} {1.0:>9.3f} {percentil_ms(tiempos, 50):>8.2f} {percentil_ms(tiempos, 95):>8.2f}")
+
+    for nprobe in args.nprobe:
+        aciertos, tiempos = 0, []
+        for q, esperado in zip(consultas, exactos):
+            t0 = time.perf_counter()
+            posiciones, _ = indice.buscar(q, args.k, nprobe)
+            tiempos.append(time.perf_counter() - t0)
+            aciertos += len(esperado & set(posiciones.tolist()))
+        recall = aciertos / (len(exactos) * args.k)
+        print(f"{f'ivf nprobe={nprobe}':<16} {recall:>9.3f} {percentil_ms(tiempos, 50):>8.2f} {percentil_ms(tiempos, 95):>8.2f}")
+
+    if args.pgvector:
+        if not args.directorio:
+            sys.exit("--pgvector requiere --directorio (los ids sintéticos no existen en Supabase)")
+        from dotenv import load_dotenv
+        from supabase import create_client
+        load_dotenv()
+        supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+        _, ids, _ = cargar_snapshot(args.directorio)
+        coincidencias, tiempos = 0, []
+        for q, esperado in zip(consultas, exactos):
+            t0 = time.perf_counter()
+            response = supabase.rpc("match_normativas", {"query_embedding": q.tolist(), "match_threshold": -1.0,
+                                                         "match_count": args.k}).execute()
+            tiempos.append(time.perf_counter() - t0)
+            remotos = {fila["id"] for fila in (response.data or [])}
+            coincidencias += len(remotos & {ids["ids"][p] for p in esperado})
+        print(f"{'pgvector':<16} {coincidencias / (len(exactos) * args.k):>9.3f} "
+              f"{percentil_ms(tiempos, 50):>8.2f} {percentil_ms(tiempos, 95):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
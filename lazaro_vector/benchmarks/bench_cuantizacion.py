@@ -0,0 +1,85 @@
+"""
+Benchmark: recall@k, error de reconstrucción, memoria y latencia de la cuantización
+(`cuantizacion.py`) frente a los vectores float32 originales.
+
+Datos: un snapshot de `ann_index.py exportar` (`--directorio`) o vectores sintéticos agrupados.
+El recall se mide contra la búsqueda exacta en float32, con y sin reordenar los candidatos
+usando los vectores originales.
+
+Uso (desde lazaro_vector/):
+    python benchmarks/bench_cuantizacion.py --sintetico 20000 [--m 96 192] [--k 10]
+    python benchmarks/bench_cuantizacion.py --directorio snapshot_embeddings
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ann_index import busqueda_exacta, cargar_snapshot
+from bench_ann import consultas_desde, datos_sinteticos, percentil_ms
+from cuantizacion import CuantizadorEscalar, CuantizadorProducto, buscar_cuantizado
+
+
+def medir(nombre, cuantizador, matriz, consultas, exactos, k, candidatos):
+    inicio = time.perf_counter()
+    codigos = cuantizador.codificar(matriz)
+    t_codificar = time.perf_counter() - inicio
+    muestra = np.asarray(matriz[:2000])
+    error = float(np.mean(np.linalg.norm(cuantizador.decodificar(codigos[:2000]) - muestra, axis=1)))
+    bytes_vector = cuantizador.bytes_por_vector(matriz.shape[1])
+    for reordenar in (None, matriz):
+        aciertos, tiempos = 0, []
+        for q, esperado in zip(consultas, exactos):
+            t0 = time.perf_counter()
+            posiciones, _ = buscar_cuantizado(cuantizador, codigos, q, k, reordenar=reordenar, candidatos=candidatos)
+            tiempos.append(time.perf_counter() - t0)
+            aciertos += len(esperado & set(posiciones.tolist()))
+        etiqueta = nombre + (" +reorden" if reordenar is not None else "")
+        print(f"{etiqueta:<22} {bytes_vector:>7} {matriz.shape[1] * 4 / bytes_vector:>6.0f}x "
+              f"{aciertos / (len(exactos) * k):>9.3f} {error:>9.4f} {percentil_ms(tiempos, 50):>8.2f} "
+              f"{percentil_ms(tiempos, 95):>8.2f} {t_codificar:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directorio", default=None)
+    parser.add_argument("--sintetico", type=int, default=20000)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--m", type=int, nargs="+", default=[96, 192])
+    parser.add_argument("--candidatos", type=int, default=100, help="candidatos a reordenar con float32")
+    args = parser.parse_args()
+
+    if args.directorio:
+        matriz, _, _ = cargar_snapshot(args.directorio)
+    else:
+        matriz = datos_sinteticos(args.sintetico)
+    consultas = consultas_desde(matriz, min(args.consultas, matriz.shape[0]))
+    exactos = [set(busqueda_exacta(matriz, q, args.k)[0].tolist()) for q in consultas]
+    print(f"[DATOS] {matriz.shape[0]} x {matriz.shape[1]}, {consultas.shape[0]} consultas, k={args.k}")
+    print(f"{'método':<22} {'B/vec':>7} {'ahorro':>7} {'recall@k':>9} {'err L2':>9} {'p50 ms':>8} {'p95 ms':>8} {'cod s':>8}")
+
+    tiempos = []
+    for q in consultas:
+        t0 = time.perf_counter()
+        busqueda_exacta(matriz, q, args.k)
+        tiempos.append(time.perf_counter() - t0)
+    print(f"{'float32':<22} {matriz.shape[1] * 4:>7} {1:>6.0f}x {1.0:>9.3f} {0.0:>9.4f} "
+          f"{percentil_ms(tiempos, 50):>8.2f} {percentil_ms(tiempos, 95):>8.2f} {0.0:>8.1f}")
+
+    medir("int8", CuantizadorEscalar().entrenar(matriz), matriz, consultas, exactos, args.k, args.candidatos)
+    for m in args.m:
+        inicio = time.perf_counter()
+        pq = CuantizadorProducto(m).entrenar(matriz)
+        print(f"[PQ m={m}] entrenado en {time.perf_counter() - inicio:.1f}s")
+        medir(f"pq m={m}", pq, matriz, consultas, exactos, args.k, args.candidatos)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Fragmentación consciente de la estructura de una norma, con solapamiento.
+
+A diferencia de `vectorize_database.chunk_text` (cortes ciegos cada N caracteres), aquí:
+1. El texto se divide en secciones que comienzan en encabezados (Artículo N, Título, Capítulo,
+   Párrafo, Libro).
+2. Las secciones se empaquetan en fragmentos de hasta `max_caracteres`; una sección que no cabe
+   sola se parte por párrafos, luego por oraciones y, en último caso, por palabras.
+3. Cada fragmento (salvo el primero) comienza con la cola del anterior (`solapamiento`
+   caracteres, alineada a palabra) para no perder contexto en los bordes.
+
+Cada fragmento lleva el encabezado de la sección donde comienza, útil para citar el pasaje.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+MAX_CARACTERES = 2000
+SOLAPAMIENTO = 200
+
+PATRON_ENCABEZADO = re.compile(
+    r'^\s*(?:'
+    r'art[íi]culo\s+(?:\d+|[úu]nico|primero|segundo|tercero|final)'
+    r'|art\.\s*\d+'
+    r'|(?:t[íi]tulo|cap[íi]tulo|p[áa]rrafo|libro)\s+(?:[ivxlcdm]+|\d+|[úu]nico|preliminar|final)\b'
+    r'|disposiciones\s+transitorias'
+    r')',
+    re.IGNORECASE,
+)
+PATRON_ORACION = re.compile(r'(?<=[.;:])\s+')
+LARGO_MAXIMO_ENCABEZADO = 120
+
+
+def _secciones(texto: str) -> List[Dict]:
+    secciones: List[Dict] = []
+    actual: Optional[Dict] = None
+    for linea in texto.splitlines():
+        if not linea.strip():
+            continue
+        if actual is None or PATRON_ENCABEZADO.match(linea):
+            encabezado = linea.strip()[:LARGO_MAXIMO_ENCABEZADO] if PATRON_ENCABEZADO.match(linea) else None
+            actual = {"encabezado": encabezado, "lineas": []}
+            secciones.append(actual)
+        actual["lineas"].append(linea.strip())
+    return [{"encabezado": s["encabezado"], "texto": "\n".join(s["lineas"])} for s in secciones]
+
+
+def _por_oraciones(texto: str) -> List[str]:
+    return PATRON_ORACION.split(texto)
+
+
+def _por_palabras(texto: str) -> List[str]:
+    return texto.split(" ")
+
+
+# Niveles de corte para un bloque que no cabe: párrafos, oraciones y palabras
+NIVELES_CORTE = (("\n", lambda t: t.split("\n")), (" ", _por_oraciones), (" ", _por_palabras))
+
+
+def _atomos(texto: str, limite: int, nivel: int = 0) -> List[Tuple[str, str]]:
+    """Unidades (separador previo, texto) de a lo sumo `limite`, cortando solo lo que no cabe."""
+    if len(texto) <= limite:
+        return [("", texto)]
+    if nivel == len(NIVELES_CORTE):
+        # Una sola "palabra" más larga que el límite: corte duro
+        return [("", texto[i:i + limite]) for i in range(0, len(texto), limite)]
+    separador, dividir = NIVELES_CORTE[nivel]
+    atomos = []
+    for k, unidad in enumerate(dividir(texto)):
+        sub = _atomos(unidad, limite, nivel + 1)
+        if k > 0:
+            sub[0] = (separador, sub[0][1])
+        atomos.extend(sub)
+    return atomos
+
+
+def _partir(texto: str, limite: int) -> List[str]:
+    """Parte un bloque en piezas de a lo sumo `limite`, llenando cada pieza al máximo."""
+    piezas, actual = [], ""
+    for separador, atomo in _atomos(texto, limite):
+        candidato = f"{actual}{separador}{atomo}" if actual else atomo
+        if len(candidato) <= limite:
+            actual = candidato
+            continue
+        if actual:
+            piezas.append(actual)
+        actual = atomo
+    if actual:
+        piezas.append(actual)
+    return piezas
+
+
+def _cola(texto: str, solapamiento: int) -> str:
+    if solapamiento <= 0 or len(texto) <= solapamiento:
+        return texto if solapamiento > 0 else ""
+    cola = texto[-solapamiento:]
+    espacio = cola.find(" ")
+    return cola[espacio + 1:] if 0 <= espacio < len(cola) - 1 else cola
+
+
+def fragmentar(texto: str, max_caracteres: int = MAX_CARACTERES, solapamiento: int = SOLAPAMIENTO) -> List[Dict]:
+    """
+    Divide `texto` en fragmentos [{"orden", "encabezado", "texto"}] de a lo sumo `max_caracteres`
+    (incluido el solapamiento con el fragmento anterior).
+    """
+    texto = texto or ""
+    if not texto.strip():
+        return []
+    solapamiento = max(0, min(solapamiento, max_caracteres // 2))
+    # El "\n" que une el solapamiento con el contenido también cuenta
+    presupuesto = max_caracteres - solapamiento - (1 if solapamiento else 0)
+
+    contenidos = []  # (encabezado, texto sin solapamiento)
+    ultimo_encabezado = None
+    for seccion in _secciones(texto):
+        ultimo_encabezado = seccion["encabezado"] or ultimo_encabezado
+        texto_seccion, encabezado = seccion["texto"], ultimo_encabezado
+        if contenidos and len(contenidos[-1][1]) + 1 + len(texto_seccion) <= presupuesto:
+            contenidos[-1] = (contenidos[-1][0], f"{contenidos[-1][1]}\n{texto_seccion}")
+            continue
+        if contenidos and len(contenidos[-1][1]) < presupuesto // 4:
+            # Un fragmento muy corto (p. ej. solo "TÍTULO I") se antepone a la sección siguiente
+            encabezado_previo, previo = contenidos.pop()
+            texto_seccion = f"{previo}\n{texto_seccion}"
+            encabezado = encabezado_previo or encabezado
+        for i, pieza in enumerate(_partir(texto_seccion, presupuesto)):
+            contenidos.append((encabezado if i == 0 else ultimo_encabezado, pieza))
+
+    fragmentos = []
+    for orden, (encabezado, contenido) in enumerate(contenidos):
+        if orden > 0 and solapamiento:
+            contenido = f"{_cola(contenidos[orden - 1][1], solapamiento)}\n{contenido}"
+        fragmentos.append({"orden": orden, "encabezado": encabezado, "texto": contenido})
+    return fragmentos
@@ -0,0 +1,150 @@
+"""
+Cuantización de los embeddings de 768 dimensiones para reducir memoria por vector.
+
+- `CuantizadorEscalar` (int8): por dimensión, escala el rango [mínimo, máximo] visto en
+  entrenamiento a 256 niveles. 1 byte por dimensión (4x menos que float32).
+- `CuantizadorProducto` (PQ): divide el vector en `m` subvectores y reemplaza cada uno por el
+  índice (1 byte) de su centroide más cercano en un diccionario de 256 entradas entrenado con
+  k-means (`ann_index.kmeans`). `m` bytes por vector (m=192 -> 16x, m=96 -> 32x).
+
+Ambos calculan la similitud por producto punto de forma asimétrica (ADC): la consulta queda en
+float32 y solo la base está cuantizada, sin descomprimir los vectores. Con vectores normalizados
+el producto punto equivale a la similitud coseno de pgvector.
+
+Benchmark de recall y memoria: benchmarks/bench_cuantizacion.py.
+"""
+from typing import Tuple
+
+import numpy as np
+
+from ann_index import asignar, kmeans
+
+NIVELES_INT8 = 255
+CENTROIDES_PQ = 256
+BLOQUE_ADC = 1024
+
+
+class CuantizadorEscalar:
+    def __init__(self, minimo: np.ndarray = None, escala: np.ndarray = None):
+        self.minimo = minimo
+        self.escala = escala
+
+    def entrenar(self, vectores: np.ndarray) -> "CuantizadorEscalar":
+        datos = np.asarray(vectores, dtype=np.float32)
+        self.minimo = datos.min(axis=0)
+        rango = datos.max(axis=0) - self.minimo
+        rango[rango == 0] = 1.0
+        self.escala = (rango / NIVELES_INT8).astype(np.float32)
+        return self
+
+    def codificar(self, vectores: np.ndarray) -> np.ndarray:
+        niveles = np.rint((np.asarray(vectores, dtype=np.float32) - self.minimo) / self.escala)
+        return np.clip(niveles, 0, NIVELES_INT8).astype(np.uint8)
+
+    def decodificar(self, codigos: np.ndarray) -> np.ndarray:
+        return codigos.astype(np.float32) * self.escala + self.minimo
+
+    def similitudes(self, consulta: np.ndarray, codigos: np.ndarray) -> np.ndarray:
+        """Producto punto consulta · decodificar(codigos) sin materializar los vectores decodificados."""
+        consulta = np.asarray(consulta, dtype=np.float32)
+        pesos = consulta * self.escala
+        resultado = np.empty(codigos.shape[0], dtype=np.float32)
+        # Por bloques: convertir toda la base a float32 en cada consulta cuesta más que el producto
+        for i in range(0, codigos.shape[0], BLOQUE_ADC):
+            resultado[i:i + BLOQUE_ADC] = codigos[i:i + BLOQUE_ADC].astype(np.float32) @ pesos
+        return resultado + float(consulta @ self.minimo)
+
+    def bytes_por_vector(self, dimension: int) -> int:
+        return dimension
+
+    def guardar(self, ruta: str):
+        np.savez(ruta, tipo="int8", minimo=self.minimo, escala=self.escala)
+
+
+class CuantizadorProducto:
+    def __init__(self, m: int = 96, centroides: np.ndarray = None):
+        self.m = m
+        # (m, 256, dimension / m)
+        self.centroides = centroides
+
+    def _subespacios(self, vectores: np.ndarray) -> np.ndarray:
+        vectores = np.asarray(vectores, dtype=np.float32)
+        n, dimension = vectores.shape
+        if dimension % self.m:
+            raise ValueError(f"La dimensión {dimension} no es divisible por m={self.m}")
+        return vectores.reshape(n, self.m, dimension // self.m)
+
+    def entrenar(self, vectores: np.ndarray, iteraciones: int = 15, muestra: int = 20000,
+                 semilla: int = 0) -> "CuantizadorProducto":
+        sub = self._subespacios(vectores)
+        if sub.shape[0] > muestra:
+            sub = sub[np.random.default_rng(semilla).choice(sub.shape[0], muestra, replace=False)]
+        diccionarios = []
+        for j in range(self.m):
+            centroides = kmeans(sub[:, j, :], CENTROIDES_PQ, iteraciones=iteraciones, muestra=None, semilla=semilla + j)
+            if centroides.shape[0] < CENTROIDES_PQ:
+                # Menos datos que centroides: se rellena repitiendo (los códigos extra no se usan)
+                centroides = np.resize(centroides, (CENTROIDES_PQ, centroides.shape[1]))
+            diccionarios.append(centroides)
+        self.centroides = np.stack(diccionarios).astype(np.float32)
+        return self
+
+    def codificar(self, vectores: np.ndarray, bloque: int = 8192) -> np.ndarray:
+        n = vectores.shape[0]
+        codigos = np.empty((n, self.m), dtype=np.uint8)
+        for i in range(0, n, bloque):
+            sub = self._subespacios(vectores[i:i + bloque])
+            for j in range(self.m):
+                codigos[i:i + bloque, j] = asignar(sub[:, j, :], self.centroides[j])
+        return codigos
+
+    def decodificar(self, codigos: np.ndarray) -> np.ndarray:
+        partes = self.centroides[np.arange(self.m)[None, :], codigos]  # (n, m, dsub)
+        return partes.reshape(codigos.shape[0], -1)
+
+    def tabla_distancias(self, consulta: np.ndarray) -> np.ndarray:
+        """(m, 256): producto punto de cada subvector de la consulta con cada centroide de su subespacio."""
+        sub = np.asarray(consulta, dtype=np.float32).reshape(self.m, -1)
+        return np.einsum("jd,jkd->jk", sub, self.centroides)
+
+    def similitudes(self, consulta: np.ndarray, codigos: np.ndarray) -> np.ndarray:
+        tabla = self.tabla_distancias(consulta)
+        # Suma de m búsquedas en tabla por vector, una columna de códigos a la vez
+        resultado = np.zeros(codigos.shape[0], dtype=np.float32)
+        for j in range(self.m):
+            resultado += tabla[j].take(codigos[:, j])
+        return resultado
+
+    def bytes_por_vector(self, dimension: int) -> int:
+        return self.m
+
+    def guardar(self, ruta: str):
+        np.savez(ruta, tipo="pq", m=self.m, centroides=self.centroides)
+
+
+def cargar_cuantizador(ruta: str):
+    datos = np.load(ruta)
+    if str(datos["tipo"]) == "int8":
+        return CuantizadorEscalar(datos["minimo"], datos["escala"])
+    return CuantizadorProducto(int(datos["m"]), datos["centroides"])
+
+
+def buscar_cuantizado(cuantizador, codigos: np.ndarray, consulta: np.ndarray, k: int = 5,
+                      reordenar: np.ndarray = None, candidatos: int = 50) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k por similitud ADC. Si se pasa `reordenar` (la matriz float32, p. ej. el memmap de
+    ann_index), los `candidatos` mejores se reordenan con la similitud exacta.
+    """
+    similitudes = cuantizador.similitudes(consulta, codigos)
+    n = similitudes.shape[0]
+    cuantos = min(n, max(k, candidatos) if reordenar is not None else k)
+    if cuantos <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    mejores = np.argpartition(-similitudes, cuantos - 1)[:cuantos]
+    if reordenar is not None:
+        mejores.sort()
+        exactas = np.asarray(reordenar[mejores]) @ np.asarray(consulta, dtype=np.float32)
+        orden = np.argsort(-exactas)[:k]
+        return mejores[orden], exactas[orden]
+    orden = np.argsort(-similitudes[mejores])
+    return mejores[orden], similitudes[mejores][orden]
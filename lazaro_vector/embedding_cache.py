@@ -0,0 +1,135 @@
+"""
+Caché local persistente de embeddings, indexada por (modelo, task_type, sha256 del fragmento).
+
+Cuando una norma se vuelve a scrapear o se resetea su embedding, solo los fragmentos cuyo texto
+cambió llegan a la API; el resto se recupera de un SQLite local. Los vectores se guardan como
+float32 y se desalojan por antigüedad de último acceso (LRU) al superar `max_entradas`.
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(os.path.dirname(__file__), "cache_embeddings.sqlite3"))
+CACHE_MAX_ENTRADAS = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRADAS", "500000"))
+# El desalojo se hace por tandas para no pagarlo en cada inserción
+HOLGURA_DESALOJO = 0.1
+MAX_VARIABLES_SQL = 500
+
+
+def clave_embedding(modelo: str, task_type: str, texto: str) -> str:
+    digest_texto = hashlib.sha256(texto.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{modelo}\x00{task_type}\x00{digest_texto}".encode("utf-8")).hexdigest()
+
+
+class CacheEmbeddings:
+    def __init__(self, ruta: str = CACHE_PATH, max_entradas: int = CACHE_MAX_ENTRADAS):
+        self.ruta = ruta
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(ruta, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                clave TEXT PRIMARY KEY,
+                dimension INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                accedido REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_accedido ON embeddings(accedido)")
+        self._db.commit()
+        self._entradas = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener_varios(self, claves: Sequence[str]) -> Dict[str, List[float]]:
+        encontrados: Dict[str, List[float]] = {}
+        with self._lock:
+            for i in range(0, len(claves), MAX_VARIABLES_SQL):
+                bloque = list(claves[i:i + MAX_VARIABLES_SQL])
+                marcadores = ",".join("?" * len(bloque))
+                for clave, vector in self._db.execute(
+                        f"SELECT clave, vector FROM embeddings WHERE clave IN ({marcadores})", bloque):
+                    encontrados[clave] = np.frombuffer(vector, dtype=np.float32).tolist()
+            if encontrados:
+                ahora = time.time()
+                self._db.executemany("UPDATE embeddings SET accedido = ? WHERE clave = ?",
+                                     [(ahora, c) for c in encontrados])
+                self._db.commit()
+            self.aciertos += len(encontrados)
+            self.fallos += len(set(claves)) - len(encontrados)
+        return encontrados
+
+    def guardar_varios(self, pares: Dict[str, Sequence[float]]):
+        if not pares:
+            return
+        ahora = time.time()
+        filas = []
+        for clave, vector in pares.items():
+            arreglo = np.asarray(vector, dtype=np.float32)
+            filas.append((clave, arreglo.shape[0], arreglo.tobytes(), ahora))
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (clave, dimension, vector, accedido) VALUES (?, ?, ?, ?)", filas)
+            self._db.commit()
+            self._entradas += len(filas)
+            if self._entradas > self.max_entradas * (1 + HOLGURA_DESALOJO):
+                self._desalojar()
+
+    def _desalojar(self):
+        self._entradas = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        sobrantes = self._entradas - self.max_entradas
+        if sobrantes > 0:
+            self._db.execute(
+                "DELETE FROM embeddings WHERE clave IN (SELECT clave FROM embeddings ORDER BY accedido ASC LIMIT ?)",
+                (sobrantes,))
+            self._db.commit()
+            self._entradas -= sobrantes
+
+    def cerrar(self):
+        with self._lock:
+            self._db.close()
+
+
+class EmbeddingBackendConCache:
+    """Envuelve un backend de embeddings por lote: solo envía a la API los fragmentos que no están en caché."""
+
+    def __init__(self, backend: Callable[[List[str]], List[List[float]]], cache: CacheEmbeddings,
+                 modelo: str, task_type: str = "retrieval_document"):
+        self.backend = backend
+        self.cache = cache
+        self.modelo = modelo
+        self.task_type = task_type
+
+    def __call__(self, textos: List[str]) -> List[List[float]]:
+        claves = [clave_embedding(self.modelo, self.task_type, t) for t in textos]
+        en_cache = self.cache.obtener_varios(claves)
+        faltantes: Dict[str, str] = {}
+        for clave, texto in zip(claves, textos):
+            if clave not in en_cache:
+                faltantes.setdefault(clave, texto)
+        if faltantes:
+            nuevos = self.backend(list(faltantes.values()))
+            calculados = dict(zip(faltantes.keys(), nuevos))
+            self.cache.guardar_varios(calculados)
+            en_cache.update(calculados)
+        return [en_cache[c] for c in claves]
+
+
+def obtener_con_cache(cache: Optional[CacheEmbeddings], modelo: str, task_type: str, texto: str,
+                      calcular: Callable[[str], List[float]]) -> List[float]:
+    """Versión de un solo texto, para llamadas sueltas como vectorize_database.get_embedding."""
+    if cache is None:
+        return calcular(texto)
+    clave = clave_embedding(modelo, task_type, texto)
+    encontrado = cache.obtener_varios([clave]).get(clave)
+    if encontrado is not None:
+        return encontrado
+    vector = calcular(texto)
+    cache.guardar_varios({clave: vector})
+    return vector
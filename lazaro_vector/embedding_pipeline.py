@@ -0,0 +1,346 @@
+"""
+Pipeline productor/consumidor para vectorizar bibliotecalegal.
+
+- Productor: lee las filas sin embedding con paginación por clave (id > último id), sin OFFSET
+  ni re-conteos, y las divide en fragmentos. Las filas marcadas como casi duplicado de otra
+  (`duplicado_de`, ver preventiflow_scraper/duplicados.py) no se leen.
+- Consumidores: varios hilos envían lotes de fragmentos a la API de embeddings; un token bucket
+  compartido limita los fragmentos por segundo.
+- Escritor: al completar todos los fragmentos de una fila, promedia sus vectores y los escribe en
+  bloque mediante la función RPC `actualizar_embeddings_lote`
+  (scripts/sql/20261018_create_actualizar_embeddings_lote.sql). Con `por_fragmento=True` además
+  guarda un vector por fragmento en bibliotecalegal_fragmentos vía `guardar_fragmentos_lote`
+  (scripts/sql/20261018_create_bibliotecalegal_fragmentos.sql).
+
+Con `leer=leer_articulos_pendientes` y `escribir=escribir_embeddings_articulos` el mismo pipeline
+vectoriza solo los artículos nuevos o modificados de bibliotecalegal_articulos
+(scripts/sql/20261018_create_bibliotecalegal_articulos.sql).
+
+El progreso se lleva con contadores locales. El backend de embeddings es inyectable
+(`EmbeddingBackendFalso` permite probar el pipeline sin llamar a la API). Cada etapa (lectura_db,
+division, espera_limitador, embedding, escritura_db) y la profundidad de las colas se registran
+en `metricas.REGISTRO` (preventiflow_scraper/metricas.py).
+"""
+import os
+import time
+import queue
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+
+# preventiflow_scraper/metricas.py: el punto de entrada (vectorize_database.py, los benchmarks)
+# agrega preventiflow_scraper a sys.path; este módulo no lo modifica al importarse
+from metricas import REGISTRO
+
+TAMANO_PAGINA = int(os.getenv("EMBEDDING_TAMANO_PAGINA", "100"))
+TAMANO_LOTE_EMBEDDING = int(os.getenv("EMBEDDING_TAMANO_LOTE", "32"))
+TAMANO_LOTE_ESCRITURA = int(os.getenv("EMBEDDING_TAMANO_LOTE_ESCRITURA", "50"))
+WORKERS = int(os.getenv("EMBEDDING_WORKERS", "4"))
+FRAGMENTOS_POR_SEGUNDO = float(os.getenv("EMBEDDING_FRAGMENTOS_POR_SEGUNDO", "20"))
+REINTENTOS = 3
+
+
+class TokenBucket:
+    """Limitador de tasa: `tasa` fichas por segundo con ráfagas de hasta `capacidad`."""
+
+    def __init__(self, tasa: float, capacidad: Optional[float] = None):
+        self.tasa = tasa
+        self.capacidad = capacidad if capacidad is not None else max(1.0, tasa)
+        self._fichas = self.capacidad
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def adquirir(self, n: float = 1.0):
+        if self.tasa <= 0:
+            return
+        # Una petición mayor que la capacidad se deja pasar cuando el balde está lleno
+        n = min(n, self.capacidad)
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._fichas = min(self.capacidad, self._fichas + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if self._fichas >= n:
+                    self._fichas -= n
+                    return
+                espera = (n - self._fichas) / self.tasa
+            time.sleep(espera)
+
+
+class EmbeddingBackendGenai:
+    """Embeddings por lote con google.generativeai (una petición por lote de fragmentos)."""
+
+    def __init__(self, modelo: str, task_type: str = "retrieval_document"):
+        import google.generativeai as genai
+        self._genai = genai
+        self.modelo = modelo
+        self.task_type = task_type
+
+    def __call__(self, textos: List[str]) -> List[List[float]]:
+        response = self._genai.embed_content(model=self.modelo, content=textos, task_type=self.task_type)
+        return response['embedding']
+
+
+class EmbeddingBackendFalso:
+    """Backend determinista sin red: el vector depende solo del texto (útil para pruebas y benchmarks)."""
+
+    def __init__(self, dimension: int = 768, latencia: float = 0.0):
+        self.dimension = dimension
+        self.latencia = latencia
+        self.llamadas = 0
+        self.textos_embebidos = 0
+
+    def __call__(self, textos: List[str]) -> List[List[float]]:
+        if self.latencia:
+            time.sleep(self.latencia)
+        self.llamadas += 1
+        self.textos_embebidos += len(textos)
+        vectores = []
+        for texto in textos:
+            semilla = int.from_bytes(hashlib.sha256(texto.encode("utf-8")).digest()[:8], "little")
+            vectores.append(np.random.default_rng(semilla).standard_normal(self.dimension).astype(np.float32).tolist())
+        return vectores
+
+
+def leer_pendientes(supabase, tamano_pagina: int = TAMANO_PAGINA) -> Iterator[Dict]:
+    """Recorre las filas sin embedding ni duplicado_de ordenadas por id, usando el último id visto como cursor."""
+    ultimo_id = None
+    while True:
+        consulta = (supabase.table("bibliotecalegal").select("id, texto_limpio")
+                    .is_("embedding", None).is_("duplicado_de", None))
+        if ultimo_id is not None:
+            consulta = consulta.gt("id", ultimo_id)
+        with REGISTRO.etapa("lectura_db") as etapa:
+            response = consulta.order("id").limit(tamano_pagina).execute()
+            filas = response.data if hasattr(response, 'data') else response["data"]
+            etapa.elementos = len(filas or [])
+        if not filas:
+            return
+        yield from filas
+        ultimo_id = filas[-1]["id"]
+        if len(filas) < tamano_pagina:
+            return
+
+
+def leer_articulos_pendientes(supabase, tamano_pagina: int = TAMANO_PAGINA) -> Iterator[Dict]:
+    """Artículos sin embedding (nuevos o modificados), con la misma forma que `leer_pendientes`."""
+    ultimo_id = None
+    while True:
+        consulta = supabase.table("bibliotecalegal_articulos").select("id, texto").is_("embedding", None)
+        if ultimo_id is not None:
+            consulta = consulta.gt("id", ultimo_id)
+        with REGISTRO.etapa("lectura_db", tabla="articulos") as etapa:
+            response = consulta.order("id").limit(tamano_pagina).execute()
+            filas = response.data if hasattr(response, 'data') else response["data"]
+            etapa.elementos = len(filas or [])
+        if not filas:
+            return
+        for fila in filas:
+            yield {"id": fila["id"], "texto_limpio": fila["texto"]}
+        ultimo_id = filas[-1]["id"]
+        if len(filas) < tamano_pagina:
+            return
+
+
+def escribir_embeddings(supabase, filas: List[Dict]):
+    """Actualiza en una sola llamada la columna embedding de varias filas."""
+    supabase.rpc("actualizar_embeddings_lote", {"filas": filas}).execute()
+
+
+def escribir_fragmentos(supabase, filas: List[Dict]):
+    """Reemplaza en una sola llamada los fragmentos de varias normas y actualiza su embedding promedio."""
+    supabase.rpc("guardar_fragmentos_lote", {"filas": filas}).execute()
+
+
+def escribir_embeddings_articulos(supabase, filas: List[Dict]):
+    """Actualiza en una sola llamada el embedding de varios artículos."""
+    supabase.rpc("actualizar_embeddings_articulos_lote", {"filas": filas}).execute()
+
+
+def hash_texto(texto: str) -> str:
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+class PipelineEmbeddings:
+    def __init__(self, supabase, backend: Callable[[List[str]], List[List[float]]],
+                 dividir: Callable[[str], List[Union[str, Dict]]],
+                 promediar: Callable[[List[List[float]]], List[float]],
+                 workers: int = WORKERS, tamano_pagina: int = TAMANO_PAGINA,
+                 tamano_lote_embedding: int = TAMANO_LOTE_EMBEDDING,
+                 tamano_lote_escritura: int = TAMANO_LOTE_ESCRITURA,
+                 fragmentos_por_segundo: float = FRAGMENTOS_POR_SEGUNDO,
+                 escribir: Optional[Callable] = None, por_fragmento: bool = False,
+                 leer: Optional[Callable] = None):
+        """
+        `dividir` puede devolver textos o dicts {"texto", "encabezado", ...} (chunking.fragmentar).
+        Con `por_fragmento=True` cada fila escrita incluye sus fragmentos con su propio vector.
+        `leer(supabase, tamano_pagina)` entrega las filas {"id", "texto_limpio"} a vectorizar
+        (por defecto `leer_pendientes`).
+        """
+        self.supabase = supabase
+        self.backend = backend
+        self.dividir = dividir
+        self.promediar = promediar
+        self.workers = max(1, workers)
+        self.tamano_pagina = tamano_pagina
+        self.tamano_lote_embedding = max(1, tamano_lote_embedding)
+        self.tamano_lote_escritura = max(1, tamano_lote_escritura)
+        self.limitador = TokenBucket(fragmentos_por_segundo, capacidad=max(fragmentos_por_segundo, tamano_lote_embedding))
+        self.por_fragmento = por_fragmento
+        self.escribir = escribir or (escribir_fragmentos if por_fragmento else escribir_embeddings)
+        self.leer = leer or leer_pendientes
+        self.estadisticas = {"filas_leidas": 0, "filas_vectorizadas": 0, "filas_sin_texto": 0,
+                             "filas_fallidas": 0, "fragmentos": 0, "fragmentos_fallidos": 0, "escrituras": 0}
+
+    # --- Productor ---
+    def _producir(self, cola_resultados: queue.Queue, enviar_lote: Callable[[List], None]):
+        lote = []
+        try:
+            for fila in self.leer(self.supabase, self.tamano_pagina):
+                self.estadisticas["filas_leidas"] += 1
+                texto = fila.get("texto_limpio")
+                if not texto or not isinstance(texto, str) or not texto.strip():
+                    print(f"[WARN] id={fila['id']} no tiene texto_limpio. Se salta.")
+                    self.estadisticas["filas_sin_texto"] += 1
+                    continue
+                with REGISTRO.etapa("division") as etapa:
+                    fragmentos = self.dividir(texto)
+                    etapa.bytes = len(texto)
+                if not fragmentos:
+                    continue
+                fragmentos = [f if isinstance(f, dict) else {"texto": f} for f in fragmentos]
+                # La fila se registra antes de que cualquiera de sus fragmentos pueda volver procesado
+                cola_resultados.put(("fila", fila["id"], fragmentos if self.por_fragmento else len(fragmentos)))
+                for i, fragmento in enumerate(fragmentos):
+                    lote.append((fila["id"], i, fragmento["texto"]))
+                    if len(lote) >= self.tamano_lote_embedding:
+                        enviar_lote(lote)
+                        lote = []
+            if lote:
+                enviar_lote(lote)
+        except Exception as e:
+            print(f"[ERROR] Falló la lectura de filas pendientes: {e}")
+        finally:
+            cola_resultados.put(("fin_productor",))
+
+    # --- Consumidores ---
+    def _embeber(self, lote: List) -> List[Optional[List[float]]]:
+        with REGISTRO.etapa("espera_limitador", elementos=len(lote)):
+            self.limitador.adquirir(len(lote))
+        espera = 1.0
+        for intento in range(1, REINTENTOS + 1):
+            try:
+                with REGISTRO.etapa("embedding", elementos=len(lote)) as etapa:
+                    etapa.bytes = sum(len(texto) for _, _, texto in lote)
+                    return self.backend([texto for _, _, texto in lote])
+            except Exception as e:
+                REGISTRO.contador("embedding_reintentos_total", "Lotes de embedding fallidos (reintentados o perdidos)").inc()
+                if intento == REINTENTOS:
+                    print(f"[ERROR] Fallo embedding de lote ({len(lote)} fragmentos) tras {intento} intentos: {e}")
+                    return [None] * len(lote)
+                time.sleep(espera)
+                espera *= 2
+
+    def ejecutar(self, total_referencia: Optional[int] = None) -> Dict[str, int]:
+        """Vectoriza todas las filas pendientes. `total_referencia` solo se usa para mostrar el porcentaje."""
+        cola_resultados: queue.Queue = queue.Queue()
+        lotes_enviados = 0
+        lotes_recibidos = 0
+        productor_terminado = False
+        pendientes_por_fila: Dict = {}
+        vectores_por_fila: Dict = {}
+        fragmentos_por_fila: Dict = {}
+        buffer_escritura: List[Dict] = []
+        inicio = time.monotonic()
+        cola_en_vuelo = REGISTRO.medidor("cola_lotes_embedding_en_vuelo", "Lotes enviados a la API cuya respuesta aún no se procesa")
+        cola_filas = REGISTRO.medidor("cola_filas_pendientes", "Filas con fragmentos aún sin embedding")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as ejecutor:
+            # Limita los lotes en vuelo para no leer toda la tabla en memoria de una vez
+            en_vuelo = threading.Semaphore(self.workers * 2)
+
+            def enviar_lote(lote):
+                nonlocal lotes_enviados
+                en_vuelo.acquire()
+                lotes_enviados += 1
+                cola_en_vuelo.inc()
+                futuro = ejecutor.submit(self._embeber, lote)
+                futuro.add_done_callback(lambda f, l=lote: (en_vuelo.release(), cola_resultados.put(("lote", l, f.result()))))
+
+            productor = threading.Thread(target=self._producir, args=(cola_resultados, enviar_lote), daemon=True)
+            productor.start()
+
+            while not (productor_terminado and lotes_recibidos == lotes_enviados):
+                mensaje = cola_resultados.get()
+                if mensaje[0] == "fila":
+                    _, row_id, fragmentos = mensaje
+                    cantidad = len(fragmentos) if self.por_fragmento else fragmentos
+                    if self.por_fragmento:
+                        fragmentos_por_fila[row_id] = fragmentos
+                    pendientes_por_fila[row_id] = cantidad
+                    vectores_por_fila[row_id] = [None] * cantidad
+                    continue
+                if mensaje[0] == "fin_productor":
+                    productor_terminado = True
+                    continue
+                _, lote, embeddings = mensaje
+                lotes_recibidos += 1
+                cola_en_vuelo.dec()
+                cola_filas.fijar(len(pendientes_por_fila))
+                for (row_id, orden, _), emb in zip(lote, embeddings):
+                    self.estadisticas["fragmentos"] += 1
+                    if emb is None:
+                        self.estadisticas["fragmentos_fallidos"] += 1
+                    else:
+                        vectores_por_fila[row_id][orden] = emb
+                    pendientes_por_fila[row_id] -= 1
+                    if pendientes_por_fila[row_id] == 0:
+                        del pendientes_por_fila[row_id]
+                        por_orden = vectores_por_fila.pop(row_id)
+                        fragmentos = fragmentos_por_fila.pop(row_id, None)
+                        vectores = [v for v in por_orden if v is not None]
+                        if not vectores:
+                            print(f"[WARN] id={row_id} no pudo ser vectorizado.")
+                            self.estadisticas["filas_fallidas"] += 1
+                            continue
+                        fila = {"id": row_id, "embedding": [float(x) for x in self.promediar(vectores)]}
+                        if self.por_fragmento:
+                            fila["fragmentos"] = self._fragmentos_a_escribir(fragmentos, por_orden)
+                        buffer_escritura.append(fila)
+                        if len(buffer_escritura) >= self.tamano_lote_escritura:
+                            self._vaciar(buffer_escritura, total_referencia, inicio)
+                            buffer_escritura = []
+            productor.join()
+        if buffer_escritura:
+            self._vaciar(buffer_escritura, total_referencia, inicio)
+        return self.estadisticas
+
+    @staticmethod
+    def _fragmentos_a_escribir(fragmentos: List[Dict], vectores: List[Optional[List[float]]]) -> List[Dict]:
+        # Un fragmento cuyo embedding falló se omite; el resto de la norma se guarda igual
+        return [{"orden": i,
+                 "encabezado": fragmento.get("encabezado"),
+                 "texto": fragmento["texto"],
+                 "hash_texto": hash_texto(fragmento["texto"]),
+                 "embedding": [float(x) for x in vector]}
+                for i, (fragmento, vector) in enumerate(zip(fragmentos, vectores)) if vector is not None]
+
+    def _vaciar(self, filas: List[Dict], total_referencia: Optional[int], inicio: float):
+        try:
+            with REGISTRO.etapa("escritura_db", elementos=len(filas)):
+                self.escribir(self.supabase, filas)
+            self.estadisticas["filas_vectorizadas"] += len(filas)
+            self.estadisticas["escrituras"] += 1
+        except Exception as e:
+            print(f"[ERROR] Falló la escritura de {len(filas)} embeddings: {e}")
+            self.estadisticas["filas_fallidas"] += len(filas)
+        hechas = self.estadisticas["filas_vectorizadas"]
+        transcurrido = time.monotonic() - inicio
+        ritmo = hechas / transcurrido if transcurrido else 0.0
+        if total_referencia:
+            print(f"[PROGRESO] Vectorizadas en esta corrida: {hechas}/{total_referencia} ({hechas / total_referencia * 100:.2f}%) - {ritmo:.2f} normas/s")
+        else:
+            print(f"[PROGRESO] Vectorizadas en esta corrida: {hechas} - {ritmo:.2f} normas/s")
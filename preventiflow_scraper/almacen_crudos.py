@@ -0,0 +1,223 @@
+"""
+Almacén local de payloads crudos (el `json_crudo` de LeyChile), direccionado por contenido.
+
+`save_result` subía el JSON crudo completo a `bibliotecalegal.json_crudo` en cada inserción o
+actualización (megabytes por norma en los códigos largos) y lo repetía en los segmentos de
+resultados. Ahora cada payload se guarda una sola vez en disco, comprimido, y la fila y los
+segmentos llevan solo la referencia `json_crudo_ref = "sha256:<hex>"`
+(scripts/sql/20261018_add_json_crudo_ref_bibliotecalegal.sql).
+
+- La referencia es el sha256 del JSON canónico (claves ordenadas, sin espacios): el mismo payload
+  descargado dos veces, o por dos URLs, ocupa un solo blob (`<dir>/<2 primeros hex>/<hex>.json.zst`).
+- Compresión zstd si `zstandard` está instalado; si no, gzip (`.json.gz`). `obtener` lee ambos, así
+  que un almacén puede tener blobs de los dos tipos. Escritura atómica (archivo temporal + rename).
+- Como los nombres dependen solo del contenido, el directorio se puede copiar o sincronizar
+  entre máquinas (rsync) sin conflictos.
+
+Variables de entorno: SCRAPER_ALMACENAR_CRUDOS, SCRAPER_CRUDOS_DIR, SCRAPER_CRUDOS_NIVEL.
+Benchmark: benchmarks/bench_crudos.py.
+
+Uso:
+    python almacen_crudos.py                          # resumen del almacén
+    python almacen_crudos.py --mostrar sha256:<hex>   # payload de una referencia
+    python almacen_crudos.py --migrar [--simular]     # mueve al almacén los json_crudo ya guardados en Supabase
+"""
+import os
+import re
+import sys
+import gzip
+import json
+import hashlib
+import argparse
+import threading
+import collections.abc
+from typing import Dict, List, Optional
+
+from metricas import REGISTRO
+
+try:
+    import zstandard
+except ImportError:  # opcional: sin zstandard los blobs se comprimen con gzip
+    zstandard = None
+
+ALMACENAR_CRUDOS = os.getenv("SCRAPER_ALMACENAR_CRUDOS", "1") == "1"
+CRUDOS_DIR = os.getenv("SCRAPER_CRUDOS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "crudos"))
+# Los blobs se escriben una vez y se leen rara vez: un nivel alto de zstd sigue siendo rápido
+NIVEL_ZSTD = int(os.getenv("SCRAPER_CRUDOS_NIVEL", "12"))
+NIVEL_GZIP = 9
+EXTENSION_ZSTD = ".json.zst"
+EXTENSION_GZIP = ".json.gz"
+_REFERENCIA = re.compile(r"^sha256:([0-9a-f]{64})$")
+
+
+def serializar(datos) -> bytes:
+    """JSON canónico (el mismo que usa database_manager.calcular_hash_contenido)."""
+    return json.dumps(datos, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _digest(referencia: str) -> str:
+    coincidencia = _REFERENCIA.match(referencia or "")
+    if not coincidencia:
+        raise ValueError(f"Referencia inválida: {referencia!r} (se espera 'sha256:<hex>')")
+    return coincidencia.group(1)
+
+
+class AlmacenCrudos:
+    def __init__(self, directorio: str = CRUDOS_DIR, nivel: int = NIVEL_ZSTD, usar_zstd: Optional[bool] = None):
+        self.directorio = directorio
+        self.nivel = nivel
+        self.usar_zstd = zstandard is not None if usar_zstd is None else (usar_zstd and zstandard is not None)
+        self.extension = EXTENSION_ZSTD if self.usar_zstd else EXTENSION_GZIP
+        self.nuevos = 0
+        self.repetidos = 0
+        self.bytes_escritos = 0
+        os.makedirs(directorio, exist_ok=True)
+
+    def _ruta(self, digest: str, extension: str) -> str:
+        return os.path.join(self.directorio, digest[:2], digest + extension)
+
+    def _existente(self, digest: str) -> Optional[str]:
+        for extension in (EXTENSION_ZSTD, EXTENSION_GZIP):
+            ruta = self._ruta(digest, extension)
+            if os.path.exists(ruta):
+                return ruta
+        return None
+
+    def guardar(self, datos) -> str:
+        """Guarda el payload (si no estaba) y retorna su referencia."""
+        return self.guardar_serializado(serializar(datos))
+
+    def guardar_serializado(self, contenido: bytes) -> str:
+        digest = hashlib.sha256(contenido).hexdigest()
+        if self._existente(digest):
+            self.repetidos += 1
+            return f"sha256:{digest}"
+        if self.usar_zstd:
+            comprimido = zstandard.ZstdCompressor(level=self.nivel).compress(contenido)
+        else:
+            comprimido = gzip.compress(contenido, compresslevel=NIVEL_GZIP, mtime=0)
+        ruta = self._ruta(digest, self.extension)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "wb") as f:
+            f.write(comprimido)
+        os.replace(temporal, ruta)
+        self.nuevos += 1
+        self.bytes_escritos += len(comprimido)
+        return f"sha256:{digest}"
+
+    def obtener(self, referencia: str):
+        """Payload de una referencia, o None si el blob no está en este almacén."""
+        ruta = self._existente(_digest(referencia))
+        if ruta is None:
+            return None
+        with open(ruta, "rb") as f:
+            comprimido = f.read()
+        if ruta.endswith(EXTENSION_ZSTD):
+            if zstandard is None:
+                raise RuntimeError(f"{ruta} está comprimido con zstd: instala zstandard para leerlo.")
+            contenido = zstandard.ZstdDecompressor().decompress(comprimido)
+        else:
+            contenido = gzip.decompress(comprimido)
+        return json.loads(contenido.decode("utf-8"))
+
+    def resumen(self) -> Dict:
+        blobs, total = 0, 0
+        for raiz, _, archivos in os.walk(self.directorio):
+            for nombre in archivos:
+                if nombre.endswith((EXTENSION_ZSTD, EXTENSION_GZIP)):
+                    blobs += 1
+                    total += os.path.getsize(os.path.join(raiz, nombre))
+        return {"blobs": blobs, "bytes": total, "compresion": "zstd" if self.usar_zstd else "gzip"}
+
+
+def _payload(resultado: Dict):
+    datos = resultado.get("json_crudo")
+    if isinstance(datos, (str, bytes)):
+        try:
+            datos = json.loads(datos)
+        except Exception:
+            return None
+    return datos if isinstance(datos, collections.abc.Mapping) else None
+
+
+def externalizar_crudos(resultados: List[Dict], almacen: AlmacenCrudos) -> List[Dict]:
+    """
+    Copia de los resultados con `json_crudo_ref` para cada payload crudo (guardado en `almacen`).
+    `json_crudo` se conserva en la copia: guardar_lote lo necesita para el hash de contenido.
+    """
+    salida = []
+    nuevos, repetidos = almacen.nuevos, almacen.repetidos
+    with REGISTRO.etapa("crudos", elementos=len(resultados)) as etapa:
+        antes = almacen.bytes_escritos
+        for resultado in resultados:
+            datos = _payload(resultado) if resultado and resultado.get("status") != "error" else None
+            if datos is None or resultado.get("json_crudo_ref"):
+                salida.append(resultado)
+            else:
+                salida.append(dict(resultado, json_crudo_ref=almacen.guardar(datos)))
+        etapa.bytes = almacen.bytes_escritos - antes
+    REGISTRO.contador("crudos_total", "Payloads crudos por resultado del almacén",
+                      resultado="nuevo").inc(almacen.nuevos - nuevos)
+    REGISTRO.contador("crudos_total", "Payloads crudos por resultado del almacén",
+                      resultado="repetido").inc(almacen.repetidos - repetidos)
+    return salida
+
+
+def migrar_desde_supabase(cliente, almacen: AlmacenCrudos, tamano_pagina: int = 50,
+                          aplicar: bool = True) -> Dict[str, int]:
+    """
+    Mueve al almacén los `json_crudo` que siguen en bibliotecalegal (en orden de id) y, con
+    `aplicar`, deja en la fila solo `json_crudo_ref`. El hash de contenido no cambia.
+    """
+    conteo = {"leidas": 0, "blobs_nuevos": 0, "bytes_liberados": 0}
+    nuevos = almacen.nuevos
+    ultimo_id = None
+    while True:
+        consulta = (cliente.table("bibliotecalegal").select("id, nombre_norma, json_crudo")
+                    .not_.is_("json_crudo", "null"))
+        if ultimo_id is not None:
+            consulta = consulta.gt("id", ultimo_id)
+        response = consulta.order("id").limit(tamano_pagina).execute()
+        filas = response.data if hasattr(response, 'data') else response["data"]
+        for fila in filas or []:
+            conteo["leidas"] += 1
+            contenido = serializar(fila["json_crudo"])
+            referencia = almacen.guardar_serializado(contenido)
+            conteo["bytes_liberados"] += len(contenido)
+            if aplicar:
+                cliente.table("bibliotecalegal").update(
+                    {"json_crudo_ref": referencia, "json_crudo": None}).eq("id", fila["id"]).execute()
+        conteo["blobs_nuevos"] = almacen.nuevos - nuevos
+        if not filas or len(filas) < tamano_pagina:
+            return conteo
+        ultimo_id = filas[-1]["id"]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Almacén local de payloads crudos.")
+    parser.add_argument("--mostrar", metavar="REFERENCIA", help="imprime el payload de una referencia sha256:<hex>")
+    parser.add_argument("--migrar", action="store_true",
+                        help="mueve al almacén los json_crudo guardados en Supabase y deja solo la referencia")
+    parser.add_argument("--simular", action="store_true", help="con --migrar, guarda los blobs pero no toca las filas")
+    args = parser.parse_args(argv)
+
+    almacen = AlmacenCrudos()
+    if args.mostrar:
+        datos = almacen.obtener(args.mostrar)
+        if datos is None:
+            print(f"[ERROR] {args.mostrar} no está en {almacen.directorio}")
+            sys.exit(1)
+        print(json.dumps(datos, ensure_ascii=False, indent=2))
+        return
+    if args.migrar:
+        from database_manager import supabase
+        if not supabase:
+            print("[ERROR] Faltan SUPABASE_URL y SUPABASE_KEY.")
+            sys.exit(1)
+        print(f"[FIN] {migrar_desde_supabase(supabase, almacen, aplicar=not args.simular)}")
+    print(f"[INFO] Almacén {almacen.directorio}: {almacen.resumen()}")
+
+
+if __name__ == "__main__":
+    main()
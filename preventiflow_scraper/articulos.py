@@ -0,0 +1,207 @@
+"""
+Estructura por artículo de una norma de LeyChile y diferencias entre versiones.
+
+`_procesar_json` (strategies/leychile_api_strategy.py) aplana los fragmentos `data.html` en un
+solo texto, así que cualquier modificación obligaba a reescribir y re-vectorizar la ley completa.
+Aquí los mismos textos por fragmento se agrupan en una lista ordenada de registros compactos:
+
+    {"id": "art-12-bis", "encabezado": "TITULO II > Párrafo 1°", "texto": "...", "hash": "<sha256>"}
+
+- Un registro nuevo comienza en cada "Artículo N" (o "Art. N", "Artículo único", ordinales, bis,
+  ter...). Lo anterior al primer artículo es `preambulo`; desde "Y por cuanto" / "Anótese" en
+  adelante, `promulgacion`. Los artículos después de "Disposiciones transitorias" (o con
+  "transitorio" en su encabezado) llevan id `art-t-N`. Un id repetido recibe sufijo `~2`, `~3`...
+- Libro / Título / Capítulo / Párrafo / § no son registros: forman la ruta `encabezado` de los
+  artículos que siguen (las líneas cortas inmediatamente posteriores se suman al encabezado).
+
+`diferenciar(anteriores, nuevos)` empareja primero por hash del cuerpo (un renumerado conserva su
+registro y su embedding) y después por id, y entrega solo lo agregado, modificado, eliminado y
+reubicado, para que la escritura en bibliotecalegal_articulos y la re-vectorización de artículos
+sean proporcionales a la modificación (database_manager.guardar_lote,
+scripts/sql/20261018_create_bibliotecalegal_articulos.sql). La fila de la norma en
+bibliotecalegal se sigue reescribiendo completa (texto_limpio, json_crudo_ref) y su embedding
+queda en NULL, como cualquier norma modificada.
+
+Benchmark: benchmarks/bench_articulos.py.
+"""
+import re
+import hashlib
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+_ORDINALES = (r"(?:primer|segund|tercer|cuart|quint|sext|s[ée]ptim|octav|noven|d[ée]cim|und[ée]cim|duod[ée]cim"
+              r"|vig[ée]sim|trig[ée]sim)[oa]?(?:\s?(?:primer|segund|tercer|cuart|quint|sext|s[ée]ptim|octav|noven)[oa]?)?")
+PATRON_ARTICULO = re.compile(
+    r"^(?:art[íi]culo\s+|art\.\s*)(\d+|[úu]nico|final|" + _ORDINALES + r")(?![\w])\s*[°º]?"
+    r"(?:\s*(bis|ter|qu[áa]ter|quinquies|sexies|septies|octies|nonies|novies|decies)\b)?"
+    r"(?:\s*[°º]?\s*(transitori[oa])\b)?",
+    re.IGNORECASE)
+# Nivel jerárquico de cada división; una división borra las de nivel inferior en la ruta
+NIVELES_DIVISION = {"libro": 0, "titulo": 1, "capitulo": 2, "parrafo": 3, "§": 3}
+PATRON_DIVISION = re.compile(
+    r"^(libro|t[íi]tulo|cap[íi]tulo|p[áa]rrafo)\s+(?:[ivxlcdm]+\b|\d+|[úu]nico|preliminar|final|" + _ORDINALES + r")"
+    r"|^(§)\s*\d*",
+    re.IGNORECASE)
+PATRON_TRANSITORIAS = re.compile(r"^(?:disposici[óo]n(?:es)?|art[íi]culos?|normas?)\s+transitori[oa]s?\b", re.IGNORECASE)
+PATRON_PROMULGACION = re.compile(
+    r"^(?:y por cuanto|an[óo]tese|t[óo]mese raz[óo]n|habi[ée]ndose cumplido|reg[íi]strese)\b", re.IGNORECASE)
+LARGO_MAXIMO_ENCABEZADO = 200
+
+
+def _sin_tildes(texto: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+
+
+def hash_articulo(texto: str) -> str:
+    """sha256 del texto sin la etiqueta "Artículo N°.-" inicial: un artículo renumerado conserva su hash."""
+    etiqueta = PATRON_ARTICULO.match(texto)
+    cuerpo = texto[etiqueta.end():].lstrip(" .-–:°º") if etiqueta else texto
+    return hashlib.sha256(cuerpo.encode("utf-8")).hexdigest()
+
+
+def id_articulo(coincidencia: "re.Match", transitorio: bool) -> str:
+    numero = _sin_tildes(coincidencia.group(1).lower()).replace(" ", "")
+    partes = ["art", "t" if transitorio or coincidencia.group(3) else None, numero,
+              _sin_tildes(coincidencia.group(2).lower()) if coincidencia.group(2) else None]
+    return "-".join(p for p in partes if p)
+
+
+def _clave_division(coincidencia: "re.Match") -> str:
+    return "§" if coincidencia.group(2) else _sin_tildes(coincidencia.group(1).lower())
+
+
+def articulos_de_textos(textos: Iterable[str]) -> List[Dict]:
+    """Agrupa los textos de los fragmentos (en orden) en registros por artículo."""
+    registros: List[Dict] = []
+    ids_vistos: Dict[str, int] = {}
+    ruta: Dict[int, str] = {}  # nivel -> texto de la división
+    encabezado_abierto: Optional[int] = None  # nivel de la división que aún puede extenderse
+    transitorias = False
+    actual: Optional[Dict] = None
+
+    def nuevo(id_base: str) -> Dict:
+        ids_vistos[id_base] = ids_vistos.get(id_base, 0) + 1
+        id_registro = id_base if ids_vistos[id_base] == 1 else f"{id_base}~{ids_vistos[id_base]}"
+        encabezado = " > ".join(ruta[n] for n in sorted(ruta)) or None
+        registro = {"id": id_registro, "encabezado": encabezado, "lineas": []}
+        registros.append(registro)
+        return registro
+
+    for texto in textos:
+        linea = " ".join(texto.split())
+        if not linea:
+            continue
+        articulo = PATRON_ARTICULO.match(linea)
+        if articulo:
+            actual = nuevo(id_articulo(articulo, transitorias))
+            encabezado_abierto = None
+        elif PATRON_PROMULGACION.match(linea) and (actual is None or actual["id"] != "promulgacion"):
+            actual = nuevo("promulgacion")
+            encabezado_abierto = None
+        else:
+            division = PATRON_DIVISION.match(linea)
+            if division or PATRON_TRANSITORIAS.match(linea):
+                if division:
+                    nivel = NIVELES_DIVISION[_clave_division(division)]
+                else:
+                    nivel, transitorias = 0, True
+                    ruta.clear()
+                for n in [n for n in ruta if n >= nivel]:
+                    del ruta[n]
+                ruta[nivel] = linea[:LARGO_MAXIMO_ENCABEZADO]
+                encabezado_abierto = nivel
+                continue
+            if encabezado_abierto is not None and len(linea) <= LARGO_MAXIMO_ENCABEZADO:
+                # Nombre de la división en su propia línea ("TITULO I" / "OBLIGATORIEDAD...")
+                ruta[encabezado_abierto] = f"{ruta[encabezado_abierto]} {linea}"[:LARGO_MAXIMO_ENCABEZADO]
+                continue
+            encabezado_abierto = None
+            if actual is None:
+                actual = nuevo("preambulo")
+        actual["lineas"].append(linea)
+
+    for registro in registros:
+        registro["texto"] = "\n".join(registro.pop("lineas"))
+        registro["hash"] = hash_articulo(registro["texto"])
+    return registros
+
+
+def huella_articulos(registros: Iterable[Dict]) -> str:
+    """Hash de la estructura completa (ids, encabezados y hashes en orden): si coincide, no hay nada que sincronizar."""
+    h = hashlib.sha256()
+    for r in registros:
+        h.update(f"{r['id']}\x00{r.get('encabezado') or ''}\x00{r['hash']}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+@dataclass
+class Diferencias:
+    """Cambios de una versión a otra. Los registros de agregados/modificados llevan `orden`."""
+    agregados: List[Dict] = field(default_factory=list)
+    modificados: List[Dict] = field(default_factory=list)
+    eliminados: List[str] = field(default_factory=list)
+    # Mismo texto con otro orden, encabezado o id: {"id", "id_anterior", "orden", "encabezado"}, más
+    # "texto" si fue renumerado (cambia la etiqueta "Artículo N", no el cuerpo ni su embedding)
+    reubicados: List[Dict] = field(default_factory=list)
+    sin_cambios: int = 0
+
+    @property
+    def vacia(self) -> bool:
+        return not (self.agregados or self.modificados or self.eliminados or self.reubicados)
+
+    def resumen(self) -> Dict[str, int]:
+        return {"agregados": len(self.agregados), "modificados": len(self.modificados),
+                "eliminados": len(self.eliminados), "reubicados": len(self.reubicados),
+                "sin_cambios": self.sin_cambios}
+
+
+def diferenciar(anteriores: Iterable[Dict], nuevos: List[Dict]) -> Diferencias:
+    """
+    `anteriores`: registros guardados ({"id", "hash", "encabezado", "orden"}; sin "orden" se usa la
+    posición). `nuevos`: salida de `articulos_de_textos`.
+
+    Se empareja primero por contenido y después por id, para que intercalar o derogar un artículo
+    no arrastre a los renumerados que le siguen:
+    1. mismo id y mismo hash: sin cambios (o reubicado si cambió el orden o el encabezado);
+    2. mismo hash con cualquier guardado aún libre (el más cercano en orden): renumerado, se
+       reubica con su embedding;
+    3. mismo id con otro hash: modificado;
+    4. el resto de los nuevos son agregados y el resto de los guardados, eliminados.
+    """
+    previos: Dict[str, Dict] = {}
+    for posicion, r in enumerate(anteriores):
+        previos[r["id"]] = dict(r, orden=r.get("orden", posicion))
+    diferencias = Diferencias()
+    parejas: Dict[int, Dict] = {}  # orden nuevo -> registro guardado emparejado
+    for orden, r in enumerate(nuevos):
+        previo = previos.get(r["id"])
+        if previo is not None and previo["hash"] == r["hash"]:
+            parejas[orden] = previos.pop(r["id"])
+    libres_por_hash: Dict[str, List[Dict]] = {}
+    for previo in previos.values():
+        libres_por_hash.setdefault(previo["hash"], []).append(previo)
+    for orden, r in enumerate(nuevos):
+        candidatos = libres_por_hash.get(r["hash"]) if orden not in parejas else None
+        if candidatos:
+            previo = min(candidatos, key=lambda p: abs(p["orden"] - orden))
+            candidatos.remove(previo)
+            parejas[orden] = previos.pop(previo["id"])
+    for orden, r in enumerate(nuevos):
+        previo = parejas.get(orden)
+        if previo is None:
+            previo = previos.pop(r["id"], None)
+            if previo is None:
+                diferencias.agregados.append(dict(r, orden=orden))
+            else:
+                diferencias.modificados.append(dict(r, orden=orden))
+        elif previo["id"] != r["id"]:
+            diferencias.reubicados.append({"id": r["id"], "id_anterior": previo["id"], "orden": orden,
+                                           "encabezado": r.get("encabezado"), "texto": r["texto"]})
+        elif previo["orden"] != orden or previo.get("encabezado") != r.get("encabezado"):
+            diferencias.reubicados.append({"id": r["id"], "id_anterior": r["id"], "orden": orden,
+                                           "encabezado": r.get("encabezado")})
+        else:
+            diferencias.sin_cambios += 1
+    diferencias.eliminados = list(previos)
+    return diferencias
@@ -0,0 +1,100 @@
+"""
+Benchmark: tiempo de arranque y memoria del punto de entrada (main.py) y costo de cada pila
+que antes se importaba al cargar el módulo (pandas, supabase vía database_manager, aiohttp vía
+la estrategia de LeyChile, undetected_chromedriver).
+
+Cada medición corre en un intérprete nuevo y reporta tiempo total y RSS máximo del proceso.
+Además compara leer un CSV sintético (con filas vacías y duplicados) con pandas vs. la lectura
+en streaming de main.leer_normas_csv + normas_unicas. Las dependencias no instaladas se informan
+y se omiten.
+
+Uso (desde preventiflow_scraper/):
+    python benchmarks/bench_arranque.py [--filas 50000] [--repeticiones 5]
+"""
+import os
+import sys
+import csv
+import random
+import argparse
+import tempfile
+import subprocess
+
+DIRECTORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Sufijo de cada medición: imprime el RSS máximo del proceso (KiB en Linux)
+_RSS = "; import resource; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+
+IMPORTACIONES = [
+    ("python vacío", "pass"),
+    ("main (perezoso)", "import main"),
+    ("pandas", "import pandas"),
+    ("database_manager", "import database_manager"),
+    ("estrategia LeyChile", "import strategies.leychile_api_strategy"),
+    ("undetected_chromedriver", "import undetected_chromedriver"),
+]
+
+
+def medir(codigo: str, repeticiones: int):
+    """(segundos promedio, RSS máximo en MiB) de `python -c codigo`, o None si falla (p. ej. falta el módulo)."""
+    tiempos, rss = [], 0
+    for _ in range(repeticiones):
+        proceso = subprocess.run(
+            [sys.executable, "-c", f"import time; _t = time.perf_counter(); {codigo}; "
+                                   f"print(time.perf_counter() - _t){_RSS}"],
+            cwd=DIRECTORIO, capture_output=True, text=True)
+        if proceso.returncode != 0:
+            return None
+        lineas = proceso.stdout.strip().splitlines()
+        tiempos.append(float(lineas[-2]))
+        rss = max(rss, int(lineas[-1]) / 1024)
+    return sum(tiempos) / len(tiempos), rss
+
+
+def csv_sintetico(ruta: str, filas: int):
+    rng = random.Random(0)
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.writer(f, quoting=csv.QUOTE_ALL)
+        escritor.writerow(["fuente", "nombre_norma", "jerarquia", "descripcion", "palabras_clave",
+                           "url_publica", "url_fuente_datos"])
+        for i in range(filas):
+            if rng.random() < 0.05:
+                escritor.writerow([""] * 7)
+                continue
+            id_norma = rng.randint(1, filas)  # ~1/3 de ids repetidos
+            extra = f"&idParte={rng.randint(1, 9)}" if rng.random() < 0.2 else ""
+            escritor.writerow(["BCN", f"Norma {id_norma}", "Decreto", "Descripción " * 20, "a, b, c",
+                               f"https://www.bcn.cl/leychile/navegar?idNorma={id_norma}{extra}", ""])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=50000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'importación':<26} {'ms':>8} {'RSS MiB':>9}")
+    for nombre, codigo in IMPORTACIONES:
+        r = medir(codigo, args.repeticiones)
+        print(f"{nombre:<26} {'no instalado':>18}" if r is None else f"{nombre:<26} {1000 * r[0]:>8.1f} {r[1]:>9.1f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "normas.csv")
+        csv_sintetico(ruta, args.filas)
+        lecturas = [
+            ("pandas + to_dict", f"import pandas as pd; df = pd.read_csv({ruta!r}); "
+                                 f"df.columns = [c.strip().lower() for c in df.columns]; "
+                                 f"n = len(df.to_dict(orient='records')); print(n)"),
+            ("streaming + dedupe", f"from main import leer_normas_csv, normas_unicas; import io, contextlib; "
+                                   f"b = io.StringIO(); c = contextlib.redirect_stdout(b); c.__enter__(); "
+                                   f"n = sum(1 for _ in normas_unicas(leer_normas_csv({ruta!r}))); "
+                                   f"c.__exit__(None, None, None); print(n)"),
+        ]
+        print(f"\n[CSV] {args.filas} filas (~5% vacías, idNorma repetidos)")
+        print(f"{'lectura':<26} {'ms':>8} {'RSS MiB':>9}")
+        for nombre, codigo in lecturas:
+            r = medir(codigo, max(1, args.repeticiones // 2))
+            print(f"{nombre:<26} {'no instalado':>18}" if r is None else f"{nombre:<26} {1000 * r[0]:>8.1f} {r[1]:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
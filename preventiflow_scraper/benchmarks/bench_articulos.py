@@ -0,0 +1,135 @@
+"""
+Benchmark: estructura por artículo (`articulos.py`) y escritura incremental de una modificación.
+
+1. Parseo: `_procesar_json` (solo texto) vs. texto + `articulos_de_textos` sobre los payloads
+   armados desde `python_scraper/debug_html_leychile_*.html`.
+2. Modificación sintética de la ley: un artículo reescrito, uno derogado y uno intercalado que
+   renumera a todos los siguientes (deben quedar como reubicados, no como modificados). Compara
+   reescribir todos los artículos con enviar lo que entrega `diferenciar`. La fila de la norma se
+   reescribe igual en los dos casos (texto_limpio y json_crudo_ref) y su embedding queda en NULL.
+3. De punta a punta con `database_manager.guardar_lote` contra el PostgREST local (requiere
+   supabase-py): guarda la versión original, luego la modificada, y verifica que
+   bibliotecalegal_articulos quede igual a la versión nueva y que solo los artículos tocados
+   queden sin embedding.
+
+Uso (desde preventiflow_scraper/):
+    python benchmarks/bench_articulos.py [--repeticiones 20]
+"""
+import io
+import os
+import sys
+import glob
+import json
+import importlib.util
+import re
+import time
+import argparse
+import tempfile
+import contextlib
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from articulos import PATRON_ARTICULO, articulos_de_textos, diferenciar
+from strategies.leychile_api_strategy import LeychileApiStrategy
+from servidores_locales import FIXTURES_HTML, payload_desde_html, ServidorPostgrest
+
+
+def mejor_tiempo(funcion, repeticiones: int) -> float:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def modificar(textos):
+    """Versión siguiente de la ley, fragmento a fragmento (como la publicaría LeyChile)."""
+    nuevos = list(textos)
+    articulos = [i for i, t in enumerate(nuevos) if PATRON_ARTICULO.match(" ".join(t.split()))]
+    reescrito, derogado, intercalado = articulos[4], articulos[5], articulos[7]
+    nuevos[reescrito] += " Inciso agregado por la modificación de prueba."
+    nuevos[derogado] = "Artículo 6°.- Derogado."
+    # Un artículo 8° nuevo antes del actual 8°: los siguientes se renumeran (+1), mismo cuerpo
+    for posicion in articulos[7:]:
+        etiqueta = PATRON_ARTICULO.match(" ".join(nuevos[posicion].split()))
+        numero = int(etiqueta.group(1))
+        nuevos[posicion] = re.sub(r"\d+", str(numero + 1), nuevos[posicion], count=1)
+    nuevos.insert(intercalado, "Artículo 8°.- Artículo intercalado por la modificación de prueba.")
+    return nuevos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    estrategia = LeychileApiStrategy()
+    payloads = [payload_desde_html(r) for r in sorted(glob.glob(FIXTURES_HTML))]
+    t_texto = mejor_tiempo(lambda: [estrategia._procesar_json(p) for p in payloads], args.repeticiones)
+
+    def texto_y_articulos():
+        for p in payloads:
+            textos = estrategia._textos_fragmentos(p)
+            "\n\n".join(textos)
+            articulos_de_textos(textos)
+
+    t_articulos = mejor_tiempo(texto_y_articulos, args.repeticiones)
+    textos = estrategia._textos_fragmentos(payloads[0])
+    version_1 = articulos_de_textos(textos)
+    print(f"[PARSEO] {len(payloads)} payloads: texto {1000 * t_texto / len(payloads):.2f} ms/norma, "
+          f"texto + artículos {1000 * t_articulos / len(payloads):.2f} ms/norma; "
+          f"{len(version_1)} registros ({', '.join(r['id'] for r in version_1[:6])}, ...)")
+
+    textos_2 = modificar(textos)
+    version_2 = articulos_de_textos(textos_2)
+    diferencias = diferenciar(version_1, version_2)
+    texto_2 = "\n\n".join(textos_2)
+    fila_norma = len(json.dumps({"texto_limpio": texto_2, "json_crudo_ref": "sha256:" + "0" * 64},
+                                ensure_ascii=False))
+    completa = len(json.dumps({"upserts": version_2}, ensure_ascii=False))
+    incremental = len(json.dumps({"upserts": diferencias.agregados + diferencias.modificados,
+                                  "eliminados": diferencias.eliminados, "reubicados": diferencias.reubicados},
+                                 ensure_ascii=False))
+    a_vectorizar = sum(len(r["texto"]) for r in diferencias.agregados + diferencias.modificados)
+    print(f"[DIFERENCIAS] {diferencias.resumen()}")
+    print(f"[DIFERENCIAS] artículos: todos {completa} bytes vs. diferencias {incremental} bytes "
+          f"({100 * incremental / completa:.1f}%); la fila de la norma se reescribe igual ({fila_norma} bytes)")
+    print(f"[DIFERENCIAS] artículos a re-vectorizar: {a_vectorizar} de {sum(len(r['texto']) for r in version_2)} "
+          f"caracteres; el embedding de la norma ({len(texto_2)} caracteres) queda en NULL igual que antes")
+
+    if importlib.util.find_spec("supabase") is None:
+        print("[PUNTA A PUNTA] omitido: falta supabase")
+        return
+    postgrest = ServidorPostgrest()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({"SUPABASE_URL": postgrest.url, "SUPABASE_KEY": postgrest.clave,
+                           "SCRAPER_RESULTADOS_DIR": tmp, "SCRAPER_CRUDOS_DIR": os.path.join(tmp, "crudos")})
+        with contextlib.redirect_stdout(io.StringIO()):
+            import database_manager
+        base = {"fuente": "LeyChile", "nombre_norma": "Ley 16744", "status": "ok", "url_publica": None}
+        filas_1 = database_manager.guardar_lote([dict(base, texto_limpio="\n\n".join(textos),
+                                                      json_crudo=payloads[0], articulos=version_1)])
+        tabla = postgrest.tablas["bibliotecalegal_articulos"]
+        for articulo in tabla.values():
+            articulo["embedding"] = [0.0]  # como si vectorize_database ya hubiera pasado
+        peticiones = sum(postgrest.peticiones.values())
+        filas_2 = database_manager.guardar_lote([dict(base, texto_limpio=texto_2, json_crudo=payloads[0],
+                                                      articulos=version_2)])
+        peticiones_2 = sum(postgrest.peticiones.values()) - peticiones
+        filas_3 = database_manager.guardar_lote([dict(base, texto_limpio=texto_2, json_crudo=payloads[0],
+                                                      articulos=version_2)])
+        postgrest.cerrar()
+    guardados = sorted(tabla.values(), key=lambda a: a["orden"])
+    iguales = [(a["articulo"], a["hash_texto"]) for a in guardados] == [(r["id"], r["hash"]) for r in version_2]
+    textos_iguales = [a["texto"] for a in guardados] == [r["texto"] for r in version_2]
+    pendientes = sorted(a["articulo"] for a in guardados if a.get("embedding") is None)
+    print(f"[PUNTA A PUNTA] 1ª versión: {filas_1[0].get('articulos')}; 2ª: {filas_2[0].get('articulos')} "
+          f"en {peticiones_2} peticiones; repetir la 2ª: {filas_3[0]['accion']}, artículos {filas_3[0].get('articulos')}")
+    print(f"[PUNTA A PUNTA] tabla = versión nueva: {iguales and textos_iguales}; "
+          f"artículos a re-vectorizar: {pendientes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark: `json_crudo` en cada fila y en cada segmento vs. el almacén de payloads (`almacen_crudos.py`).
+
+1. Por norma, sobre los payloads armados desde `python_scraper/debug_html_leychile_*.html`: bytes
+   del upsert a bibliotecalegal con el JSON crudo completo vs. con `json_crudo_ref`.
+2. Almacén con gzip y con zstd (si `zstandard` está instalado): bytes en disco, ms de escritura y de
+   lectura por payload, y deduplicación al guardar otra vez los mismos payloads (`--descargas`
+   veces cada uno, como cuando una ley se vuelve a descargar sin cambios).
+3. Segmentos de resultados (`result_sink`) con y sin el JSON crudo.
+4. De punta a punta con `database_manager.guardar_lote` contra el PostgREST local (requiere
+   supabase-py): ancho de la fila guardada, que el payload se recupere desde la referencia y que
+   el hash de contenido no cambie (repetir la norma, o reproducirla solo con la referencia, da
+   sin_cambios).
+
+Uso (desde preventiflow_scraper/):
+    python benchmarks/bench_crudos.py [--descargas 3]
+"""
+import io
+import os
+import sys
+import glob
+import json
+import importlib.util
+import time
+import argparse
+import tempfile
+import contextlib
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import almacen_crudos
+from almacen_crudos import AlmacenCrudos
+from result_sink import SumideroResultados
+from strategies.leychile_api_strategy import LeychileApiStrategy
+from servidores_locales import FIXTURES_HTML, payload_desde_html, ServidorPostgrest
+
+
+def bytes_json(datos) -> int:
+    return len(json.dumps(datos, ensure_ascii=False).encode("utf-8"))
+
+
+def medir_almacen(directorio: str, payloads, descargas: int, usar_zstd: bool) -> dict:
+    almacen = AlmacenCrudos(directorio, usar_zstd=usar_zstd)
+    inicio = time.perf_counter()
+    referencias = [almacen.guardar(p) for p in payloads]
+    escritura = time.perf_counter() - inicio
+    for _ in range(descargas - 1):
+        for p in payloads:
+            almacen.guardar(p)
+    inicio = time.perf_counter()
+    recuperados = [almacen.obtener(r) for r in referencias]
+    lectura = time.perf_counter() - inicio
+    return {"resumen": almacen.resumen(), "repetidos": almacen.repetidos, "iguales": recuperados == payloads,
+            "ms_escritura": 1000 * escritura / len(payloads), "ms_lectura": 1000 * lectura / len(payloads)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--descargas", type=int, default=3)
+    args = parser.parse_args()
+
+    estrategia = LeychileApiStrategy()
+    payloads = [payload_desde_html(r) for r in sorted(glob.glob(FIXTURES_HTML))]
+    resultados = [{"fuente": "LeyChile", "nombre_norma": f"Norma {i}", "status": "ok",
+                   "url_publica": f"https://www.bcn.cl/leychile/navegar?idNorma={1000 + i}",
+                   "texto_limpio": estrategia._procesar_json(p), "json_crudo": p} for i, p in enumerate(payloads)]
+    crudo = sum(bytes_json(p) for p in payloads)
+    con_crudo = sum(bytes_json(r) for r in resultados)
+    referencia = "sha256:" + "0" * 64
+    con_referencia = sum(bytes_json(dict(r, json_crudo=None, json_crudo_ref=referencia)) for r in resultados)
+    print(f"[FILA] {len(payloads)} normas: upsert con json_crudo {con_crudo / len(payloads) / 1024:.1f} KiB/norma "
+          f"({crudo / len(payloads) / 1024:.1f} de JSON crudo) vs. con referencia "
+          f"{con_referencia / len(payloads) / 1024:.1f} KiB/norma ({100 * con_referencia / con_crudo:.1f}%)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for nombre, usar_zstd in (("gzip", False), ("zstd", True)):
+            if usar_zstd and almacen_crudos.zstandard is None:
+                print("[ALMACEN] zstd: omitido (falta zstandard)")
+                continue
+            m = medir_almacen(os.path.join(tmp, nombre), payloads, args.descargas, usar_zstd)
+            print(f"[ALMACEN] {nombre}: {m['resumen']['blobs']} blobs, {m['resumen']['bytes'] / 1024:.1f} KiB "
+                  f"({100 * m['resumen']['bytes'] / crudo:.1f}% del JSON crudo, {args.descargas} descargas de cada "
+                  f"payload -> {m['repetidos']} repetidos sin escribir); escritura {m['ms_escritura']:.2f} ms, "
+                  f"lectura {m['ms_lectura']:.2f} ms por payload; íntegros: {m['iguales']}")
+
+        tamanos = {}
+        for nombre, lote in (("con_crudo", resultados),
+                             ("con_referencia", [dict({k: v for k, v in r.items() if k != "json_crudo"},
+                                                      json_crudo_ref=referencia) for r in resultados])):
+            sumidero = SumideroResultados(os.path.join(tmp, nombre), prefijo="bench")
+            for _ in range(args.descargas):
+                sumidero.escribir(lote, estrategia="bench")
+            tamanos[nombre] = os.path.getsize(sumidero.segmento)
+            sumidero.cerrar()
+        print(f"[SEGMENTOS] {args.descargas} corridas: con json_crudo {tamanos['con_crudo'] / 1024:.1f} KiB vs. "
+              f"con referencia {tamanos['con_referencia'] / 1024:.1f} KiB "
+              f"({100 * tamanos['con_referencia'] / tamanos['con_crudo']:.1f}%)")
+
+        if importlib.util.find_spec("supabase") is None:
+            print("[PUNTA A PUNTA] omitido: falta supabase")
+            return
+        postgrest = ServidorPostgrest()
+        os.environ.update({"SUPABASE_URL": postgrest.url, "SUPABASE_KEY": postgrest.clave,
+                           "SCRAPER_RESULTADOS_DIR": os.path.join(tmp, "resultados"),
+                           "SCRAPER_ALMACENAR_CRUDOS": "1"})
+        with contextlib.redirect_stdout(io.StringIO()):
+            import database_manager
+        # almacen_crudos ya se importó arriba con el directorio por defecto
+        database_manager._almacen_crudos = AlmacenCrudos(os.path.join(tmp, "crudos"))
+        primera = database_manager.guardar_lote(resultados)
+        filas = {f["nombre_norma"]: f for f in postgrest.tablas["bibliotecalegal"].values()}
+        ancho = sum(bytes_json(f) for f in filas.values())
+        recuperados = [database_manager._almacen().obtener(filas[r["nombre_norma"]]["json_crudo_ref"]) == r["json_crudo"]
+                       for r in resultados]
+        repetida = database_manager.guardar_lote(resultados)
+        reproducida = database_manager.guardar_lote(
+            [dict({k: v for k, v in r.items() if k != "json_crudo"}, json_crudo_ref=filas[r["nombre_norma"]]["json_crudo_ref"])
+             for r in resultados])
+        postgrest.cerrar()
+    acciones = lambda lote: sorted({f["accion"] for f in lote})
+    print(f"[PUNTA A PUNTA] 1ª escritura {acciones(primera)}: filas de {ancho / len(filas) / 1024:.1f} KiB "
+          f"(json_crudo en NULL: {all(f.get('json_crudo') is None for f in filas.values())}); payload recuperado "
+          f"desde la referencia: {all(recuperados)}; repetir: {acciones(repetida)}; "
+          f"reproducir solo con la referencia: {acciones(reproducida)}")
+
+
+if __name__ == "__main__":
+    main()
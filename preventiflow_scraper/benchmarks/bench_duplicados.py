@@ -0,0 +1,107 @@
+"""
+Benchmark: índice de casi-duplicados (`duplicados.IndiceDuplicados`) sobre un corpus sintético.
+
+A partir del texto de la ley de `python_scraper/debug_html_leychile_*.html` (#read-norma):
+- `--normas` originales: tramos disjuntos de la ley.
+- Un espejo por original, como lo publicaría otro sitio: otro encabezado y pie, mayúsculas y
+  puntuación distintas, saltos de línea reacomodados. Debe marcarse como duplicado.
+- Una versión por original que comparte la mitad del texto con el siguiente tramo. No debe marcarse.
+
+Reporta el costo de la firma y del registro por norma, aciertos y falsos positivos, y los
+caracteres que dejan de vectorizarse. Un hash exacto del texto (como hash_contenido) no detecta
+ningún espejo.
+
+Uso (desde preventiflow_scraper/):
+    python benchmarks/bench_duplicados.py [--normas 6]
+"""
+import os
+import sys
+import glob
+import time
+import random
+import hashlib
+import tempfile
+import argparse
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from bs4 import BeautifulSoup
+from normalizacion import normalizar_texto
+from duplicados import IndiceDuplicados, firma_minhash
+from servidores_locales import FIXTURES_HTML
+
+
+def espejo(lineas, rng: random.Random) -> str:
+    """Mismo contenido con otro chrome y otra presentación."""
+    cuerpo = []
+    for linea in lineas:
+        if rng.random() < 0.3:
+            linea = linea.upper()
+        linea = linea.replace(".-", ".").replace(";", ",")
+        # Algunas líneas se parten en dos, como en un HTML con otro ancho de columna
+        if len(linea) > 80 and rng.random() < 0.3:
+            corte = linea.find(" ", len(linea) // 2)
+            cuerpo.extend([linea[:corte], linea[corte + 1:]] if corte > 0 else [linea])
+        else:
+            cuerpo.append(linea)
+    return "\n".join(["Ministerio del Trabajo y Previsión Social", *cuerpo, f"Revisado el {rng.randint(1, 28)}/03/2025"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--normas", type=int, default=6, help="originales del corpus (tramos de ~16000 / (N + 1) caracteres)")
+    parser.add_argument("--semilla", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.semilla)
+    html = open(sorted(glob.glob(FIXTURES_HTML))[0], encoding="utf-8").read()
+    ley = normalizar_texto(BeautifulSoup(html, 'html.parser').select_one("#read-norma").get_text("\n")).split("\n")
+    tramo = max(1, len(ley) // (args.normas + 1))
+    corpus = []  # (clave, texto, original esperado o None)
+    for i in range(args.normas):
+        lineas = ley[i * tramo:(i + 1) * tramo]
+        corpus.append((f"original-{i}", "\n".join(lineas), None))
+        corpus.append((f"espejo-{i}", espejo(lineas, rng), f"original-{i}"))
+        corpus.append((f"version-{i}", "\n".join(ley[i * tramo + tramo // 2:(i + 1) * tramo + tramo // 2]), None))
+    # Cada espejo llega después de su original, pero el orden entre normas es aleatorio
+    rng.shuffle(corpus)
+    corpus.sort(key=lambda c: c[0].startswith("espejo"))
+
+    inicio = time.perf_counter()
+    for _, texto, _ in corpus:
+        firma_minhash(texto)
+    t_firma = time.perf_counter() - inicio
+
+    with tempfile.TemporaryDirectory() as tmp:
+        indice = IndiceDuplicados(os.path.join(tmp, "duplicados.sqlite3"))
+        inicio = time.perf_counter()
+        marcas = {clave: indice.registrar(clave, texto) for clave, texto, _ in corpus}
+        t_registro = time.perf_counter() - inicio
+        resumen = indice.resumen()
+        indice.cerrar()
+
+    esperados = {clave: original for clave, _, original in corpus}
+    aciertos = sum(1 for c, m in marcas.items() if m and m[0] == esperados[c])
+    falsos = sorted(c for c, m in marcas.items() if m and m[0] != esperados[c])
+    perdidos = sorted(c for c, o in esperados.items() if o and not marcas[c])
+    sims_espejo = [m[1] for c, m in marcas.items() if m and esperados[c]]
+    hashes = {}
+    exactos = sum(1 for clave, texto, _ in corpus
+                  if hashes.setdefault(hashlib.sha256(texto.encode("utf-8")).hexdigest(), clave) != clave)
+    caracteres = sum(len(texto) for _, texto, _ in corpus)
+    ahorrados = sum(len(texto) for clave, texto, _ in corpus if marcas[clave])
+
+    print(f"[CORPUS] {len(corpus)} normas ({args.normas} originales, {args.normas} espejos, {args.normas} versiones), "
+          f"~{caracteres // len(corpus)} caracteres c/u")
+    print(f"[TIEMPO] firma {1000 * t_firma / len(corpus):.2f} ms/norma; registrar (firma + LSH + SQLite) "
+          f"{1000 * t_registro / len(corpus):.2f} ms/norma")
+    print(f"[CALIDAD] espejos detectados {aciertos}/{args.normas} (similitud mín. "
+          f"{min(sims_espejo) if sims_espejo else 0:.2f}); no detectados: {perdidos[:5]}; falsos positivos: {falsos[:5]}")
+    print(f"[CALIDAD] un hash exacto del texto detecta {exactos}/{args.normas}")
+    print(f"[AHORRO] {ahorrados}/{caracteres} caracteres ({100 * ahorrados / max(1, caracteres):.1f}%) no se vectorizan; "
+          f"índice: {resumen}")
+
+
+if __name__ == "__main__":
+    main()
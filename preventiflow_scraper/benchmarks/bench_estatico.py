@@ -0,0 +1,132 @@
+"""
+Benchmark: siempre navegador (UniversalSeleniumStrategy) vs. estático primero (StaticFirstStrategy).
+
+Levanta dos sitios locales (dos puertos = dos dominios para DecisionesDominio):
+- "estatico": páginas con el articulado en el HTML, como dt.gob.cl o bcn.cl.
+- "spa":      el HTML solo trae <div id="root"></div> y el contenido llega por fetch().
+
+Reporta tiempo por página, páginas que terminaron en el navegador y si el texto extraído coincide
+con el de la vía con navegador. Con `--sin-navegador` solo mide la vía estática y la clasificación
+de `evaluar_suficiencia` (no requiere Chrome).
+
+Uso (desde preventiflow_scraper/):
+    python benchmarks/bench_estatico.py [--paginas 20] [--sin-navegador]
+"""
+import io
+import os
+import sys
+import time
+import tempfile
+import argparse
+import threading
+import contextlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Se comparan las dos vías sobre las mismas URLs: sin plantillas por dominio, que cambian el texto
+# según cuántas páginas del sitio se llevan vistas (ver bench_normalizacion.py)
+os.environ.setdefault("SCRAPER_QUITAR_PLANTILLAS", "0")
+
+from strategies.static_first_strategy import DecisionesDominio, StaticFirstStrategy, evaluar_suficiencia
+
+TEXTO_LEY = "".join(f"<p>Artículo {i}.- Texto de prueba del artículo {i} de la norma.</p>" for i in range(1, 120))
+MENU = "<nav>" + "".join(f'<a href="/s/{i}">Sección {i}</a>' for i in range(40)) + "</nav>"
+SCRIPTS = "".join(f'<script src="/js/{i}.js"></script>' for i in range(10))
+
+PAGINA_ESTATICA = f"<html><head>{SCRIPTS}</head><body>{MENU}<main>{TEXTO_LEY}</main><footer>Pie</footer></body></html>"
+PAGINA_SPA = """<html><head></head><body><noscript>Necesitas habilitar JavaScript para ver esta página.</noscript>
+<div id="root"></div>
+<script>fetch('/fragmento').then(r => r.text()).then(t => { document.getElementById('root').innerHTML = '<main>' + t + '</main>'; });</script>
+</body></html>"""
+
+
+def crear_sitio(pagina: str):
+    class Manejador(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _responder(self, cuerpo: bytes, tipo: str):
+            self.send_response(200)
+            self.send_header("Content-Type", tipo)
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def do_GET(self):
+            if self.path.startswith("/norma/"):
+                self._responder(pagina.encode("utf-8"), "text/html; charset=utf-8")
+            elif self.path == "/fragmento":
+                time.sleep(0.3)
+                self._responder(TEXTO_LEY.encode("utf-8"), "text/html; charset=utf-8")
+            elif self.path.startswith("/js/"):
+                self._responder(b"void 0;", "application/javascript")
+            else:
+                self.send_error(404)
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def _crear_driver():
+    import undetected_chromedriver as uc
+    options = uc.ChromeOptions()
+    options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    return uc.Chrome(options=options)
+
+
+def correr(estrategia, normas, driver=None):
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultados = estrategia.run(driver, normas)
+    return time.perf_counter() - inicio, resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paginas", type=int, default=20, help="páginas por sitio")
+    parser.add_argument("--sin-navegador", action="store_true")
+    args = parser.parse_args()
+
+    sitios = {"estatico": crear_sitio(PAGINA_ESTATICA), "spa": crear_sitio(PAGINA_SPA)}
+    normas = {nombre: [{"nombre_norma": f"{nombre}-{i}",
+                        "url_publica": f"http://127.0.0.1:{s.server_port}/norma/{i}"} for i in range(args.paginas)]
+              for nombre, s in sitios.items()}
+    for nombre, pagina in (("estatico", PAGINA_ESTATICA), ("spa", PAGINA_SPA)):
+        e = evaluar_suficiencia(pagina)
+        print(f"[EVALUACION] {nombre}: suficiente={e.suficiente} caracteres={e.caracteres} densidad={e.densidad} "
+              f"marcadores={e.marcadores} señales_js={e.senales_js}")
+
+    driver = None if args.sin_navegador else _crear_driver()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            decisiones = DecisionesDominio(os.path.join(tmp, "decisiones.sqlite3"))
+            estatico = StaticFirstStrategy(obtener_driver=lambda: driver, decisiones=decisiones)
+            print(f"{'sitio':<10} {'modo':<18} {'ms/página':>10} {'navegador':>10} {'texto igual':>12}")
+            for nombre, lista in normas.items():
+                referencia = None
+                if driver is not None:
+                    universal = estatico.respaldo
+                    t_universal, referencia = correr(universal, lista, driver)
+                    print(f"{nombre:<10} {'siempre navegador':<18} {1000 * t_universal / len(lista):>10.1f} "
+                          f"{len(lista):>10} {'-':>12}")
+                t_estatico, resultados = correr(estatico, lista)
+                escaladas = sum(1 for r in resultados if r.get("modo_extraccion") != "estatico")
+                igual = "-" if referencia is None else str(
+                    [r.get("texto_limpio") for r in referencia] == [r.get("texto_limpio") for r in resultados])
+                print(f"{nombre:<10} {'estático primero':<18} {1000 * t_estatico / len(lista):>10.1f} "
+                      f"{escaladas:>10} {igual:>12}")
+            print(f"[DECISIONES] {decisiones.resumen()}")
+            decisiones.cerrar()
+    finally:
+        if driver is not None:
+            driver.quit()
+        for s in sitios.values():
+            s.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark: BeautifulSoup por fragmento vs. `extractor_html.ExtractorTexto` (una sola pasada).
+
+Fixtures:
+- Los `python_scraper/debug_html_leychile_*.html` guardados, partidos en fragmentos por `<div`
+  y empaquetados con la forma de get_norma_json ({"data": {"html": [{"t": ...}, ...]}}).
+- Opcionalmente, payloads reales grabados de get_norma_json (`--payload archivo.json`, se puede
+  repetir; por ejemplo cuerpos guardados en cache_http/blobs/).
+
+Verifica que ambos caminos produzcan exactamente el mismo texto y reporta tiempos.
+
+Uso (desde preventiflow_scraper/):
+    python benchmarks/bench_extractor.py [--payload get_norma_json.json] [--repeticiones 5]
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from bs4 import BeautifulSoup
+from extractor_html import ExtractorTexto
+from servidores_locales import FIXTURES_HTML, payload_desde_html
+
+
+def con_beautifulsoup(html_list) -> str:
+    textos = []
+    for fragment in html_list:
+        html = fragment.get('t', '')
+        if html:
+            textos.append(BeautifulSoup(html, 'html.parser').get_text(separator=' ', strip=True))
+    return '\n\n'.join(textos)
+
+
+def con_extractor(html_list) -> str:
+    extractor = ExtractorTexto()
+    return '\n\n'.join(extractor.texto(f.get('t', '')) for f in html_list if f.get('t', ''))
+
+
+def cronometrar(funcion, argumento, repeticiones: int):
+    mejor, resultado = float("inf"), None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(argumento)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payload", action="append", default=[], help="JSON grabado de get_norma_json")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    casos = [(os.path.basename(r), payload_desde_html(r)) for r in sorted(glob.glob(FIXTURES_HTML))]
+    for ruta in args.payload:
+        with open(ruta, encoding="utf-8") as f:
+            casos.append((os.path.basename(ruta), json.load(f)))
+
+    print(f"{'fixture':<42} {'frags':>6} {'bs4 ms':>9} {'extractor ms':>13} {'aceleración':>12} {'idéntico':>9}")
+    total_bs4 = total_ext = 0.0
+    todos_identicos = True
+    for nombre, payload in casos:
+        datos = payload.get('data', payload)
+        html_list = datos.get('html', []) if isinstance(datos, dict) else []
+        t_bs4, texto_bs4 = cronometrar(con_beautifulsoup, html_list, args.repeticiones)
+        t_ext, texto_ext = cronometrar(con_extractor, html_list, args.repeticiones)
+        identico = texto_bs4 == texto_ext
+        todos_identicos &= identico
+        total_bs4 += t_bs4
+        total_ext += t_ext
+        print(f"{nombre:<42} {len(html_list):>6} {t_bs4 * 1000:>9.1f} {t_ext * 1000:>13.1f} {t_bs4 / t_ext:>11.1f}x {str(identico):>9}")
+    if casos:
+        print(f"{'TOTAL':<42} {'':>6} {total_bs4 * 1000:>9.1f} {total_ext * 1000:>13.1f} {total_bs4 / total_ext:>11.1f}x {str(todos_identicos):>9}")
+    sys.exit(0 if todos_identicos else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+Benchmark del flujo LeyChile -> Supabase -> vectorización, de punta a punta y por etapa, sin red.
+
+Usa los dobles de `servidores_locales.py`: get_norma_json local que reproduce los
+`debug_html_leychile_*.html` (o payloads grabados con `--payload`) con latencia y fallas, PostgREST
+en memoria y backend de embeddings simulado. Escenarios:
+
+- descarga:      leychile_client.obtener_normas_json por lotes.
+- parseo:        LeychileApiStrategy._procesar_json por norma.
+- sumidero:      result_sink.SumideroResultados.escribir por lote.
+- persistencia:  database_manager.guardar_lote por lote (supabase-py contra el PostgREST local).
+- vectorizacion: PipelineEmbeddings por fragmento (chunking.fragmentar), como vectorize_database.main.
+- flujo:         LeychileApiStrategy.run + database_manager.save_result por lote y luego la vectorización.
+
+Cada escenario corre en un intérprete nuevo (los servidores quedan en el proceso padre, así el RSS
+medido es solo el del código bajo prueba). Reporta normas/s (mediana de las repeticiones), latencia
+p50/p95 de la unidad del escenario, RSS máximo y, para `flujo`, el desglose por etapa de
+metricas.REGISTRO. Con `--json` guarda los resultados para comparar corridas. Los escenarios que
+requieren paquetes no instalados (supabase, python-dotenv) se informan y se omiten.
+
+Uso (desde preventiflow_scraper/):
+    python benchmarks/bench_flujo.py [--normas 200] [--lote 25] [--repeticiones 3] [--escenarios descarga,flujo]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import contextlib
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from servidores_locales import (ServidorLeychile, ServidorPostgrest, RUTA_API, cargar_payloads,
+                                backend_embedding_simulado, agregar_ruta_lazaro_vector)
+
+ESCENARIOS = ("descarga", "parseo", "sumidero", "persistencia", "vectorizacion", "flujo")
+ID_BASE = 100000
+# Marca de la línea con el resultado del proceso hijo (el resto de su salida se descarta)
+MARCA = "@@RESULTADO "
+
+
+def percentil(valores, q: float):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+
+
+def _lotes(elementos, tamano: int):
+    for i in range(0, len(elementos), tamano):
+        yield elementos[i:i + tamano]
+
+
+# --- Proceso hijo: ejecuta un escenario y emite su resultado ---
+
+def _normas(config):
+    return [{"fuente": "LeyChile", "nombre_norma": f"Norma banco {i}", "jerarquia": "Decreto",
+             "descripcion": "Benchmark", "palabras_clave": None,
+             "url_publica": f"{config['leychile']}{RUTA_API}?idNorma={ID_BASE + i}", "url_fuente_datos": None}
+            for i in range(config["normas"])]
+
+
+def _resultados(config):
+    """Resultados ya descargados y parseados (entrada de sumidero y persistencia)."""
+    from strategies.leychile_api_strategy import LeychileApiStrategy
+    estrategia = LeychileApiStrategy()
+    datos = [json.loads(p) for p in cargar_payloads(config["payloads"])]
+    textos = [estrategia._procesar_json(d) for d in datos]
+    resultados = []
+    for i, norma in enumerate(_normas(config)):
+        j = (ID_BASE + i) % len(datos)
+        resultados.append(dict(norma, status="ok", texto_limpio=textos[j], json_crudo=datos[j],
+                               url_fuente_datos=norma["url_publica"]))
+    return resultados
+
+
+def _cronometrar_lotes(elementos, tamano: int, funcion, latencias):
+    for lote in _lotes(elementos, tamano):
+        inicio = time.perf_counter()
+        funcion(lote)
+        latencias.append(time.perf_counter() - inicio)
+
+
+def _vectorizar(config, latencias):
+    import numpy as np
+    from supabase import create_client
+    agregar_ruta_lazaro_vector()
+    from chunking import fragmentar
+    from embedding_pipeline import PipelineEmbeddings
+
+    backend = backend_embedding_simulado(latencia=config["latencia_embedding"],
+                                         latencia_por_texto=config["latencia_por_texto"],
+                                         prob_falla=config["prob_falla_embedding"], semilla=config["semilla"])
+
+    def cronometrado(textos):
+        inicio = time.perf_counter()
+        try:
+            return backend(textos)
+        finally:
+            latencias.append(time.perf_counter() - inicio)
+
+    # Misma configuración que vectorize_database.main (por fragmento, 2000 caracteres, solapamiento 200)
+    pipeline = PipelineEmbeddings(
+        create_client(config["postgrest"], config["clave"]),
+        backend=cronometrado,
+        dividir=lambda texto: fragmentar(texto, max_caracteres=2000, solapamiento=200),
+        promediar=lambda vectores: list(np.mean(vectores, axis=0)),
+        por_fragmento=True,
+        fragmentos_por_segundo=config["fragmentos_por_segundo"],
+    )
+    estadisticas = pipeline.ejecutar()
+    return estadisticas, backend.fallas_inyectadas
+
+
+def escenario_descarga(config, latencias):
+    from leychile_client import obtener_normas_json
+    urls = [n["url_publica"] for n in _normas(config)]
+    ok = []
+    inicio = time.perf_counter()
+    _cronometrar_lotes(urls, config["lote"], lambda lote: ok.extend(r.ok for r in obtener_normas_json(lote)), latencias)
+    return time.perf_counter() - inicio, len(urls), "lote", {"ok": sum(ok)}
+
+
+def escenario_parseo(config, latencias):
+    from strategies.leychile_api_strategy import LeychileApiStrategy
+    estrategia = LeychileApiStrategy()
+    datos = [json.loads(p) for p in cargar_payloads(config["payloads"])]
+    caracteres = 0
+    inicio = time.perf_counter()
+    for i in range(config["normas"]):
+        t = time.perf_counter()
+        caracteres += len(estrategia._procesar_json(datos[(ID_BASE + i) % len(datos)]))
+        latencias.append(time.perf_counter() - t)
+    return time.perf_counter() - inicio, config["normas"], "norma", {"caracteres": caracteres}
+
+
+def escenario_sumidero(config, latencias):
+    from result_sink import SumideroResultados
+    resultados = _resultados(config)
+    sumidero = SumideroResultados(config["directorio"], prefijo="banco")
+    inicio = time.perf_counter()
+    _cronometrar_lotes(resultados, config["lote"], lambda lote: sumidero.escribir(lote, estrategia="banco"), latencias)
+    sumidero.cerrar()
+    segundos = time.perf_counter() - inicio
+    en_disco = sum(os.path.getsize(os.path.join(config["directorio"], a)) for a in os.listdir(config["directorio"]))
+    return segundos, len(resultados), "lote", {"MB_en_disco": round(en_disco / 2**20, 2)}
+
+
+def escenario_persistencia(config, latencias):
+    import database_manager
+    resultados = _resultados(config)
+    acciones = {}
+
+    def guardar(lote):
+        for fila in database_manager.guardar_lote(lote):
+            acciones[fila["accion"]] = acciones.get(fila["accion"], 0) + 1
+
+    inicio = time.perf_counter()
+    _cronometrar_lotes(resultados, config["lote"], guardar, latencias)
+    return time.perf_counter() - inicio, len(resultados), "lote", acciones
+
+
+def escenario_vectorizacion(config, latencias):
+    inicio = time.perf_counter()
+    estadisticas, fallas = _vectorizar(config, latencias)
+    extra = {k: estadisticas[k] for k in ("fragmentos", "fragmentos_fallidos", "escrituras")}
+    extra["fallas_inyectadas"] = fallas
+    return time.perf_counter() - inicio, estadisticas["filas_vectorizadas"], "llamada embedding", extra
+
+
+def escenario_flujo(config, latencias):
+    import database_manager
+    from strategies.leychile_api_strategy import LeychileApiStrategy
+    estrategia = LeychileApiStrategy()
+    ok = []
+
+    def procesar(lote):
+        resultados = estrategia.run(None, lote)
+        ok.extend(r["status"] == "ok" for r in resultados)
+        database_manager.save_result(resultados, estrategia.name)
+
+    normas = _normas(config)
+    inicio = time.perf_counter()
+    _cronometrar_lotes(normas, config["lote"], procesar, latencias)
+    estadisticas, _ = _vectorizar(config, [])
+    return time.perf_counter() - inicio, len(normas), "lote (descarga + guardado)", {
+        "ok": sum(ok), "vectorizadas": estadisticas["filas_vectorizadas"], "fragmentos": estadisticas["fragmentos"]}
+
+
+def ejecutar_hijo(nombre: str, config: dict):
+    os.environ.update({
+        "LEYCHILE_CACHE_MODO": "desactivado",
+        "LEYCHILE_PETICIONES_POR_SEGUNDO": str(config["peticiones_por_segundo"]),
+        "LEYCHILE_CONCURRENCIA": str(config["concurrencia"]),
+        "SCRAPER_RESULTADOS_DIR": config["directorio"],
+        "SCRAPER_DUPLICADOS": os.path.join(config["directorio"], "duplicados.sqlite3"),
+        "SCRAPER_CRUDOS_DIR": os.path.join(config["directorio"], "crudos"),
+        # Las normas sintéticas repiten los mismos payloads: con la detección de casi duplicados casi
+        # nada llegaría a vectorizarse (ver bench_duplicados.py)
+        "SCRAPER_DETECTAR_DUPLICADOS": "0",
+        "SUPABASE_URL": config["postgrest"],
+        "SUPABASE_KEY": config["clave"],
+    })
+    os.environ.pop("METRICAS_DIR", None)
+    import resource
+    latencias = []
+    try:
+        with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+            segundos, normas, unidad, extra = globals()[f"escenario_{nombre}"](config, latencias)
+    except ImportError as e:
+        print(MARCA + json.dumps({"omitido": f"falta {e.name or e}"}))
+        return
+    from metricas import REGISTRO
+    print(MARCA + json.dumps({
+        "segundos": segundos, "normas": normas, "unidad": unidad, "latencias": latencias, "extra": extra,
+        "rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "etapas": REGISTRO.resumen()["etapas"],
+    }, ensure_ascii=False))
+
+
+# --- Proceso padre: servidores, repeticiones y reporte ---
+
+def correr(nombre: str, args, payloads, textos) -> dict:
+    leychile = ServidorLeychile(payloads, latencia=args.latencia_api, variacion=args.variacion_api,
+                                prob_500=args.prob_500, prob_429=args.prob_429, semilla=args.semilla)
+    postgrest = ServidorPostgrest(semilla=args.semilla, latencia=args.latencia_db)
+    if nombre == "vectorizacion":
+        postgrest.sembrar("bibliotecalegal", [
+            {"nombre_norma": f"Norma banco {i}", "texto_limpio": f"{textos[(ID_BASE + i) % len(textos)]}\n\nNorma banco {i}",
+             "embedding": None} for i in range(args.normas)])
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            config = {"normas": args.normas, "lote": args.lote, "payloads": args.payload, "semilla": args.semilla,
+                      "directorio": tmp, "leychile": leychile.base, "postgrest": postgrest.url, "clave": postgrest.clave,
+                      "peticiones_por_segundo": args.peticiones_por_segundo, "concurrencia": args.concurrencia,
+                      "latencia_embedding": args.latencia_embedding, "latencia_por_texto": args.latencia_por_texto,
+                      "prob_falla_embedding": args.prob_falla_embedding,
+                      "fragmentos_por_segundo": args.fragmentos_por_segundo}
+            proceso = subprocess.run([sys.executable, os.path.abspath(__file__), "--hijo", nombre,
+                                      "--config", json.dumps(config)], cwd=RAIZ, capture_output=True, text=True)
+        lineas = [l for l in proceso.stdout.splitlines() if l.startswith(MARCA)]
+        if proceso.returncode != 0 or not lineas:
+            error = (proceso.stderr.strip().splitlines() or [f"código {proceso.returncode}"])[-1]
+            return {"error": error}
+        resultado = json.loads(lineas[-1][len(MARCA):])
+        resultado["servidores"] = {"leychile_peticiones": leychile.peticiones,
+                                   "leychile_fallas": leychile.fallas_inyectadas,
+                                   "postgrest": dict(sorted(postgrest.peticiones.items()))}
+        return resultado
+    finally:
+        leychile.cerrar()
+        postgrest.cerrar()
+
+
+def _ms(segundos):
+    return "-" if segundos is None else f"{1000 * segundos:.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--normas", type=int, default=200)
+    parser.add_argument("--lote", type=int, default=25, help="Normas por lote (como main.py)")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--escenarios", default=",".join(ESCENARIOS))
+    parser.add_argument("--payload", action="append", default=[], help="Payload grabado de get_norma_json (repetible)")
+    parser.add_argument("--latencia-api", type=float, default=0.05, help="Segundos por respuesta de get_norma_json")
+    parser.add_argument("--variacion-api", type=float, default=0.05, help="Latencia extra aleatoria (0..N s)")
+    parser.add_argument("--prob-500", type=float, default=0.0)
+    parser.add_argument("--prob-429", type=float, default=0.0)
+    parser.add_argument("--peticiones-por-segundo", type=float, default=0, help="Límite por host (0 = sin límite)")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--latencia-db", type=float, default=0.005, help="Segundos por petición a PostgREST")
+    parser.add_argument("--latencia-embedding", type=float, default=0.05, help="Segundos por llamada de embedding")
+    parser.add_argument("--latencia-por-texto", type=float, default=0.001, help="Segundos extra por fragmento")
+    parser.add_argument("--prob-falla-embedding", type=float, default=0.0)
+    parser.add_argument("--fragmentos-por-segundo", type=float, default=0, help="Límite de embeddings (0 = sin límite)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--json", help="Guarda los resultados en este archivo")
+    parser.add_argument("--hijo", help=argparse.SUPPRESS)
+    parser.add_argument("--config", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        return ejecutar_hijo(args.hijo, json.loads(args.config))
+
+    from strategies.leychile_api_strategy import LeychileApiStrategy
+    payloads = cargar_payloads(args.payload)
+    textos = [LeychileApiStrategy()._procesar_json(json.loads(p)) for p in payloads]
+    escenarios = [e.strip() for e in args.escenarios.split(",") if e.strip()]
+    desconocidos = set(escenarios) - set(ESCENARIOS)
+    if desconocidos:
+        parser.error(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}. Opciones: {', '.join(ESCENARIOS)}")
+
+    print(f"[DATOS] {args.normas} normas en lotes de {args.lote}, {len(payloads)} payloads "
+          f"({sum(map(len, payloads)) / len(payloads) / 1024:.0f} KiB promedio), {args.repeticiones} repeticiones")
+    print(f"{'escenario':<15} {'normas/s':>9} {'unidad':<28} {'p50 ms':>9} {'p95 ms':>9} {'RSS MiB':>8}")
+    informe = {"configuracion": {k: v for k, v in vars(args).items() if k not in ("hijo", "config")}, "escenarios": {}}
+    for nombre in escenarios:
+        corridas = [correr(nombre, args, payloads, textos) for _ in range(max(1, args.repeticiones))]
+        fallida = next((c for c in corridas if "error" in c or "omitido" in c), None)
+        if fallida:
+            print(f"{nombre:<15} {'omitido: ' + fallida['omitido'] if 'omitido' in fallida else 'error: ' + fallida['error']}")
+            informe["escenarios"][nombre] = fallida
+            continue
+        latencias = [l for c in corridas for l in c["latencias"]]
+        fila = {
+            "normas_por_segundo": statistics.median(c["normas"] / c["segundos"] for c in corridas),
+            "unidad": corridas[-1]["unidad"],
+            "p50_s": percentil(latencias, 0.5), "p95_s": percentil(latencias, 0.95),
+            "rss_mib": max(c["rss_mib"] for c in corridas),
+            "extra": corridas[-1]["extra"], "servidores": corridas[-1]["servidores"], "etapas": corridas[-1]["etapas"],
+        }
+        informe["escenarios"][nombre] = fila
+        print(f"{nombre:<15} {fila['normas_por_segundo']:>9.1f} {fila['unidad']:<28} {_ms(fila['p50_s']):>9} "
+              f"{_ms(fila['p95_s']):>9} {fila['rss_mib']:>8.1f}")
+
+    for nombre, fila in informe["escenarios"].items():
+        if "extra" in fila:
+            detalle = {**fila["extra"], "peticiones_leychile": fila["servidores"]["leychile_peticiones"]}
+            print(f"[{nombre}] " + ", ".join(f"{k}={v}" for k, v in detalle.items()))
+    etapas = informe["escenarios"].get("flujo", {}).get("etapas")
+    if etapas:
+        print("\n[FLUJO] desglose por etapa (metricas.REGISTRO, última repetición)")
+        print(f"{'etapa':<34} {'n':>6} {'total s':>8} {'p50 ms':>8} {'p95 ms':>8} {'elem/s':>9}")
+        for etapa, f in etapas.items():
+            print(f"{etapa:<34} {f['invocaciones']:>6} {f['segundos']:>8.2f} {f.get('p50_ms') or '-':>8} "
+                  f"{f.get('p95_ms') or '-':>8} {f['elementos_por_segundo'] or '-':>9}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(informe, f, ensure_ascii=False, indent=2)
+        print(f"\n[INFO] Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
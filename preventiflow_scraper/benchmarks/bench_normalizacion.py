@@ -0,0 +1,155 @@
+"""
+Benchmark: limpieza línea a línea anterior (`limpiar_texto` / `limpiar_texto_universal`) vs.
+`normalizacion.normalizar_texto`, y quitado de plantillas por dominio (`PlantillasDominio`).
+
+1. Sobre los `python_scraper/debug_html_leychile_*.html` (texto del body sin script/nav/footer,
+   como la estrategia universal): tiempo, caracteres y líneas de cada limpieza.
+2. Sitio sintético de `--paginas` páginas: el chrome real de la página de LeyChile (todo menos
+   `#read-norma`, más una línea de fecha que cambia por página) alrededor de tramos distintos del
+   texto de la ley (cada una con el encabezado de un decreto: Ministerio, VISTOS, CONSIDERANDO,
+   RESUELVO). Mide cuánto texto se quita y verifica que todas las líneas de ley sobrevivan, en orden.
+3. Líneas de ley que se parecen a chrome (incisos "(c) ...", artículos que mencionan "todos los
+   derechos reservados") deben sobrevivir a `normalizar_texto`; los avisos de copyright reales no.
+
+Tokens con tiktoken si está disponible (token_counter.py); si no, estimados como caracteres / 4.
+
+Uso (desde preventiflow_scraper/):
+    python benchmarks/bench_normalizacion.py [--paginas 40] [--repeticiones 20]
+"""
+import io
+import os
+import sys
+import glob
+import time
+import tempfile
+import argparse
+import contextlib
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from bs4 import BeautifulSoup
+from normalizacion import normalizar_texto, PlantillasDominio
+from servidores_locales import FIXTURES_HTML
+
+SELECTORES_RUIDO = 'script, style, nav, header, footer, aside, .menu, .sidebar, .footer'
+# Estructura de un decreto: se repite en todas las páginas de un ministerio y no es plantilla
+ENCABEZADO_DECRETO = ["Ministerio de Salud", "Subsecretaría de Salud Pública", "VISTOS:", "CONSIDERANDO:",
+                      "RESUELVO:"]
+LINEAS_LEY_PARECIDAS_A_CHROME = [
+    "(a) la expresión decreto comprende los decretos supremos;",
+    "(b) la expresión ley comprende los decretos con fuerza de ley;",
+    "(c) la expresión reglamentos comprende los reglamentos de ejecución.",
+    "c) las obras publicadas con todos los derechos reservados.",
+    "Artículo 5.- El autor conservará todos los derechos reservados.",
+    "Copyright de las obras colectivas: corresponde al editor.",
+]
+AVISOS_CHROME = ["© 2024 Biblioteca del Congreso Nacional de Chile", "Copyright © 2023 bcn.cl",
+                 "BCN - Todos los derechos reservados.", "Usamos cookies para mejorar tu experiencia."]
+
+
+def limpiar_texto_anterior(texto: str) -> str:
+    lineas = (line.strip() for line in texto.splitlines())
+    return '\n'.join(line for line in lineas if line)
+
+
+def contador_tokens():
+    try:
+        sys.path.insert(0, os.path.dirname(RAIZ))
+        from token_counter import obtener_codificador
+        codificador = obtener_codificador()
+        return "tiktoken", lambda texto: len(codificador.encode(texto))
+    except Exception:  # sin tiktoken, o sin red para bajar el BPE la primera vez
+        return "caracteres/4", lambda texto: len(texto) // 4
+
+
+def texto_body(sopa: BeautifulSoup) -> str:
+    for elemento in sopa.select(SELECTORES_RUIDO):
+        elemento.decompose()
+    return sopa.body.get_text() if sopa.body else ""
+
+
+def mejor_tiempo(funcion, textos, repeticiones: int) -> float:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for texto in textos:
+            funcion(texto)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paginas", type=int, default=40, help="páginas del sitio sintético")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    rutas = sorted(glob.glob(FIXTURES_HTML))
+    htmls = [open(r, encoding="utf-8").read() for r in rutas]
+    crudos = [texto_body(BeautifulSoup(h, 'html.parser')) for h in htmls]
+    nombre_tokens, tokens = contador_tokens()
+
+    print(f"[FIXTURES] {len(rutas)} páginas de LeyChile, tokens: {nombre_tokens}")
+    print(f"{'limpieza':<22} {'ms/página':>10} {'caracteres':>11} {'líneas':>8} {'tokens':>8}")
+    for nombre, funcion in (("línea a línea", limpiar_texto_anterior), ("normalizar_texto", normalizar_texto)):
+        t = mejor_tiempo(funcion, crudos, args.repeticiones)
+        salida = [funcion(c) for c in crudos]
+        print(f"{nombre:<22} {1000 * t / len(crudos):>10.3f} {sum(map(len, salida)):>11} "
+              f"{sum(s.count(chr(10)) + 1 for s in salida):>8} {sum(map(tokens, salida)):>8}")
+    anteriores = {" ".join(l.split()) for l in limpiar_texto_anterior(crudos[0]).split("\n")}
+    quitadas = anteriores - set(normalizar_texto(crudos[0]).split("\n"))
+    print(f"[FIXTURES] líneas descartadas como chrome conocido: {sorted(quitadas)[:10]}")
+    conservadas = normalizar_texto("\n".join(LINEAS_LEY_PARECIDAS_A_CHROME + AVISOS_CHROME)).split("\n")
+    perdidas_chrome = [l for l in LINEAS_LEY_PARECIDAS_A_CHROME if l not in conservadas]
+    avisos_restantes = [l for l in AVISOS_CHROME if l in conservadas]
+    print(f"[FIXTURES] líneas de ley parecidas a chrome perdidas: {perdidas_chrome or 0}; "
+          f"avisos que sobreviven: {avisos_restantes or 0}")
+
+    # Sitio sintético: mismo chrome, distinto texto legal en cada página
+    sopa = BeautifulSoup(htmls[0], 'html.parser')
+    cuerpo = sopa.select_one("#read-norma")
+    ley = normalizar_texto(cuerpo.get_text("\n")).split("\n")
+    cuerpo.decompose()
+    chrome = normalizar_texto(texto_body(sopa))
+    # Tramos de un cuarto de la ley que se solapan: cada línea legal aparece en ~25% de las páginas,
+    # como versiones sucesivas de una misma norma
+    tramo = max(1, len(ley) // 4)
+    paso = max(1, len(ley) // args.paginas)
+    paginas = []
+    for i in range(args.paginas):
+        inicio = (i * paso) % max(1, len(ley) - tramo)
+        lineas_ley = ENCABEZADO_DECRETO + ley[inicio:inicio + tramo]
+        paginas.append((f"https://sitio.example/norma/{i}", lineas_ley,
+                        f"{chrome}\nFecha de consulta: {i % 28 + 1:02d}-08-2025\n" + "\n".join(lineas_ley)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plantillas = PlantillasDominio(os.path.join(tmp, "plantillas.sqlite3"))
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            limpias = [plantillas.limpiar(url, texto) for url, _, texto in paginas]
+        t = time.perf_counter() - inicio
+        resumen = plantillas.resumen()
+        plantillas.cerrar()
+
+    perdidas = 0
+    for (_, lineas_ley, _), limpia in zip(paginas, limpias):
+        restantes = iter(limpia.split("\n"))
+        # Todas las líneas de ley deben aparecer, en el mismo orden
+        perdidas += sum(1 for linea in lineas_ley if not any(linea == r for r in restantes))
+    calentamiento = plantillas.min_paginas - 1
+    antes = sum(len(texto) for _, _, texto in paginas[calentamiento:])
+    despues = sum(len(l) for l in limpias[calentamiento:])
+    print(f"\n[PLANTILLAS] {args.paginas} páginas, {len(chrome.splitlines())} líneas de chrome por página, "
+          f"{tramo} líneas de ley por página")
+    print(f"[PLANTILLAS] {1000 * t / len(paginas):.2f} ms/página; las primeras {calentamiento} páginas no se "
+          f"recortan (min_paginas={plantillas.min_paginas})")
+    print(f"[PLANTILLAS] después del calentamiento: {antes} -> {despues} caracteres "
+          f"({100 * (1 - despues / max(1, antes)):.1f}% menos), tokens "
+          f"{sum(tokens(texto) for _, _, texto in paginas[calentamiento:])} -> "
+          f"{sum(tokens(l) for l in limpias[calentamiento:])}")
+    print(f"[PLANTILLAS] líneas de ley perdidas: {perdidas}; dominio: {resumen}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Benchmark: espera fija (time.sleep(3)) vs. detección adaptativa de página lista + bloqueo de recursos.
+
+Levanta un sitio de prueba local con tres tipos de página y mide, para cada modo, el tiempo
+total por página y el largo del texto extraído. Ambos modos deben extraer el mismo texto: si la
+espera adaptativa devuelve otro (p. ej. "Cargando..." en /js_tardio) el benchmark termina con error.
+- /rapida     HTML estático.
+- /js_tardio  el contenido llega por fetch() con 1.2 s de latencia.
+- /pesada     texto estático + 20 imágenes servidas lentamente.
+- /long_poll  texto estático + un long-poll que siempre tiene una petición abierta (10 s cada una).
+- /sondeo     el contenido llega por fetch() con 1.2 s de latencia y la página envía un latido
+              cada 300 ms (la red nunca queda inactiva).
+Las dos últimas no deben esperar el techo de SCRAPER_TIMEOUT_PAGINA.
+
+Uso (desde preventiflow_scraper/):
+    python benchmarks/bench_readiness.py [--repeticiones 3]
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from strategies.page_readiness import (bloquear_recursos, instalar_monitor_red, esperar_pagina_lista,
+                                       TIMEOUT_LISTA_SEGUNDOS)
+from normalizacion import normalizar_texto
+
+TEXTO_LEY = "".join(f"<p>Artículo {i}.- Texto de prueba del artículo {i} de la norma.</p>" for i in range(1, 200))
+
+PAGINAS = {
+    "/rapida": f"<html><body><main>{TEXTO_LEY}</main></body></html>",
+    "/js_tardio": """<html><body><main id="c">Cargando...</main>
+<script>fetch('/fragmento').then(r => r.text()).then(t => { document.getElementById('c').innerHTML = t; });</script>
+</body></html>""",
+    "/pesada": "<html><body><main>" + TEXTO_LEY + "</main>"
+               + "".join(f'<img src="/img/{i}.png">' for i in range(20)) + "</body></html>",
+    "/long_poll": f"""<html><body><main>{TEXTO_LEY}</main>
+<script>(function sondear() {{ fetch('/espera').then(sondear, sondear); }})();</script>
+</body></html>""",
+    "/sondeo": """<html><body><main id="c">Cargando...</main>
+<script>fetch('/fragmento').then(r => r.text()).then(t => { document.getElementById('c').innerHTML = t; });
+setInterval(() => fetch('/latido'), 300);</script>
+</body></html>""",
+}
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, cuerpo: bytes, tipo: str):
+        self.send_response(200)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        if self.path in PAGINAS:
+            self._responder(PAGINAS[self.path].encode("utf-8"), "text/html; charset=utf-8")
+        elif self.path == "/fragmento":
+            time.sleep(1.2)
+            self._responder(TEXTO_LEY.encode("utf-8"), "text/html; charset=utf-8")
+        elif self.path == "/espera":
+            time.sleep(10)
+            self._responder(b"{}", "application/json")
+        elif self.path == "/latido":
+            self._responder(b"{}", "application/json")
+        elif self.path.startswith("/img/"):
+            time.sleep(0.5)
+            self._responder(b"\x89PNG\r\n\x1a\n" + b"\x00" * 200_000, "image/png")
+        else:
+            self.send_error(404)
+
+
+def _extraer_texto(driver) -> str:
+    sopa = BeautifulSoup(driver.page_source, 'html.parser')
+    for elemento in sopa.select('script, style, nav, header, footer, aside'):
+        elemento.decompose()
+    return normalizar_texto(sopa.body.get_text() if sopa.body else "")
+
+
+def _crear_driver():
+    import undetected_chromedriver as uc
+    options = uc.ChromeOptions()
+    options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    return uc.Chrome(options=options)
+
+
+def medir(modo: str, base: str, repeticiones: int):
+    driver = _crear_driver()
+    try:
+        if modo == "lista":
+            bloquear_recursos(driver)
+            instalar_monitor_red(driver)
+        filas = []
+        for ruta in PAGINAS:
+            tiempos, texto = [], ""
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                driver.get(base + ruta)
+                if modo == "sleep":
+                    time.sleep(3)
+                else:
+                    esperar_pagina_lista(driver)
+                texto = _extraer_texto(driver)
+                tiempos.append(time.perf_counter() - inicio)
+            filas.append((ruta, sum(tiempos) / len(tiempos), texto))
+        return filas
+    finally:
+        driver.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    try:
+        resultados = {modo: medir(modo, base, args.repeticiones) for modo in ("sleep", "lista")}
+    finally:
+        servidor.shutdown()
+
+    print(f"{'página':<12} {'sleep(3) s':>11} {'lista s':>9} {'aceleración':>12} {'caracteres':>11} {'texto igual':>12}")
+    distintas, en_el_techo = [], []
+    for (ruta, t_sleep, texto_sleep), (_, t_lista, texto_lista) in zip(resultados["sleep"], resultados["lista"]):
+        igual = texto_sleep == texto_lista
+        if not igual:
+            distintas.append(ruta)
+        if t_lista >= TIMEOUT_LISTA_SEGUNDOS:
+            en_el_techo.append(ruta)
+        print(f"{ruta:<12} {t_sleep:>11.2f} {t_lista:>9.2f} {t_sleep / t_lista:>11.1f}x "
+              f"{len(texto_lista):>11} {str(igual):>12}")
+    if distintas:
+        print(f"[ERROR] La espera adaptativa extrajo otro texto que sleep(3) en: {', '.join(distintas)}")
+        sys.exit(1)
+    if en_el_techo:
+        print(f"[ERROR] La espera adaptativa llegó al techo de {TIMEOUT_LISTA_SEGUNDOS:.0f}s en: {', '.join(en_el_techo)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark: descargas de get_norma_json contra servidores locales con fallas inyectadas,
+sin resiliencia (un intento, sin circuit breaker) vs. con `resiliencia.py`.
+
+Levanta dos servidores:
+- "inestable": responde el JSON de la norma, pero con probabilidad configurable devuelve 500,
+  429 con Retry-After, se demora (latencia alta) o corta la conexión sin responder.
+- "caido": siempre responde 503. Mide cuántas peticiones se desperdician en un host muerto.
+
+Reporta normas obtenidas, errores, peticiones recibidas por cada servidor y tiempo total.
+
+Uso (desde preventiflow_scraper/):
+    python benchmarks/bench_resiliencia.py [--normas 200] [--prob-500 0.15] [--prob-429 0.05]
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import contextlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leychile_client import obtener_normas_json
+from resiliencia import PoliticaReintentos, RegistroHosts
+
+RUTA_API = "/servicios/Navegar/get_norma_json"
+
+
+def crear_servidor(perfil: dict):
+    contador = {"peticiones": 0}
+    lock = threading.Lock()
+    rng = random.Random(perfil.get("semilla", 0))
+
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _responder(self, status: int, cuerpo: bytes, cabeceras: dict = None):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            for k, v in (cabeceras or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def do_GET(self):
+            with lock:
+                contador["peticiones"] += 1
+                sorteo = rng.random()
+            if perfil.get("caido"):
+                return self._responder(503, b'{"error": "caido"}')
+            umbral = perfil["prob_500"]
+            if sorteo < umbral:
+                return self._responder(500, b'{"error": "interno"}')
+            umbral += perfil["prob_429"]
+            if sorteo < umbral:
+                return self._responder(429, b'{"error": "limite"}', {"Retry-After": str(perfil["retry_after"])})
+            umbral += perfil["prob_corte"]
+            if sorteo < umbral:
+                self.close_connection = True
+                self.connection.shutdown(2)
+                return
+            umbral += perfil["prob_lento"]
+            if sorteo < umbral:
+                time.sleep(perfil["latencia_lenta"])
+            id_norma = self.path.split("idNorma=")[-1]
+            cuerpo = json.dumps({"idNorma": id_norma, "data": {"html": [{"t": f"<p>Norma {id_norma}</p>"}]}})
+            self._responder(200, cuerpo.encode("utf-8"))
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, contador
+
+
+def correr(nombre: str, urls, politica, registro, contadores):
+    antes = [c["peticiones"] for c in contadores]
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        respuestas = obtener_normas_json(urls, concurrencia=8, peticiones_por_segundo=0, modo_cache="desactivado",
+                                         politica=politica, registro=registro)
+    duracion = time.perf_counter() - inicio
+    ok = sum(1 for r in respuestas if r.ok)
+    peticiones = [c["peticiones"] - a for c, a in zip(contadores, antes)]
+    print(f"{nombre:<18} {ok:>6} {len(respuestas) - ok:>7} {peticiones[0]:>12} {peticiones[1]:>11} {duracion:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--normas", type=int, default=200, help="normas en el host inestable")
+    parser.add_argument("--normas-caido", type=int, default=50, help="normas en el host caído")
+    parser.add_argument("--prob-500", type=float, default=0.15)
+    parser.add_argument("--prob-429", type=float, default=0.05)
+    parser.add_argument("--prob-corte", type=float, default=0.05)
+    parser.add_argument("--prob-lento", type=float, default=0.05)
+    parser.add_argument("--latencia-lenta", type=float, default=1.5)
+    parser.add_argument("--retry-after", type=int, default=1)
+    args = parser.parse_args()
+
+    perfil = {"prob_500": args.prob_500, "prob_429": args.prob_429, "prob_corte": args.prob_corte,
+              "prob_lento": args.prob_lento, "latencia_lenta": args.latencia_lenta, "retry_after": args.retry_after}
+    inestable, contador_inestable = crear_servidor(perfil)
+    caido, contador_caido = crear_servidor({**perfil, "caido": True})
+    urls = [f"http://127.0.0.1:{inestable.server_port}{RUTA_API}?idNorma={i}" for i in range(args.normas)]
+    urls += [f"http://127.0.0.1:{caido.server_port}{RUTA_API}?idNorma={i}" for i in range(args.normas_caido)]
+    random.Random(1).shuffle(urls)
+
+    print(f"[PERFIL] 500={args.prob_500} 429={args.prob_429} corte={args.prob_corte} lento={args.prob_lento} "
+          f"| {args.normas} normas en host inestable, {args.normas_caido} en host caído")
+    print(f"{'escenario':<18} {'ok':>6} {'errores':>7} {'pet. inest.':>12} {'pet. caído':>11} {'tiempo s':>9}")
+    contadores = [contador_inestable, contador_caido]
+    correr("sin resiliencia", urls, PoliticaReintentos(intentos=1), RegistroHosts(umbral_fallos=10 ** 9), contadores)
+    correr("con resiliencia", urls, PoliticaReintentos(intentos=4, base=0.2, maximo=5),
+           RegistroHosts(umbral_fallos=5, enfriamiento=2), contadores)
+    inestable.shutdown()
+    caido.shutdown()
+
+
+if __name__ == "__main__":
+    main()
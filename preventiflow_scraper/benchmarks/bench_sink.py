@@ -0,0 +1,106 @@
+"""
+Benchmark: un archivo JSON (indent=2) por llamada a save_result vs. `result_sink.SumideroResultados`.
+
+Genera resultados sintéticos con el tamaño típico de una norma de LeyChile (texto limpio + JSON
+crudo con el HTML por fragmentos) y los guarda en lotes, como main.py. Reporta tiempo de escritura,
+archivos creados, bytes en disco, tiempo de lectura completa y de consulta de una norma puntual.
+
+Uso (desde preventiflow_scraper/):
+    python benchmarks/bench_sink.py [--normas 2000] [--lote 25]
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from result_sink import LectorResultados, SumideroResultados, clave_resultado
+
+
+def resultado_sintetico(i: int, rng: random.Random) -> dict:
+    articulos = [f"Artículo {j}.- " + " ".join(rng.choice(("el", "empleador", "deberá", "trabajador", "riesgo",
+                                                            "protección", "plazo", "días", "inspección"))
+                                                 for _ in range(rng.randint(30, 120))) for j in range(1, rng.randint(10, 60))]
+    return {
+        "fuente": "LeyChile", "nombre_norma": f"Decreto {i}", "jerarquia": "Decreto", "descripcion": "Sintético",
+        "url_publica": f"https://www.bcn.cl/leychile/navegar?idNorma={100000 + i}",
+        "texto_limpio": "\n".join(articulos),
+        "json_crudo": {"data": {"html": [{"t": f"<p>{a}</p>"} for a in articulos]}},
+    }
+
+
+def json_por_llamada(directorio: str, lotes):
+    for n, lote in enumerate(lotes):
+        with open(os.path.join(directorio, f"scraper_modular_{n:06d}.json"), "w", encoding="utf-8") as f:
+            json.dump(lote, f, ensure_ascii=False, indent=2)
+
+
+def uso_disco(directorio: str):
+    archivos = [os.path.join(r, a) for r, _, nombres in os.walk(directorio) for a in nombres]
+    return len(archivos), sum(os.path.getsize(a) for a in archivos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--normas", type=int, default=2000)
+    parser.add_argument("--lote", type=int, default=25)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    resultados = [resultado_sintetico(i, rng) for i in range(args.normas)]
+    lotes = [resultados[i:i + args.lote] for i in range(0, len(resultados), args.lote)]
+    buscada = resultados[len(resultados) // 2]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dir_json, dir_sink = os.path.join(tmp, "json"), os.path.join(tmp, "sink")
+        os.makedirs(dir_json)
+
+        inicio = time.perf_counter()
+        json_por_llamada(dir_json, lotes)
+        t_json = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        leidos = sum(len(json.load(open(os.path.join(dir_json, a), encoding="utf-8"))) for a in sorted(os.listdir(dir_json)))
+        t_leer_json = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        for a in sorted(os.listdir(dir_json)):
+            if any(r["url_publica"] == buscada["url_publica"]
+                   for r in json.load(open(os.path.join(dir_json, a), encoding="utf-8"))):
+                break
+        t_buscar_json = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        sumidero = SumideroResultados(dir_sink, prefijo="scraper_modular")
+        with contextlib.redirect_stdout(io.StringIO()):
+            for lote in lotes:
+                sumidero.escribir(lote, estrategia="scraper_modular")
+        sumidero.cerrar()
+        t_sink = time.perf_counter() - inicio
+        lector = LectorResultados(dir_sink)
+        inicio = time.perf_counter()
+        leidos_sink = sum(1 for _ in lector.iterar())
+        t_leer_sink = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        encontrado = lector.obtener(clave_resultado(buscada))
+        t_buscar_sink = time.perf_counter() - inicio
+        lector.cerrar()
+        assert encontrado["resultado"] == buscada and leidos == leidos_sink == len(resultados)
+
+        archivos_json, bytes_json = uso_disco(dir_json)
+        archivos_sink, bytes_sink = uso_disco(dir_sink)
+
+    print(f"[DATOS] {len(resultados)} normas en {len(lotes)} llamadas de {args.lote}")
+    print(f"{'formato':<22} {'escribir s':>10} {'archivos':>9} {'MB':>8} {'leer todo s':>12} {'una norma ms':>13}")
+    print(f"{'JSON por llamada':<22} {t_json:>10.2f} {archivos_json:>9} {bytes_json / 2**20:>8.1f} "
+          f"{t_leer_json:>12.2f} {1000 * t_buscar_json:>13.1f}")
+    print(f"{'JSONL.gz + índice':<22} {t_sink:>10.2f} {archivos_sink:>9} {bytes_sink / 2**20:>8.1f} "
+          f"{t_leer_sink:>12.2f} {1000 * t_buscar_sink:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
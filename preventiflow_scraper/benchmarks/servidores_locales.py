@@ -0,0 +1,373 @@
+"""
+Dobles locales para los benchmarks: nada sale a la red ni toca Supabase.
+
+- `ServidorLeychile`: responde get_norma_json reproduciendo payloads grabados (o armados desde los
+  `debug_html_leychile_*.html`), con latencia y fallas configurables (500, 429 + Retry-After).
+- `ServidorPostgrest`: subconjunto de la API REST de Supabase (PostgREST) en memoria, suficiente
+  para el cliente oficial `supabase-py`: select con filtros eq/gt/gte/lt/lte/in/is, order, limit,
+  offset y count=exact; upsert con on_conflict; update con filtros; y las RPC `actualizar_embeddings_lote`,
+  `guardar_fragmentos_lote`, `aplicar_diferencias_articulos` y `actualizar_embeddings_articulos_lote`
+  (mismo efecto que scripts/sql/).
+- `BackendEmbeddingSimulado`: `EmbeddingBackendFalso` de lazaro_vector con latencia por llamada,
+  latencia por texto y fallas inyectadas.
+
+Los servidores corren en un hilo propio (`ThreadingHTTPServer`) y exponen contadores de peticiones.
+"""
+import os
+import re
+import sys
+import glob
+import json
+import time
+import uuid
+import random
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, parse_qsl
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_HTML = os.path.join(os.path.dirname(RAIZ), "python_scraper", "debug_html_leychile_*.html")
+RUTA_API = "/servicios/Navegar/get_norma_json"
+
+
+def payload_desde_html(ruta: str) -> dict:
+    """Parte un HTML guardado por `<div` y lo empaqueta con la forma de get_norma_json."""
+    with open(ruta, encoding="utf-8") as f:
+        html = f.read()
+    fragmentos = [f for f in re.split(r'(?=<div)', html) if f.strip()]
+    return {"data": {"html": [{"t": f} for f in fragmentos]}}
+
+
+def cargar_payloads(rutas_payload: List[str] = ()) -> List[bytes]:
+    """Cuerpos JSON a reproducir: los payloads grabados indicados y, si no hay, los fixtures HTML."""
+    cuerpos = []
+    for ruta in rutas_payload:
+        with open(ruta, "rb") as f:
+            cuerpos.append(f.read())
+    if not cuerpos:
+        cuerpos = [json.dumps(payload_desde_html(r), ensure_ascii=False).encode("utf-8")
+                   for r in sorted(glob.glob(FIXTURES_HTML))]
+    if not cuerpos:
+        raise FileNotFoundError(f"No hay payloads ni fixtures en {FIXTURES_HTML}")
+    return cuerpos
+
+
+def _iniciar(manejador) -> ThreadingHTTPServer:
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), manejador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+class _ManejadorBase(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status: int, cuerpo: bytes = b"", cabeceras: Optional[Dict] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        for k, v in (cabeceras or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _leer_json(self):
+        largo = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(largo) or b"null")
+
+
+class ServidorLeychile:
+    """get_norma_json local: la norma `idNorma=N` recibe el payload N módulo la cantidad grabada."""
+
+    def __init__(self, payloads: List[bytes], latencia: float = 0.0, variacion: float = 0.0,
+                 prob_500: float = 0.0, prob_429: float = 0.0, retry_after: int = 1, semilla: int = 0):
+        self.payloads = payloads
+        self.peticiones = 0
+        self.fallas_inyectadas = 0
+        self.bytes_enviados = 0
+        lock = threading.Lock()
+        rng = random.Random(semilla)
+        servidor_stub = self
+
+        class Manejador(_ManejadorBase):
+            def do_GET(self):
+                with lock:
+                    servidor_stub.peticiones += 1
+                    sorteo, demora = rng.random(), latencia + rng.uniform(0, variacion)
+                if demora:
+                    time.sleep(demora)
+                if sorteo < prob_500 + prob_429:
+                    with lock:
+                        servidor_stub.fallas_inyectadas += 1
+                    if sorteo < prob_500:
+                        return self._responder(500, b'{"error": "interno"}')
+                    return self._responder(429, b'{"error": "limite"}', {"Retry-After": str(retry_after)})
+                consulta = dict(parse_qsl(urlparse(self.path).query))
+                try:
+                    cuerpo = payloads[int(consulta.get("idNorma", "0")) % len(payloads)]
+                except ValueError:
+                    return self._responder(404, b'{"error": "idNorma invalido"}')
+                with lock:
+                    servidor_stub.bytes_enviados += len(cuerpo)
+                self._responder(200, cuerpo)
+
+        self._servidor = _iniciar(Manejador)
+        self.base = f"http://127.0.0.1:{self._servidor.server_address[1]}"
+
+    def url_api(self, id_norma) -> str:
+        return f"{self.base}{RUTA_API}?idNorma={id_norma}"
+
+    def cerrar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+# --- PostgREST en memoria ---
+
+def _valores_in(texto: str) -> List[str]:
+    """`(a,"b, c",d)` -> ["a", "b, c", "d"] (postgrest-py cita los valores con , : ( o ))."""
+    return [m.group(1) if m.group(1) is not None else m.group(2)
+            for m in re.finditer(r'"((?:[^"\\]|\\.)*)"|([^,]+)', texto.strip()[1:-1])]
+
+
+def _coincide(valor, operador: str, argumento: str) -> bool:
+    if operador == "is":
+        return (valor is None) if argumento == "null" else (valor is (argumento == "true"))
+    if operador == "in":
+        return valor is not None and str(valor) in _valores_in(argumento)
+    if valor is None:
+        return False
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        argumento = type(valor)(argumento)
+    else:
+        valor = str(valor)
+    return {"eq": valor == argumento, "neq": valor != argumento, "gt": valor > argumento,
+            "gte": valor >= argumento, "lt": valor < argumento, "lte": valor <= argumento}[operador]
+
+
+class ServidorPostgrest:
+    """
+    Tablas en memoria (dict id -> fila) servidas en /rest/v1/. Los ids son uuid deterministas, como
+    en bibliotecalegal. `sembrar` carga filas directamente sin pasar por HTTP.
+    """
+
+    PARAMETROS_RESERVADOS = ("select", "order", "limit", "offset", "on_conflict", "columns")
+
+    def __init__(self, semilla: int = 0, latencia: float = 0.0):
+        self.tablas: Dict[str, Dict[str, Dict]] = {"bibliotecalegal": {}, "bibliotecalegal_fragmentos": {},
+                                                   "bibliotecalegal_articulos": {}}
+        self.peticiones: Dict[str, int] = {}
+        self.latencia = latencia
+        self._rng = random.Random(semilla)
+        self._lock = threading.Lock()
+        servidor_stub = self
+
+        class Manejador(_ManejadorBase):
+            def _despachar(self, metodo: str):
+                ruta = urlparse(self.path)
+                partes = ruta.path.strip("/").split("/")
+                if partes[:2] != ["rest", "v1"] or len(partes) < 3:
+                    return self._responder(404, b'{"message": "ruta desconocida"}')
+                if servidor_stub.latencia:
+                    time.sleep(servidor_stub.latencia)
+                clave = f"{metodo} {'/'.join(partes[2:])}"
+                cuerpo_peticion = self._leer_json() if metodo in ("POST", "PATCH") else None
+                with servidor_stub._lock:
+                    servidor_stub.peticiones[clave] = servidor_stub.peticiones.get(clave, 0) + 1
+                    try:
+                        status, datos, cabeceras = servidor_stub._atender(
+                            metodo, partes[2:], parse_qsl(ruta.query, keep_blank_values=True),
+                            self.headers.get("Prefer", ""), cuerpo_peticion)
+                    except (KeyError, ValueError) as e:
+                        status, datos, cabeceras = 400, {"message": str(e)}, {}
+                cuerpo = b"" if datos is None else json.dumps(datos, ensure_ascii=False).encode("utf-8")
+                self._responder(status, cuerpo, cabeceras)
+
+            def do_GET(self):
+                self._despachar("GET")
+
+            def do_POST(self):
+                self._despachar("POST")
+
+            def do_PATCH(self):
+                self._despachar("PATCH")
+
+        self._servidor = _iniciar(Manejador)
+        self.url = f"http://127.0.0.1:{self._servidor.server_address[1]}"
+        # supabase-py valida que la clave tenga forma de JWT; el servidor no la revisa
+        self.clave = "banco.local.clave"
+
+    def _nuevo_id(self) -> str:
+        return str(uuid.UUID(int=self._rng.getrandbits(128), version=4))
+
+    def sembrar(self, tabla: str, filas: List[Dict]):
+        with self._lock:
+            for fila in filas:
+                fila = dict(fila)
+                fila.setdefault("id", self._nuevo_id())
+                self.tablas[tabla][fila["id"]] = fila
+
+    def _atender(self, metodo: str, ruta: List[str], parametros: List, prefer: str, cuerpo):
+        if ruta[0] == "rpc":
+            return 200, self._rpc(ruta[1], cuerpo or {}), {}
+        tabla = self.tablas[ruta[0]]
+        opciones = dict(p for p in parametros if p[0] in self.PARAMETROS_RESERVADOS)
+        if metodo == "POST":
+            return self._upsert(tabla, cuerpo, opciones.get("on_conflict"), prefer)
+        filas = [f for f in tabla.values()
+                 if all(_coincide(f.get(col), *expr.split(".", 1))
+                        for col, expr in parametros if col not in self.PARAMETROS_RESERVADOS)]
+        if metodo == "PATCH":
+            for fila in filas:
+                fila.update(cuerpo or {})
+            return (204, None, {}) if "return=minimal" in prefer else (200, filas, {})
+        for orden in reversed([o for o in opciones.get("order", "").split(",") if o]):
+            columna, _, direccion = orden.partition(".")
+            filas.sort(key=lambda f: (f.get(columna) is None, f.get(columna)), reverse=direccion.startswith("desc"))
+        total = len(filas)
+        inicio = int(opciones.get("offset", 0))
+        filas = filas[inicio:inicio + int(opciones["limit"])] if "limit" in opciones else filas[inicio:]
+        columnas = [c.strip() for c in opciones.get("select", "*").split(",")]
+        if "*" not in columnas:
+            filas = [{c: f.get(c) for c in columnas} for f in filas]
+        cabeceras = {}
+        if "count=exact" in prefer:
+            cabeceras["Content-Range"] = f"{inicio}-{inicio + len(filas) - 1}/{total}" if filas else f"*/{total}"
+        return 200, filas, cabeceras
+
+    def _upsert(self, tabla: Dict, cuerpo, on_conflict: Optional[str], prefer: str):
+        filas = cuerpo if isinstance(cuerpo, list) else [cuerpo]
+        fusionar = "merge-duplicates" in prefer and on_conflict
+        indice = {f.get(on_conflict): f for f in tabla.values()} if fusionar else {}
+        escritas = []
+        for fila in filas:
+            existente = indice.get(fila.get(on_conflict)) if fusionar else None
+            if existente is not None:
+                existente.update(fila)
+                escritas.append(existente)
+            else:
+                nueva = dict(fila)
+                nueva.setdefault("id", self._nuevo_id())
+                tabla[nueva["id"]] = nueva
+                if fusionar:
+                    indice[nueva.get(on_conflict)] = nueva
+                escritas.append(nueva)
+        if "return=minimal" in prefer:
+            return 201, None, {}
+        return 201, escritas, {}
+
+    def _rpc(self, funcion: str, argumentos: Dict) -> int:
+        normas, fragmentos = self.tablas["bibliotecalegal"], self.tablas["bibliotecalegal_fragmentos"]
+        filas = argumentos.get("filas") or []
+        if funcion == "actualizar_embeddings_lote":
+            actualizadas = 0
+            for f in filas:
+                if f["id"] in normas:
+                    normas[f["id"]]["embedding"] = f["embedding"]
+                    actualizadas += 1
+            return actualizadas
+        if funcion == "guardar_fragmentos_lote":
+            ids = {f["id"] for f in filas}
+            for clave in [k for k, fr in fragmentos.items() if fr["norma_id"] in ids]:
+                del fragmentos[clave]
+            insertados = 0
+            for f in filas:
+                for fr in f.get("fragmentos") or []:
+                    insertados += 1
+                    fragmentos[f"{f['id']}:{fr['orden']}"] = dict(fr, norma_id=f["id"])
+                if f["id"] in normas:
+                    normas[f["id"]]["embedding"] = f["embedding"]
+            return insertados
+        if funcion == "aplicar_diferencias_articulos":
+            return self._aplicar_diferencias_articulos(filas)
+        if funcion == "actualizar_embeddings_articulos_lote":
+            articulos = self.tablas["bibliotecalegal_articulos"]
+            actualizadas = 0
+            for f in filas:
+                if f["id"] in articulos:
+                    articulos[f["id"]]["embedding"] = f["embedding"]
+                    actualizadas += 1
+            return actualizadas
+        raise KeyError(f"RPC desconocida: {funcion}")
+
+    def _aplicar_diferencias_articulos(self, filas: List[Dict]) -> int:
+        normas, articulos = self.tablas["bibliotecalegal"], self.tablas["bibliotecalegal_articulos"]
+        por_nombre = {n.get("nombre_norma"): n for n in normas.values()}
+        cambios = 0
+        for f in filas:
+            norma = por_nombre.get(f["nombre_norma"])
+            if norma is None:
+                continue
+            propios = {a["articulo"]: a for a in articulos.values() if a["norma_id"] == norma["id"]}
+            for articulo in f.get("eliminados") or []:
+                if articulo in propios:
+                    del articulos[propios.pop(articulo)["id"]]
+                    cambios += 1
+            # Como la RPC: primero se apartan todos los reubicados y luego se les asigna el id nuevo,
+            # así una cadena de renumerados (art-3 -> art-4 -> art-5) no choca consigo misma
+            movidos = [(r, propios.pop(r["id_anterior"], None)) for r in f.get("reubicados") or []]
+            for r, fila in movidos:
+                if fila is None:
+                    continue
+                if r["articulo"] in propios:
+                    raise ValueError(f"duplicate key (norma_id, articulo)=({norma['id']}, {r['articulo']})")
+                fila.update(articulo=r["articulo"], orden=r["orden"], encabezado=r["encabezado"])
+                if r.get("texto") is not None:
+                    fila["texto"] = r["texto"]
+                propios[r["articulo"]] = fila
+            for u in f.get("upserts") or []:
+                fila = propios.get(u["articulo"])
+                if fila is None:
+                    fila = {"id": self._nuevo_id(), "norma_id": norma["id"]}
+                    articulos[fila["id"]] = propios[u["articulo"]] = fila
+                fila.update(u, embedding=None)
+                cambios += 1
+            norma["hash_articulos"] = f["hash_articulos"]
+        return cambios
+
+    def cerrar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+# --- Backend de embeddings ---
+
+def agregar_ruta_lazaro_vector():
+    ruta = os.path.join(os.path.dirname(RAIZ), "lazaro_vector")
+    if ruta not in sys.path:
+        sys.path.insert(0, ruta)
+
+
+def backend_embedding_simulado(dimension: int = 768, latencia: float = 0.0, latencia_por_texto: float = 0.0,
+                               prob_falla: float = 0.0, semilla: int = 0):
+    """
+    `EmbeddingBackendFalso` (vectores deterministas por texto) con la latencia de una API remota:
+    `latencia` fija por llamada más `latencia_por_texto` por fragmento, y fallas con probabilidad
+    `prob_falla` para ejercitar los reintentos del pipeline.
+    """
+    agregar_ruta_lazaro_vector()
+    from embedding_pipeline import EmbeddingBackendFalso
+
+    class BackendEmbeddingSimulado(EmbeddingBackendFalso):
+        def __init__(self):
+            super().__init__(dimension=dimension, latencia=0.0)
+            self.fallas_inyectadas = 0
+            self._rng = random.Random(semilla)
+            self._lock = threading.Lock()
+
+        def __call__(self, textos: List[str]) -> List[List[float]]:
+            with self._lock:
+                falla = self._rng.random() < prob_falla
+            if latencia or latencia_por_texto:
+                time.sleep(latencia + latencia_por_texto * len(textos))
+            if falla:
+                with self._lock:
+                    self.fallas_inyectadas += 1
+                raise RuntimeError("503 falla inyectada por el backend simulado")
+            return super().__call__(textos)
+
+    return BackendEmbeddingSimulado()
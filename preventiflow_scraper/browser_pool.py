@@ -0,0 +1,245 @@
+"""
+Pool de navegadores Chrome headless en procesos independientes.
+
+Cada proceso trabajador es dueño de un driver `undetected_chromedriver` y toma normas de una
+cola central, así un sitio lento solo bloquea a su trabajador y no al resto de la corrida.
+- El driver se recicla cada `paginas_por_driver` páginas o cuando deja de responder.
+- Si un proceso muere (p. ej. Chrome se cae), su norma en curso se reporta como error y se
+  levanta un trabajador de reemplazo.
+- Cada norma tiene un plazo (`timeout_tarea`): si el trabajador no responde a tiempo (Chrome
+  colgado, un sitio que nunca termina de responder) se termina el proceso, la norma se reporta
+  como error y se levanta un reemplazo.
+- Cada trabajador recibe una norma a la vez por su propio canal, de modo que el proceso
+  principal siempre sabe qué norma tiene cada uno.
+- Los resultados se entregan al proceso principal a medida que llegan (`procesar` es un generador).
+- Las tareas se piden al iterable recién cuando hay un trabajador libre, así un generador que
+  reclama trabajos de job_store.JobStore no toma leases que aún no puede atender.
+- Con `estatico_primero` (por defecto) cada trabajador usa StaticFirstStrategy: Chrome se levanta
+  recién cuando una página lo necesita y solo esas páginas cuentan para reciclar el driver.
+- Las métricas que cada trabajador registra (metricas.REGISTRO) viajan con su resultado y se
+  combinan en el registro del proceso principal.
+"""
+import os
+import sys
+import time
+import signal
+import multiprocessing as mp
+from multiprocessing.connection import wait
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from metricas import REGISTRO
+
+POOL_WORKERS = int(os.getenv("SCRAPER_POOL_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+PAGINAS_POR_DRIVER = int(os.getenv("SCRAPER_PAGINAS_POR_DRIVER", "50"))
+ESTATICO_PRIMERO = os.getenv("SCRAPER_ESTATICO_PRIMERO", "1") == "1"
+TIMEOUT_CARGA_SEGUNDOS = 60
+# Plazo por norma en un trabajador (carga, esperas de la página y reintentos incluidos)
+TIMEOUT_TAREA_SEGUNDOS = float(os.getenv("SCRAPER_TIMEOUT_TAREA", "300"))
+
+
+def _crear_driver():
+    import undetected_chromedriver as uc
+    options = uc.ChromeOptions()
+    options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    driver = uc.Chrome(options=options)
+    driver.set_page_load_timeout(TIMEOUT_CARGA_SEGUNDOS)
+    return driver
+
+
+def _driver_vivo(driver) -> bool:
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
+
+
+def _cerrar_driver(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def _trabajador(id_trabajador: int, conexion, paginas_por_driver: int, estatico_primero: bool = ESTATICO_PRIMERO):
+    # Al ser terminado por vencer su plazo, el finally cierra Chrome en vez de dejarlo huérfano
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(1))
+    driver = None
+    paginas = 0  # páginas cargadas en el navegador con el driver actual
+
+    def obtener_driver():
+        nonlocal driver, paginas
+        if driver is None:
+            driver = _crear_driver()
+            paginas = 0
+        return driver
+
+    if estatico_primero:
+        from strategies.static_first_strategy import StaticFirstStrategy
+        estrategia = StaticFirstStrategy(obtener_driver=obtener_driver)
+    else:
+        from strategies.universal_selenium_strategy import UniversalSeleniumStrategy
+        estrategia = UniversalSeleniumStrategy()
+    try:
+        while True:
+            tarea = conexion.recv()
+            if tarea is None:
+                break
+            idx, norma = tarea
+            try:
+                if estatico_primero:
+                    antes = estrategia.paginas_navegador
+                    resultado = estrategia.run(None, [norma])
+                    paginas += estrategia.paginas_navegador - antes
+                else:
+                    resultado = estrategia.run(obtener_driver(), [norma])
+                    paginas += 1
+            except Exception as e:
+                resultado = [_resultado_error(norma, f"Error al procesar: {e}")]
+                paginas = paginas_por_driver  # fuerza el reciclaje
+            # Se envía solo lo registrado durante esta tarea; el padre acumula
+            conexion.send((idx, resultado, REGISTRO.instantanea()))
+            REGISTRO.reiniciar()
+            if driver is not None and (paginas >= paginas_por_driver or not _driver_vivo(driver)):
+                print(f"[INFO] Trabajador {id_trabajador}: reciclando driver tras {paginas} páginas.")
+                _cerrar_driver(driver)
+                driver = None
+    finally:
+        if driver is not None:
+            _cerrar_driver(driver)
+
+
+def _terminar(proceso, conexion, espera: float = 5):
+    """SIGTERM (el trabajador cierra su driver) y, si no alcanza, SIGKILL."""
+    proceso.terminate()
+    proceso.join(timeout=espera)
+    if proceso.is_alive():
+        proceso.kill()
+        proceso.join(timeout=espera)
+    conexion.close()
+
+
+def _resultado_error(norma: Dict, mensaje: str) -> Dict:
+    resultado = norma.copy()
+    resultado['texto_limpio'] = mensaje
+    return resultado
+
+
+class PoolNavegadores:
+    def __init__(self, workers: int = POOL_WORKERS, paginas_por_driver: int = PAGINAS_POR_DRIVER,
+                 estatico_primero: bool = ESTATICO_PRIMERO, timeout_tarea: float = TIMEOUT_TAREA_SEGUNDOS):
+        self.workers = max(1, workers)
+        self.paginas_por_driver = max(1, paginas_por_driver)
+        self.estatico_primero = estatico_primero
+        self.timeout_tarea = timeout_tarea
+        # "spawn" evita heredar estado del proceso padre (sockets, hilos) en cada Chrome
+        self._ctx = mp.get_context("spawn")
+
+    def procesar(self, tareas: Iterable[Tuple[int, Dict]]) -> Iterator[Tuple[int, List[Dict]]]:
+        """Reparte (idx, norma) entre los trabajadores y entrega (idx, resultados) a medida que terminan."""
+        pendientes = iter(tareas)
+        agotadas = False
+        # Cada trabajador tiene su propio canal: si un proceso muere de golpe no deja
+        # bloqueada ni corrupta una cola compartida con los demás.
+        trabajadores: Dict[int, Tuple] = {}  # id -> (proceso, conexión)
+        en_curso: Dict[int, Tuple[int, Dict]] = {}  # id -> tarea asignada
+        plazos: Dict[int, float] = {}  # id -> time.monotonic() en que vence su tarea
+        siguiente_id = 0
+        ocupados = REGISTRO.medidor("cola_trabajadores_ocupados", "Trabajadores del pool con una norma asignada")
+
+        def siguiente_tarea():
+            nonlocal agotadas
+            if not agotadas:
+                try:
+                    return next(pendientes)
+                except StopIteration:
+                    agotadas = True
+            return None
+
+        def lanzar(tarea):
+            nonlocal siguiente_id
+            conexion, conexion_hijo = self._ctx.Pipe()
+            proceso = self._ctx.Process(
+                target=_trabajador,
+                args=(siguiente_id, conexion_hijo, self.paginas_por_driver, self.estatico_primero),
+                daemon=True,
+            )
+            proceso.start()
+            conexion_hijo.close()
+            trabajadores[siguiente_id] = (proceso, conexion)
+            asignar(siguiente_id, tarea)
+            siguiente_id += 1
+
+        def asignar(id_trabajador: int, tarea):
+            proceso, conexion = trabajadores[id_trabajador]
+            if tarea is not None:
+                en_curso[id_trabajador] = tarea
+                plazos[id_trabajador] = time.monotonic() + self.timeout_tarea
+                ocupados.fijar(len(en_curso))
+                conexion.send(tarea)
+            else:
+                conexion.send(None)
+                proceso.join(timeout=10)
+                del trabajadores[id_trabajador]
+
+        try:
+            for _ in range(self.workers):
+                tarea = siguiente_tarea()
+                if tarea is None:
+                    break
+                lanzar(tarea)
+            while en_curso:
+                esperables = {}
+                for id_trabajador in en_curso:
+                    proceso, conexion = trabajadores[id_trabajador]
+                    esperables[conexion] = id_trabajador
+                    esperables[proceso.sentinel] = id_trabajador
+                atendidos = set()
+                espera = max(0.0, min(plazos[i] for i in en_curso) - time.monotonic())
+                for listo in wait(list(esperables), timeout=espera):
+                    id_trabajador = esperables[listo]
+                    if id_trabajador in atendidos:
+                        continue
+                    atendidos.add(id_trabajador)
+                    proceso, conexion = trabajadores[id_trabajador]
+                    try:
+                        # El resultado puede estar en el canal aunque el proceso ya haya terminado
+                        mensaje = conexion.recv() if conexion.poll() else None
+                    except (EOFError, OSError):
+                        mensaje = None
+                    if mensaje is not None:
+                        del en_curso[id_trabajador]
+                        ocupados.fijar(len(en_curso))
+                        idx, resultado, metricas_trabajador = mensaje
+                        REGISTRO.combinar(metricas_trabajador)
+                        yield idx, resultado
+                        asignar(id_trabajador, siguiente_tarea())
+                    elif not proceso.is_alive():
+                        idx, norma = en_curso.pop(id_trabajador)
+                        ocupados.fijar(len(en_curso))
+                        REGISTRO.contador("pool_trabajadores_caidos_total", "Trabajadores que murieron con una norma en curso").inc()
+                        del trabajadores[id_trabajador]
+                        print(f"[WARN] Trabajador {id_trabajador} terminó inesperadamente (exitcode={proceso.exitcode}).")
+                        yield idx, [_resultado_error(norma, "Error al procesar: el navegador se cerró inesperadamente.")]
+                        tarea = siguiente_tarea()
+                        if tarea is not None:
+                            lanzar(tarea)
+                ahora = time.monotonic()
+                for id_trabajador in [i for i in en_curso if i not in atendidos and plazos[i] <= ahora]:
+                    idx, norma = en_curso.pop(id_trabajador)
+                    ocupados.fijar(len(en_curso))
+                    REGISTRO.contador("pool_tareas_vencidas_total", "Normas cuyo trabajador superó el plazo por tarea").inc()
+                    proceso, conexion = trabajadores.pop(id_trabajador)
+                    print(f"[WARN] Trabajador {id_trabajador}: {norma.get('nombre_norma')} superó el plazo de "
+                          f"{self.timeout_tarea:.0f} s; se reemplaza el trabajador.")
+                    _terminar(proceso, conexion)
+                    yield idx, [_resultado_error(
+                        norma, f"Error al procesar: se superó el plazo de {self.timeout_tarea:.0f} s por norma.")]
+                    tarea = siguiente_tarea()
+                    if tarea is not None:
+                        lanzar(tarea)
+        finally:
+            for proceso, _ in trabajadores.values():
+                proceso.terminate()
@@ -11,8 +11,15 @@ if not os.environ.get("SUPABASE_KEY") and os.environ.get("SUPABASE_SERVICE_ROLE_
 import uuid
 import datetime
 import json
-from typing import List, Dict
+import hashlib
+import collections.abc
+from typing import List, Dict, Optional
 from supabase import create_client, Client
+from result_sink import SumideroResultados
+from metricas import REGISTRO
+from duplicados import IndiceDuplicados, marcar_duplicados, DETECTAR_DUPLICADOS
+from articulos import diferenciar, huella_articulos
+from almacen_crudos import AlmacenCrudos, externalizar_crudos, ALMACENAR_CRUDOS
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
@@ -23,75 +30,349 @@ if SUPABASE_URL and SUPABASE_KEY:
 else:
     print("[ADVERTENCIA] Variables de entorno SUPABASE_URL y SUPABASE_KEY no definidas. Solo se guardará localmente.")
 
-def save_result(resultados: List[Dict], strategy_name: str):
-    now = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    outdir = os.path.join(os.path.dirname(__file__), "results")
-    os.makedirs(outdir, exist_ok=True)
-    filename = f"{strategy_name.replace(' ', '_').lower()}_{now}.json"
-    path = os.path.join(outdir, filename)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(resultados, f, ensure_ascii=False, indent=2)
-    print(f"[INFO] Resultado exportado local: {path}")
+def calcular_hash_contenido(texto_limpio: Optional[str], json_crudo) -> Optional[str]:
+    """
+    Hash sha256 estable del contenido de una norma (texto limpio + JSON crudo canónico).
+    Retorna None si no hay contenido que comparar.
+    """
+    if texto_limpio in (None, "") and json_crudo in (None, ""):
+        return None
+    json_canonico = json.dumps(json_crudo, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    h = hashlib.sha256()
+    h.update((texto_limpio or "").encode("utf-8"))
+    h.update(b"\x00")
+    h.update(json_canonico.encode("utf-8"))
+    return h.hexdigest()
 
-    if supabase:
-        campos_validos = [
-            "fuente", "nombre_norma", "jerarquia", "descripcion", "palabras_clave",
-            "url_publica", "url_fuente_datos", "texto_limpio", "json_crudo", "comentarios_experto", "motivo_error"
-        ]
-        for res in resultados:
-            registro = {k: v for k, v in res.items() if k in campos_validos}
-            # Soporte para campo de error
-            if res.get("status") == "error":
-                registro["motivo_error"] = res.get("texto_limpio") or "Error desconocido"
-                registro["texto_limpio"] = None
+CAMPOS_VALIDOS = [
+    "fuente", "nombre_norma", "jerarquia", "descripcion", "palabras_clave",
+    "url_publica", "url_fuente_datos", "texto_limpio", "json_crudo", "comentarios_experto", "motivo_error",
+    "duplicado_de", "json_crudo_ref"
+]
+TAMANO_LOTE_UPSERT = int(os.getenv("SUPABASE_TAMANO_LOTE", "200"))
+# Artículos por norma en bibliotecalegal_articulos (scripts/sql/20261018_create_bibliotecalegal_articulos.sql)
+SINCRONIZAR_ARTICULOS = os.getenv("SUPABASE_SINCRONIZAR_ARTICULOS", "1") == "1"
+TAMANO_LOTE_ARTICULOS = int(os.getenv("SUPABASE_TAMANO_LOTE_ARTICULOS", "20"))
+# Filas por consulta al leer el contenido de normas sin hash_contenido (json_crudo puede pesar megabytes)
+TAMANO_LOTE_LEGADO = 20
+# Filas por respuesta al leer artículos guardados (max-rows de PostgREST por defecto)
+TAMANO_PAGINA_ARTICULOS = 1000
+COLUMNAS_PREFETCH = "id, nombre_norma, hash_contenido, duplicado_de" + (", hash_articulos" if SINCRONIZAR_ARTICULOS else "")
+
+
+def _preparar_registro(res: Dict) -> Dict:
+    """Filtra y normaliza un resultado de estrategia al esquema de bibliotecalegal."""
+    registro = {k: v for k, v in res.items() if k in CAMPOS_VALIDOS}
+    # pandas entrega NaN en celdas vacías, que no es JSON válido para PostgREST
+    for k, v in registro.items():
+        if isinstance(v, float) and v != v:
+            registro[k] = None
+    # Soporte para campo de error
+    if res.get("status") == "error":
+        registro["motivo_error"] = res.get("texto_limpio") or "Error desconocido"
+        registro["texto_limpio"] = None
+        registro["json_crudo"] = None
+        registro.pop("json_crudo_ref", None)
+    else:
+        registro["motivo_error"] = None
+    # Serializar json_crudo si es necesario
+    if "json_crudo" in registro:
+        if isinstance(registro["json_crudo"], (str, bytes)):
+            try:
+                registro["json_crudo"] = json.loads(registro["json_crudo"])
+            except Exception:
                 registro["json_crudo"] = None
+        elif not isinstance(registro["json_crudo"], collections.abc.Mapping):
+            registro["json_crudo"] = None
+    return registro
+
+
+def _es_exitoso(registro: Dict) -> bool:
+    return registro.get("texto_limpio") not in [None, ""] and (
+        registro.get("json_crudo") not in [None, ""] or bool(registro.get("json_crudo_ref")))
+
+
+def _externalizar_crudo(registro: Dict):
+    """
+    Calcula el hash de contenido con el payload completo y, con ALMACENAR_CRUDOS, deja en la fila
+    solo `json_crudo_ref` (ver almacen_crudos.py). Un resultado reproducido desde los segmentos
+    trae solo la referencia: el payload se lee del almacén local.
+    """
+    json_crudo = registro.get("json_crudo")
+    if json_crudo is None and registro.get("json_crudo_ref"):
+        json_crudo = _almacen().obtener(registro["json_crudo_ref"])
+        if json_crudo is None:
+            print(f"[WARN] {registro.get('nombre_norma')}: {registro['json_crudo_ref']} no está en el almacén local.")
+    registro["hash_contenido"] = calcular_hash_contenido(registro.get("texto_limpio"), json_crudo)
+    if ALMACENAR_CRUDOS:
+        if not registro.get("json_crudo_ref"):
+            registro["json_crudo_ref"] = _almacen().guardar(json_crudo)
+        registro["json_crudo"] = None
+    else:
+        registro["json_crudo"] = json_crudo
+        registro.pop("json_crudo_ref", None)
+
+
+def _prefetch_existentes(cliente: Client, nombres: List[str], tamano_lote: int) -> Dict[str, Dict]:
+    """Trae en pocas consultas (una por bloque) el id, los hashes y duplicado_de de las normas que ya existen."""
+    existentes: Dict[str, Dict] = {}
+    for i in range(0, len(nombres), tamano_lote):
+        bloque = nombres[i:i + tamano_lote]
+        query = cliente.table("bibliotecalegal").select(COLUMNAS_PREFETCH).in_("nombre_norma", bloque).execute()
+        filas = query.data if hasattr(query, 'data') else query["data"]
+        for fila in filas or []:
+            existentes.setdefault(fila["nombre_norma"], fila)
+    return existentes
+
+
+def _completar_hashes_legado(cliente: Client, existentes: Dict[str, Dict]):
+    """
+    Normas guardadas antes de que existiera hash_contenido (NULL): calcula su hash desde el
+    contenido guardado, para que una norma que no cambió no se reescriba ni se re-vectorice.
+    Marca `hash_legado` y deja el texto guardado en la entrada, para comparar el texto solo.
+    """
+    legado = {e["id"]: e for e in existentes.values() if e.get("hash_contenido") is None}
+    ids = list(legado)
+    columnas = "id, texto_limpio, json_crudo" + (", json_crudo_ref" if ALMACENAR_CRUDOS else "")
+    for i in range(0, len(ids), TAMANO_LOTE_LEGADO):
+        query = cliente.table("bibliotecalegal").select(columnas).in_("id", ids[i:i + TAMANO_LOTE_LEGADO]).execute()
+        filas = query.data if hasattr(query, 'data') else query["data"]
+        for fila in filas or []:
+            json_crudo = fila.get("json_crudo")
+            if json_crudo is None and fila.get("json_crudo_ref"):
+                json_crudo = _almacen().obtener(fila["json_crudo_ref"])
+            existente = legado[fila["id"]]
+            existente["hash_contenido"] = calcular_hash_contenido(fila.get("texto_limpio"), json_crudo)
+            existente["hash_legado"] = True
+            existente["texto_limpio"] = fila.get("texto_limpio")
+
+
+def _prefetch_articulos(cliente: Client, norma_ids: List[str]) -> Dict[str, List[Dict]]:
+    """Versión guardada de los artículos (sin texto) de varias normas, leída por bloques y paginada por id."""
+    guardados: Dict[str, List[Dict]] = {nid: [] for nid in norma_ids}
+    for i in range(0, len(norma_ids), TAMANO_LOTE_ARTICULOS):
+        bloque = norma_ids[i:i + TAMANO_LOTE_ARTICULOS]
+        ultimo_id = None
+        while True:
+            consulta = cliente.table("bibliotecalegal_articulos").select(
+                "id, norma_id, articulo, orden, encabezado, hash_texto").in_("norma_id", bloque)
+            if ultimo_id is not None:
+                consulta = consulta.gt("id", ultimo_id)
+            query = consulta.order("id").limit(TAMANO_PAGINA_ARTICULOS).execute()
+            filas = (query.data if hasattr(query, 'data') else query["data"]) or []
+            for fila in filas:
+                guardados.setdefault(fila["norma_id"], []).append({
+                    "id": fila["articulo"], "orden": fila["orden"], "encabezado": fila.get("encabezado"),
+                    "hash": fila["hash_texto"]})
+            if len(filas) < TAMANO_PAGINA_ARTICULOS:
+                break
+            ultimo_id = filas[-1]["id"]
+    return guardados
+
+
+def _sincronizar_articulos(cliente: Client, pendientes: List[tuple], existentes: Dict[str, Dict],
+                           resultados_filas: List[Dict]):
+    """
+    Lleva bibliotecalegal_articulos a la versión nueva de cada norma enviando solo las diferencias
+    (articulos.diferenciar) por la RPC `aplicar_diferencias_articulos`. `pendientes`: (posición,
+    nombre_norma, artículos). Una norma cuya huella de artículos coincide con la guardada no se toca.
+    """
+    huellas = {i: huella_articulos(articulos) for i, _, articulos in pendientes}
+    por_sincronizar = [(i, nombre, articulos) for i, nombre, articulos in pendientes
+                       if (existentes.get(nombre) or {}).get("hash_articulos") != huellas[i]]
+    if not por_sincronizar:
+        return
+    ids = [existentes[nombre]["id"] for _, nombre, _ in por_sincronizar if nombre in existentes]
+    with REGISTRO.etapa("escritura_db", elementos=len(ids), operacion="prefetch_articulos"):
+        guardados = _prefetch_articulos(cliente, ids) if ids else {}
+
+    cargas = []  # (posición, fila para la RPC)
+    for i, nombre, articulos in por_sincronizar:
+        anteriores = guardados.get(existentes[nombre]["id"], []) if nombre in existentes else []
+        diferencias = diferenciar(anteriores, articulos)
+        resultados_filas[i]["articulos"] = diferencias.resumen()
+        for tipo, cantidad in diferencias.resumen().items():
+            if tipo != "sin_cambios" and cantidad:
+                REGISTRO.contador("articulos_cambios_total", "Artículos escritos o borrados por tipo de cambio",
+                                  tipo=tipo).inc(cantidad)
+        cargas.append((i, {
+            "nombre_norma": nombre,
+            "hash_articulos": huellas[i],
+            "upserts": [{"articulo": r["id"], "orden": r["orden"], "encabezado": r.get("encabezado"),
+                         "texto": r["texto"], "hash_texto": r["hash"]}
+                        for r in diferencias.agregados + diferencias.modificados],
+            "eliminados": diferencias.eliminados,
+            "reubicados": [{"articulo": r["id"], "id_anterior": r["id_anterior"], "orden": r["orden"],
+                            "encabezado": r["encabezado"], "texto": r.get("texto")} for r in diferencias.reubicados],
+        }))
+    for j in range(0, len(cargas), TAMANO_LOTE_ARTICULOS):
+        bloque = cargas[j:j + TAMANO_LOTE_ARTICULOS]
+        try:
+            with REGISTRO.etapa("escritura_db", elementos=len(bloque), operacion="articulos"):
+                cliente.rpc("aplicar_diferencias_articulos", {"filas": [c for _, c in bloque]}).execute()
+        except Exception as e:
+            # La fila de la norma ya quedó guardada; sin hash_articulos nuevo se reintenta en la próxima corrida
+            for i, _ in bloque:
+                resultados_filas[i]["detalle"] = f"Artículos no sincronizados: {e}"
+
+
+def guardar_lote(resultados: List[Dict], cliente: Optional[Client] = None,
+                 tamano_lote: int = TAMANO_LOTE_UPSERT) -> List[Dict]:
+    """
+    Persiste un lote de resultados en bibliotecalegal con upserts por bloques (conflicto en nombre_norma).
+
+    Mantiene las reglas de save_result: un error nunca sobrescribe una norma existente y
+    las normas sin cambios de contenido (mismo hash) no se reescriben, salvo que cambie su marca de
+    casi duplicado (`duplicado_de`, si el resultado la trae; ver duplicados.py). Las filas
+    guardadas antes de hash_contenido se comparan con su contenido guardado (_completar_hashes_legado).
+    Con ALMACENAR_CRUDOS el JSON crudo va al almacén local y la fila lleva solo `json_crudo_ref`.
+    Si el resultado trae `articulos` (LeychileApiStrategy), además sincroniza solo los artículos que
+    cambiaron (ver _sincronizar_articulos). Eso no reemplaza la fila de la norma: si cambió, se
+    reescribe completa (texto_limpio, json_crudo o su referencia) y su embedding queda en NULL.
+    Retorna un resultado por fila de entrada: {"nombre_norma", "accion", "detalle"} con accion en
+    insertado | actualizado | sin_cambios | omitido | error, y "articulos" (conteo por tipo de cambio)
+    si se sincronizaron.
+    """
+    cliente = cliente or supabase
+    registros = [_preparar_registro(res) for res in resultados]
+    resultados_filas: List[Dict] = [
+        {"nombre_norma": r.get("nombre_norma"), "accion": "omitido", "detalle": None} for r in registros
+    ]
+
+    # Si una norma viene repetida en el lote, gana la última aparición (un upsert no puede tocar dos veces la misma fila)
+    ultima_posicion = {r.get("nombre_norma"): i for i, r in enumerate(registros) if r.get("nombre_norma")}
+    nombres = list(ultima_posicion)
+    with REGISTRO.etapa("escritura_db", elementos=len(nombres), operacion="prefetch"):
+        existentes = _prefetch_existentes(cliente, nombres, tamano_lote) if nombres else {}
+        if any(e.get("hash_contenido") is None for e in existentes.values()):
+            _completar_hashes_legado(cliente, existentes)
+    ahora = datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+    a_escribir = []  # (posición, registro)
+    hashes_legado = []  # (id, hash): filas sin cambios a las que solo les falta hash_contenido
+    for i, registro in enumerate(registros):
+        nombre_norma = registro.get("nombre_norma")
+        if nombre_norma and ultima_posicion[nombre_norma] != i:
+            resultados_filas[i]["detalle"] = "Repetida en el lote; se usa la última aparición."
+            continue
+        es_exitoso = _es_exitoso(registro)
+        if es_exitoso:
+            _externalizar_crudo(registro)
+            registro["contenido_actualizado_en"] = ahora
+        existente = existentes.get(nombre_norma)
+        if existente:
+            if not es_exitoso:
+                resultados_filas[i]["detalle"] = "El nuevo resultado es error o nulo; se conserva el registro existente."
+            elif existente.get("hash_contenido") == registro["hash_contenido"] and (
+                    "duplicado_de" not in registro or existente.get("duplicado_de") == registro["duplicado_de"]):
+                resultados_filas[i]["accion"] = "sin_cambios"
+                if existente.get("hash_legado"):
+                    hashes_legado.append((existente["id"], registro["hash_contenido"]))
             else:
-                registro["motivo_error"] = None
-            # Serializar json_crudo si es necesario
-            if "json_crudo" in registro:
-                import collections.abc
-                if isinstance(registro["json_crudo"], (str, bytes)):
-                    try:
-                        registro["json_crudo"] = json.loads(registro["json_crudo"])
-                    except Exception:
-                        registro["json_crudo"] = None
-                elif not isinstance(registro["json_crudo"], collections.abc.Mapping):
-                    registro["json_crudo"] = None
-            print("[DEBUG] Registro a insertar en Supabase:")
-            print(json.dumps(registro, indent=2, ensure_ascii=False))
-
-            # --- Lógica para evitar duplicados y solo actualizar si hay datos exitosos ---
-            nombre_norma = registro.get("nombre_norma")
-            existe = False
-            if nombre_norma:
-                query = supabase.table("bibliotecalegal").select("id, texto_limpio, json_crudo").eq("nombre_norma", nombre_norma).execute()
-                registros_existentes = query.data if hasattr(query, 'data') else query["data"]
-                existe = registros_existentes and len(registros_existentes) > 0
-
-            es_exitoso = registro.get("texto_limpio") not in [None, ""] and registro.get("json_crudo") not in [None, ""]
-
-            if existe:
-                if es_exitoso:
-                    # Actualizar solo si el nuevo resultado es exitoso
-                    id_existente = registros_existentes[0]["id"]
-                    print(f"[INFO] Actualizando registro existente para '{nombre_norma}' (id={id_existente})")
-                    data, error = supabase.table("bibliotecalegal").update(registro).eq("id", id_existente).execute()
-                    if error:
-                        print(f"[ERROR] Falló actualización en Supabase para {nombre_norma}: {error}")
-                    else:
-                        print(f"[INFO] Registro actualizado en Supabase: {nombre_norma}")
-                else:
-                    print(f"[INFO] Registro existente para '{nombre_norma}' no se actualiza porque el nuevo resultado es error o nulo.")
-                continue  # No insertar duplicado
-            else:
-                if es_exitoso or registro.get("motivo_error"):
-                    print(f"[INFO] Insertando nuevo registro para '{nombre_norma}'")
-                    data, error = supabase.table("bibliotecalegal").insert(registro).execute()
-                    if error:
-                        print(f"[ERROR] Falló inserción en Supabase para {nombre_norma}: {error}")
-                    else:
-                        print(f"[INFO] Registro insertado en Supabase: {nombre_norma}")
-                else:
-                    print(f"[INFO] No se inserta registro para '{nombre_norma}' porque el resultado es nulo y sin error.")
+                # El embedding se invalida para que la etapa de vectorización reprocese solo esta norma
+                # (en una fila anterior a hash_contenido, solo si cambió el texto que se vectoriza)
+                if not existente.get("hash_legado") or existente.get("texto_limpio") != registro.get("texto_limpio"):
+                    registro["embedding"] = None
+                resultados_filas[i]["accion"] = "actualizado"
+                a_escribir.append((i, registro))
+        elif es_exitoso or registro.get("motivo_error"):
+            resultados_filas[i]["accion"] = "insertado"
+            a_escribir.append((i, registro))
+        else:
+            resultados_filas[i]["detalle"] = "Resultado nulo y sin error."
+
+    # PostgREST exige las mismas columnas en todas las filas de un upsert: se agrupa por conjunto de claves
+    grupos: Dict[tuple, List] = {}
+    for i, registro in a_escribir:
+        grupos.setdefault(tuple(sorted(registro)), []).append((i, registro))
+    for filas in grupos.values():
+        for j in range(0, len(filas), tamano_lote):
+            bloque = filas[j:j + tamano_lote]
+            try:
+                with REGISTRO.etapa("escritura_db", elementos=len(bloque), operacion="upsert"):
+                    cliente.table("bibliotecalegal").upsert([r for _, r in bloque], on_conflict="nombre_norma").execute()
+            except Exception as e:
+                for i, _ in bloque:
+                    resultados_filas[i]["accion"] = "error"
+                    resultados_filas[i]["detalle"] = str(e)
+
+    for id_norma, hash_contenido in hashes_legado:
+        try:
+            with REGISTRO.etapa("escritura_db", operacion="hash_legado"):
+                cliente.table("bibliotecalegal").update({"hash_contenido": hash_contenido}).eq("id", id_norma).execute()
+        except Exception as e:
+            # Sin el hash se vuelve a calcular en la próxima corrida; la fila no cambió
+            print(f"[WARN] No se pudo completar hash_contenido de {id_norma}: {e}")
+
+    if SINCRONIZAR_ARTICULOS:
+        pendientes_articulos = [
+            (i, registro["nombre_norma"], resultados[i]["articulos"]) for i, registro in enumerate(registros)
+            if resultados_filas[i]["accion"] in ("insertado", "actualizado", "sin_cambios") and _es_exitoso(registro)
+            and isinstance(resultados[i].get("articulos"), list) and resultados[i]["articulos"]]
+        if pendientes_articulos:
+            _sincronizar_articulos(cliente, pendientes_articulos, existentes, resultados_filas)
+    for fila in resultados_filas:
+        REGISTRO.contador("persistencia_filas_total", "Filas por acción de guardar_lote", accion=fila["accion"]).inc()
+    return resultados_filas
+
+
+_sumideros: Dict[str, SumideroResultados] = {}
+_indice_duplicados: Optional[IndiceDuplicados] = None
+_almacen_crudos: Optional[AlmacenCrudos] = None
+
+
+def _sumidero(strategy_name: str) -> SumideroResultados:
+    """Un sumidero por estrategia y proceso: las llamadas sucesivas agregan al mismo segmento."""
+    if strategy_name not in _sumideros:
+        _sumideros[strategy_name] = SumideroResultados(prefijo=strategy_name)
+    return _sumideros[strategy_name]
+
+
+def _indice() -> IndiceDuplicados:
+    global _indice_duplicados
+    if _indice_duplicados is None:
+        _indice_duplicados = IndiceDuplicados()
+    return _indice_duplicados
+
+
+def _almacen() -> AlmacenCrudos:
+    global _almacen_crudos
+    if _almacen_crudos is None:
+        _almacen_crudos = AlmacenCrudos()
+    return _almacen_crudos
+
+
+def save_result(resultados: List[Dict], strategy_name: str):
+    # Los casi duplicados se guardan marcados (duplicado_de) y vectorize_database.py los salta
+    if DETECTAR_DUPLICADOS:
+        resultados = marcar_duplicados(resultados, _indice())
+    sumidero = _sumidero(strategy_name)
+    if ALMACENAR_CRUDOS:
+        # Los segmentos guardan la referencia; el payload queda una sola vez en el almacén
+        resultados = externalizar_crudos(resultados, _almacen())
+        escritos = sumidero.escribir(
+            [{k: v for k, v in r.items() if k != "json_crudo"} if r and r.get("json_crudo_ref") else r
+             for r in resultados], estrategia=strategy_name)
+    else:
+        escritos = sumidero.escribir(resultados, estrategia=strategy_name)
+    print(f"[INFO] {escritos} resultados agregados a {sumidero.segmento}")
+
+    if supabase:
+        filas = guardar_lote(resultados)
+        for fila in filas:
+            if fila["accion"] == "error":
+                print(f"[ERROR] Falló guardado en Supabase para {fila['nombre_norma']}: {fila['detalle']}")
+        resumen = {}
+        for fila in filas:
+            resumen[fila["accion"]] = resumen.get(fila["accion"], 0) + 1
+        print(f"[INFO] Supabase ({len(filas)} registros): " + ", ".join(f"{k}={v}" for k, v in sorted(resumen.items())))
+        cambios_articulos = {}
+        for fila in filas:
+            for tipo, cantidad in (fila.get("articulos") or {}).items():
+                cambios_articulos[tipo] = cambios_articulos.get(tipo, 0) + cantidad
+        if cambios_articulos:
+            print("[INFO] Artículos: " + ", ".join(f"{k}={v}" for k, v in sorted(cambios_articulos.items())))
+        return filas
     else:
         print("[INFO] Saltando guardado en Supabase por falta de configuración.")
+        return []
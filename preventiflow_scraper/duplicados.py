@@ -0,0 +1,261 @@
+"""
+Índice de casi-duplicados sobre `texto_limpio` (MinHash + LSH), persistido en SQLite.
+
+Una misma ley llega por varias URLs (página pública, API, espejos de ministerios). Antes de
+guardar, `save_result` (database_manager.py) consulta este índice: si el texto de una norma se
+parece en al menos `umbral` (similitud de Jaccard estimada sobre secuencias de 5 palabras) al de
+otra ya vista, la fila se guarda con `duplicado_de = <nombre_norma original>` y
+vectorize_database.py no la vectoriza (scripts/sql/20261018_add_duplicado_de_bibliotecalegal.sql).
+
+- Firma: MinHash de una sola permutación (un hash blake2b por secuencia de palabras, repartido en
+  `NUM_PERMUTACIONES` casillas) con densificación por rotación para las casillas vacías. Sin numpy:
+  cuesta un hash por secuencia en vez de uno por secuencia y permutación.
+- LSH: la firma se corta en `BANDAS` bandas; dos textos son candidatos si coinciden en alguna banda
+  completa, y se confirma comparando las firmas enteras. Con 16 bandas de 8 valores, un par con
+  similitud 0.9 queda como candidato con probabilidad > 0.9998.
+- Solo los originales se indexan por banda: al registrarse, un duplicado apunta a un original, nunca a otro
+  duplicado. El índice se construye a medida que llegan resultados; `python duplicados.py --sembrar`
+  lo carga con lo que ya está en bibliotecalegal y corrige `duplicado_de` donde haga falta.
+
+Variables de entorno: SCRAPER_DETECTAR_DUPLICADOS, SCRAPER_DUPLICADOS (ruta), SCRAPER_DUPLICADO_UMBRAL.
+Benchmark: benchmarks/bench_duplicados.py.
+"""
+import os
+import re
+import sys
+import time
+import array
+import sqlite3
+import hashlib
+import argparse
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from metricas import REGISTRO
+
+DETECTAR_DUPLICADOS = os.getenv("SCRAPER_DETECTAR_DUPLICADOS", "1") == "1"
+DUPLICADOS_PATH = os.getenv(
+    "SCRAPER_DUPLICADOS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "duplicados.sqlite3"))
+UMBRAL_DUPLICADO = float(os.getenv("SCRAPER_DUPLICADO_UMBRAL", "0.9"))
+PALABRAS_POR_SECUENCIA = 5
+NUM_PERMUTACIONES = 128
+BANDAS = 16
+# Con menos secuencias la mayoría de las casillas queda vacía y la estimación no sirve
+MIN_SECUENCIAS = 50
+ESPERA_BLOQUEO_SEGUNDOS = 30
+
+_PALABRAS = re.compile(r"\w+")
+_MAXIMO = (1 << 64) - 1
+# Desplazamiento por casilla recorrida al copiar una casilla vecina (densificación por rotación)
+_ROTACION = 0x9E3779B97F4A7C15
+
+
+def firma_minhash(texto: Optional[str], palabras_por_secuencia: int = PALABRAS_POR_SECUENCIA,
+                  num_permutaciones: int = NUM_PERMUTACIONES) -> Optional[List[int]]:
+    """
+    Firma de `num_permutaciones` enteros de 64 bits del texto (sin mayúsculas ni puntuación),
+    o None si el texto es demasiado corto para compararlo.
+    """
+    if not texto:
+        return None
+    palabras = _PALABRAS.findall(texto.casefold())
+    n = len(palabras) - palabras_por_secuencia + 1
+    if n < MIN_SECUENCIAS:
+        return None
+    casillas = [_MAXIMO] * num_permutaciones
+    blake2b = hashlib.blake2b
+    for secuencia in {" ".join(palabras[i:i + palabras_por_secuencia]) for i in range(n)}:
+        h = int.from_bytes(blake2b(secuencia.encode("utf-8"), digest_size=8).digest(), "little")
+        casilla = h % num_permutaciones
+        if h < casillas[casilla]:
+            casillas[casilla] = h
+    # Una casilla vacía toma el valor de la siguiente no vacía (circular), desplazado según la distancia
+    for i, valor in enumerate(casillas):
+        if valor == _MAXIMO:
+            for salto in range(1, num_permutaciones):
+                vecino = casillas[(i + salto) % num_permutaciones]
+                if vecino != _MAXIMO:
+                    casillas[i] = (vecino + salto * _ROTACION) & _MAXIMO
+                    break
+    return casillas
+
+
+def similitud(firma_a: List[int], firma_b: List[int]) -> float:
+    """Similitud de Jaccard estimada: fracción de casillas iguales."""
+    return sum(1 for a, b in zip(firma_a, firma_b) if a == b) / len(firma_a)
+
+
+def _a_blob(firma: List[int]) -> bytes:
+    return array.array("Q", firma).tobytes()
+
+
+def _de_blob(blob: bytes) -> List[int]:
+    return array.array("Q", blob).tolist()
+
+
+def _bandas(firma: List[int], bandas: int) -> List[Tuple[int, int]]:
+    filas = len(firma) // bandas
+    return [(b, int.from_bytes(hashlib.blake2b(_a_blob(firma[b * filas:(b + 1) * filas]), digest_size=8).digest(),
+                               "big", signed=True))
+            for b in range(bandas)]
+
+
+class IndiceDuplicados:
+    """Índice incremental de casi-duplicados por clave (nombre_norma). Seguro entre procesos (SQLite en WAL)."""
+
+    def __init__(self, ruta: str = DUPLICADOS_PATH, umbral: float = UMBRAL_DUPLICADO, bandas: int = BANDAS):
+        if NUM_PERMUTACIONES % bandas:
+            raise ValueError(f"bandas ({bandas}) debe dividir a {NUM_PERMUTACIONES}")
+        self.umbral = umbral
+        self.bandas = bandas
+        self._db = sqlite3.connect(ruta, timeout=ESPERA_BLOQUEO_SEGUNDOS, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS documentos (
+                clave TEXT PRIMARY KEY,
+                firma BLOB NOT NULL,
+                duplicado_de TEXT,
+                similitud REAL,
+                actualizado REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS bandas (
+                banda INTEGER NOT NULL,
+                valor INTEGER NOT NULL,
+                clave TEXT NOT NULL,
+                PRIMARY KEY (banda, valor, clave)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_bandas_clave ON bandas(clave);
+        """)
+
+    def _mejor_original(self, clave: str, firma: List[int], bandas: List[Tuple[int, int]]) -> Optional[Tuple[str, float]]:
+        candidatas = set()
+        for banda, valor in bandas:
+            candidatas.update(c for (c,) in self._db.execute(
+                "SELECT clave FROM bandas WHERE banda = ? AND valor = ?", (banda, valor)))
+        candidatas.discard(clave)
+        mejor = None
+        for candidata in sorted(candidatas):
+            fila = self._db.execute("SELECT firma FROM documentos WHERE clave = ?", (candidata,)).fetchone()
+            if not fila:
+                continue
+            s = similitud(firma, _de_blob(fila[0]))
+            if s >= self.umbral and (mejor is None or s > mejor[1]):
+                mejor = (candidata, s)
+        return mejor
+
+    def registrar(self, clave: str, texto: Optional[str]) -> Optional[Tuple[str, float]]:
+        """
+        Agrega (o reemplaza) el texto de `clave` y retorna (clave_original, similitud) si es casi
+        duplicado de otro ya registrado, o None si es original (o demasiado corto para compararlo).
+        """
+        firma = firma_minhash(texto)
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            self._db.execute("DELETE FROM bandas WHERE clave = ?", (clave,))
+            if firma is None:
+                self._db.execute("DELETE FROM documentos WHERE clave = ?", (clave,))
+                self._db.execute("COMMIT")
+                return None
+            bandas = _bandas(firma, self.bandas)
+            original = self._mejor_original(clave, firma, bandas)
+            self._db.execute(
+                "INSERT INTO documentos (clave, firma, duplicado_de, similitud, actualizado) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(clave) DO UPDATE SET firma = excluded.firma, duplicado_de = excluded.duplicado_de, "
+                "similitud = excluded.similitud, actualizado = excluded.actualizado",
+                (clave, _a_blob(firma), original[0] if original else None, original[1] if original else None,
+                 time.time()))
+            if original is None:
+                self._db.executemany("INSERT OR IGNORE INTO bandas (banda, valor, clave) VALUES (?, ?, ?)",
+                                     [(b, v, clave) for b, v in bandas])
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        return original
+
+    def duplicado_de(self, clave: str) -> Optional[str]:
+        fila = self._db.execute("SELECT duplicado_de FROM documentos WHERE clave = ?", (clave,)).fetchone()
+        return fila[0] if fila else None
+
+    def resumen(self) -> Dict[str, int]:
+        total, duplicados = self._db.execute(
+            "SELECT COUNT(*), COUNT(duplicado_de) FROM documentos").fetchone()
+        return {"documentos": total, "originales": total - duplicados, "duplicados": duplicados}
+
+    def cerrar(self):
+        self._db.close()
+
+
+def marcar_duplicados(resultados: Iterable[Dict], indice: IndiceDuplicados) -> List[Dict]:
+    """
+    Copia de `resultados` donde cada norma exitosa lleva `duplicado_de` (None si es original).
+    Los errores no se registran ni se marcan: no deben desplazar a la norma guardada.
+    """
+    marcados = []
+    for res in resultados:
+        res = dict(res)
+        texto = res.get("texto_limpio")
+        if res.get("status") != "error" and res.get("nombre_norma") and isinstance(texto, str) and texto:
+            with REGISTRO.etapa("deduplicacion") as etapa:
+                etapa.bytes = len(texto)
+                original = indice.registrar(res["nombre_norma"], texto)
+            res["duplicado_de"] = original[0] if original else None
+            if original:
+                print(f"[INFO] '{res['nombre_norma']}' es casi duplicado de '{original[0]}' "
+                      f"(similitud {original[1]:.2f}); no se vectorizará.")
+                REGISTRO.contador("duplicados_detectados_total", "Normas marcadas como casi duplicado").inc()
+        marcados.append(res)
+    return marcados
+
+
+def sembrar_desde_supabase(cliente, indice: IndiceDuplicados, tamano_pagina: int = 200,
+                           aplicar: bool = True) -> Dict[str, int]:
+    """
+    Registra en el índice todas las normas de bibliotecalegal (en orden de id) y, con `aplicar`,
+    actualiza `duplicado_de` en las filas cuyo valor cambió.
+    """
+    conteo = {"leidas": 0, "duplicados": 0, "corregidas": 0}
+    ultimo_id = None
+    while True:
+        consulta = cliente.table("bibliotecalegal").select("id, nombre_norma, texto_limpio, duplicado_de")
+        if ultimo_id is not None:
+            consulta = consulta.gt("id", ultimo_id)
+        response = consulta.order("id").limit(tamano_pagina).execute()
+        filas = response.data if hasattr(response, 'data') else response["data"]
+        for fila in filas or []:
+            conteo["leidas"] += 1
+            if not fila.get("nombre_norma"):
+                continue
+            original = indice.registrar(fila["nombre_norma"], fila.get("texto_limpio"))
+            nuevo = original[0] if original else None
+            if nuevo:
+                conteo["duplicados"] += 1
+            if nuevo != fila.get("duplicado_de"):
+                conteo["corregidas"] += 1
+                print(f"[INFO] {fila['nombre_norma']}: duplicado_de {fila.get('duplicado_de')!r} -> {nuevo!r}")
+                if aplicar:
+                    cliente.table("bibliotecalegal").update({"duplicado_de": nuevo}).eq("id", fila["id"]).execute()
+        if not filas or len(filas) < tamano_pagina:
+            return conteo
+        ultimo_id = filas[-1]["id"]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Índice de casi-duplicados de bibliotecalegal.")
+    parser.add_argument("--sembrar", action="store_true",
+                        help="registra las normas ya guardadas en Supabase y corrige duplicado_de")
+    parser.add_argument("--simular", action="store_true", help="con --sembrar, solo informa los cambios")
+    args = parser.parse_args(argv)
+
+    indice = IndiceDuplicados()
+    if args.sembrar:
+        from database_manager import supabase
+        if not supabase:
+            print("[ERROR] Faltan SUPABASE_URL y SUPABASE_KEY.")
+            sys.exit(1)
+        print(f"[FIN] {sembrar_desde_supabase(supabase, indice, aplicar=not args.simular)}")
+    print(f"[INFO] Índice {DUPLICADOS_PATH}: {indice.resumen()}")
+    indice.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Extractor rápido de texto para los fragmentos HTML ('t') del JSON de LeyChile.
+
+Equivale a `BeautifulSoup(html, 'html.parser').get_text(separator=' ', strip=True)` pero sin
+construir un árbol ni un objeto BeautifulSoup por fragmento: un único tokenizador
+(`html.parser.HTMLParser`, el mismo que usa BeautifulSoup con 'html.parser') recorre todos
+los fragmentos en una sola pasada y va juntando los textos.
+
+Reglas replicadas de BeautifulSoup:
+- Los textos se acumulan entre eventos de etiqueta/comentario y se recortan con str.strip().
+- Se omiten comentarios, declaraciones, instrucciones de proceso y el contenido de
+  script, style, template, rt y rp.
+- Las referencias a entidades se resuelven igual que en bs4 (entidad desconocida = texto literal).
+"""
+from html.parser import HTMLParser
+from typing import Iterable, List, Optional
+
+try:
+    from bs4.dammit import EntitySubstitution
+    _ENTIDADES = EntitySubstitution.HTML_ENTITY_TO_CHARACTER
+except ImportError:  # pragma: no cover - bs4 es dependencia del scraper
+    from html.entities import html5 as _html5
+    _ENTIDADES = {k.rstrip(';'): v for k, v in _html5.items()}
+
+# Contenedores cuyo texto BeautifulSoup no devuelve en get_text()
+_ETIQUETAS_EXCLUIDAS = frozenset(('script', 'style', 'template', 'rt', 'rp'))
+
+# Las versiones recientes de bs4 exponen su resolución de referencias numéricas; se reutiliza
+# para producir exactamente el mismo carácter.
+try:
+    from bs4.builder._htmlparser import BeautifulSoupHTMLParser
+    _referencia_numerica_bs4 = getattr(BeautifulSoupHTMLParser, '_dereference_numeric_character_reference', None)
+except ImportError:  # pragma: no cover
+    _referencia_numerica_bs4 = None
+
+
+def _referencia_numerica(name: str) -> str:
+    if _referencia_numerica_bs4 is not None:
+        caracter, _, resto = _referencia_numerica_bs4(name)
+        return (caracter or '') + (resto or '')
+    # Comportamiento de bs4 <= 4.12: bytes < 256 se interpretan como windows-1252
+    codigo = int(name[1:], 16) if name[:1] in ('x', 'X') else int(name)
+    caracter = None
+    if codigo < 256:
+        try:
+            caracter = bytearray([codigo]).decode('windows-1252')
+        except UnicodeDecodeError:
+            pass
+    if not caracter:
+        try:
+            caracter = chr(codigo)
+        except (ValueError, OverflowError):
+            pass
+    return caracter or '\N{REPLACEMENT CHARACTER}'
+
+
+class _TokenizadorTexto(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self._iniciar()
+
+    def _iniciar(self):
+        self.textos: List[str] = []
+        self._actual: List[str] = []
+        self._pila_excluidas: List[str] = []
+
+    def reset(self):
+        super().reset()
+        self._iniciar()
+
+    def _cerrar_texto(self):
+        if self._actual:
+            texto = ''.join(self._actual).strip()
+            self._actual = []
+            if texto and not self._pila_excluidas:
+                self.textos.append(texto)
+
+    # --- Eventos del tokenizador ---
+    def handle_starttag(self, tag, attrs):
+        self._cerrar_texto()
+        if tag in _ETIQUETAS_EXCLUIDAS:
+            self._pila_excluidas.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._cerrar_texto()
+
+    def handle_endtag(self, tag):
+        self._cerrar_texto()
+        if tag in self._pila_excluidas:
+            # Cierra la última apertura de esa etiqueta (y lo que quedó abierto dentro)
+            posicion = len(self._pila_excluidas) - 1 - self._pila_excluidas[::-1].index(tag)
+            del self._pila_excluidas[posicion:]
+
+    def handle_data(self, data):
+        self._actual.append(data)
+
+    def handle_charref(self, name):
+        self._actual.append(_referencia_numerica(name))
+
+    def handle_entityref(self, name):
+        caracter = _ENTIDADES.get(name)
+        self._actual.append(caracter if caracter is not None else f'&{name}')
+
+    def handle_comment(self, data):
+        self._cerrar_texto()
+
+    def handle_decl(self, decl):
+        self._cerrar_texto()
+
+    def handle_pi(self, data):
+        self._cerrar_texto()
+
+    def unknown_decl(self, data):
+        self._cerrar_texto()
+        if data.upper().startswith('CDATA['):
+            self._actual.append(data[len('CDATA['):])
+            self._cerrar_texto()
+
+
+class ExtractorTexto:
+    """Reutiliza un único tokenizador para todos los fragmentos de una norma."""
+
+    def __init__(self, separador: str = ' '):
+        self.separador = separador
+        self._parser = _TokenizadorTexto()
+
+    def texto(self, html: str) -> str:
+        parser = self._parser
+        parser.reset()
+        parser.feed(html)
+        parser.close()
+        parser._cerrar_texto()
+        return self.separador.join(parser.textos)
+
+    def textos(self, htmls: Iterable[Optional[str]]) -> List[str]:
+        return [self.texto(html or '') for html in htmls]
+
+
+def extraer_texto(html: str, separador: str = ' ') -> str:
+    """Atajo para un solo fragmento."""
+    return ExtractorTexto(separador).texto(html)
@@ -0,0 +1,142 @@
+"""
+Caché persistente en disco para las respuestas de get_norma_json.
+
+- Índice SQLite por URL canónica con ETag / Last-Modified para revalidar con GET condicional.
+- Cuerpos guardados por contenido (sha256), de modo que dos URLs con la misma respuesta
+  comparten un único archivo.
+- Desalojo LRU cuando el tamaño total supera `max_bytes`.
+
+Modos (variable de entorno LEYCHILE_CACHE_MODO):
+- "normal": revalida contra el servidor (un 304 reutiliza el cuerpo guardado).
+- "offline": solo lee de la caché, nunca sale a la red.
+- "desactivado": no usa la caché.
+"""
+import os
+import time
+import sqlite3
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
+
+CACHE_DIR = os.getenv("LEYCHILE_CACHE_DIR", os.path.join(os.path.dirname(__file__), "cache_http"))
+CACHE_MAX_BYTES = int(os.getenv("LEYCHILE_CACHE_MAX_MB", "2048")) * 1024 * 1024
+CACHE_MODO = os.getenv("LEYCHILE_CACHE_MODO", "normal").lower()
+
+MODOS_VALIDOS = ("normal", "offline", "desactivado")
+
+
+def canonicalizar_url(url: str) -> str:
+    """Normaliza esquema/host en minúsculas, ordena los parámetros y quita el fragmento."""
+    partes = urlparse(url.strip())
+    query = urlencode(sorted(parse_qsl(partes.query, keep_blank_values=True)))
+    return urlunparse((partes.scheme.lower() or 'https', partes.netloc.lower(), partes.path or '/', '', query, ''))
+
+
+@dataclass
+class EntradaCache:
+    url: str
+    digest: str
+    tamano: int
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class CacheRespuestas:
+    def __init__(self, directorio: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(directorio, "blobs"), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directorio, "indice.sqlite3"))
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS entradas (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                tamano INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                accedido REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_entradas_digest ON entradas(digest)")
+        self._db.commit()
+
+    def _ruta_blob(self, digest: str) -> str:
+        return os.path.join(self.directorio, "blobs", digest[:2], digest)
+
+    def obtener(self, url: str) -> Optional[EntradaCache]:
+        fila = self._db.execute(
+            "SELECT url, digest, tamano, etag, last_modified FROM entradas WHERE url = ?",
+            (canonicalizar_url(url),)
+        ).fetchone()
+        if not fila or not os.path.exists(self._ruta_blob(fila[1])):
+            return None
+        return EntradaCache(*fila)
+
+    def leer_cuerpo(self, entrada: EntradaCache) -> str:
+        with open(self._ruta_blob(entrada.digest), "rb") as f:
+            cuerpo = f.read()
+        self._db.execute("UPDATE entradas SET accedido = ? WHERE url = ?", (time.time(), entrada.url))
+        self._db.commit()
+        return cuerpo.decode("utf-8")
+
+    @staticmethod
+    def cabeceras_condicionales(entrada: Optional[EntradaCache]) -> Dict[str, str]:
+        cabeceras = {}
+        if entrada and entrada.etag:
+            cabeceras["If-None-Match"] = entrada.etag
+        if entrada and entrada.last_modified:
+            cabeceras["If-Modified-Since"] = entrada.last_modified
+        return cabeceras
+
+    def guardar(self, url: str, texto: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        cuerpo = texto.encode("utf-8")
+        digest = hashlib.sha256(cuerpo).hexdigest()
+        ruta = self._ruta_blob(digest)
+        if not os.path.exists(ruta):
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            temporal = f"{ruta}.{os.getpid()}.tmp"
+            with open(temporal, "wb") as f:
+                f.write(cuerpo)
+            os.replace(temporal, ruta)
+        url = canonicalizar_url(url)
+        anterior = self._db.execute("SELECT digest FROM entradas WHERE url = ?", (url,)).fetchone()
+        self._db.execute(
+            "INSERT OR REPLACE INTO entradas (url, digest, tamano, etag, last_modified, accedido) VALUES (?, ?, ?, ?, ?, ?)",
+            (url, digest, len(cuerpo), etag, last_modified, time.time())
+        )
+        self._db.commit()
+        if anterior and anterior[0] != digest:
+            self._borrar_blob_si_huerfano(anterior[0])
+        self._desalojar()
+
+    def _borrar_blob_si_huerfano(self, digest: str):
+        en_uso = self._db.execute("SELECT 1 FROM entradas WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+        if not en_uso:
+            try:
+                os.remove(self._ruta_blob(digest))
+            except FileNotFoundError:
+                pass
+
+    def tamano_total(self) -> int:
+        # Los blobs compartidos se cuentan una sola vez
+        fila = self._db.execute("SELECT COALESCE(SUM(tamano), 0) FROM (SELECT DISTINCT digest, tamano FROM entradas)").fetchone()
+        return fila[0]
+
+    def _desalojar(self):
+        total = self.tamano_total()
+        if total <= self.max_bytes:
+            return
+        for url, digest in self._db.execute("SELECT url, digest FROM entradas ORDER BY accedido ASC").fetchall():
+            self._db.execute("DELETE FROM entradas WHERE url = ?", (url,))
+            en_uso = self._db.execute("SELECT 1 FROM entradas WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+            ruta = self._ruta_blob(digest)
+            if not en_uso and os.path.exists(ruta):
+                total -= os.path.getsize(ruta)
+                os.remove(ruta)
+            if total <= self.max_bytes:
+                break
+        self._db.commit()
+
+    def cerrar(self):
+        self._db.close()
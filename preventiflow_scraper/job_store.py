@@ -0,0 +1,252 @@
+"""
+Cola de trabajos durable (SQLite) para las corridas de scraping.
+
+Cada norma del CSV es un trabajo con estado, intentos y marcas de tiempo:
+- pendiente -> en_curso (reclamado con un lease que expira) -> hecho | pendiente (reintento) | fallido
+- Un trabajo en_curso cuyo lease venció (el proceso que lo tenía murió) vuelve a poder reclamarse.
+- Encolar es idempotente: al relanzar main.py con el mismo CSV, lo ya hecho no se repite y la
+  corrida continúa donde quedó. Si la fila del CSV cambió (p. ej. un nombre_norma corregido), la
+  norma guardada en la cola se actualiza.
+- `iniciar_corrida` abre una corrida nueva cuando la anterior terminó, es decir, cuando no queda
+  nada pendiente ni en curso con lease vigente; con `forzar` (main.py --nueva-corrida) la abre
+  aunque la anterior esté a medias. Así la actualización nocturna vuelve a recorrer las normas y
+  la caché HTTP / el hash de contenido evitan el trabajo repetido.
+- Cada trabajo lleva la corrida que lo encoló por última vez y solo se reclaman los de la corrida
+  actual. Al encolar en una corrida nueva, las normas del CSV vuelven a pendiente y las que ya no
+  están en el CSV quedan `retirado` (no se vuelven a procesar hasta que otro CSV las encole).
+- Quien tiene trabajos reclamados por más tiempo que el lease (resultados esperando el guardado
+  por lotes, una página lenta) debe llamar a `renovar` para que otro proceso no los tome.
+
+Varios procesos pueden vaciar la misma cola: el reclamo es atómico (BEGIN IMMEDIATE) y
+completar un trabajo solo tiene efecto si quien lo completa sigue siendo dueño del lease. Para
+repartir entre varias máquinas la base debe estar en un disco compartido con bloqueo de archivos
+confiable (SQLite sobre NFS no lo es).
+
+Variables de entorno: SCRAPER_JOB_STORE (ruta), SCRAPER_LEASE_SEGUNDOS, SCRAPER_MAX_INTENTOS.
+"""
+import os
+import json
+import time
+import socket
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from http_cache import canonicalizar_url
+
+JOB_STORE_PATH = os.getenv("SCRAPER_JOB_STORE", os.path.join(os.path.dirname(__file__), "trabajos.sqlite3"))
+DURACION_LEASE_SEGUNDOS = float(os.getenv("SCRAPER_LEASE_SEGUNDOS", "300"))
+MAX_INTENTOS = int(os.getenv("SCRAPER_MAX_INTENTOS", "3"))
+ESPERA_BLOQUEO_SEGUNDOS = 30
+
+ESTADOS = ("pendiente", "en_curso", "hecho", "fallido", "retirado")
+# Corrida actual: la última abierta (0 en una base sin corridas)
+_CORRIDA_ACTUAL = "(SELECT COALESCE(MAX(id), 0) FROM corridas)"
+
+
+def clave_norma(norma: Dict) -> str:
+    """Identificador estable de una norma: su URL pública canónica o, si no tiene, su nombre."""
+    url = norma.get("url_publica")
+    if isinstance(url, str) and url.strip():
+        return canonicalizar_url(url)
+    return f"nombre:{str(norma.get('nombre_norma', '')).strip()}"
+
+
+def id_trabajador_por_defecto() -> str:
+    return os.getenv("SCRAPER_WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+@dataclass
+class Trabajo:
+    clave: str
+    orden: int
+    norma: Dict
+    intentos: int
+
+
+class JobStore:
+    def __init__(self, ruta: str = JOB_STORE_PATH, duracion_lease: float = DURACION_LEASE_SEGUNDOS,
+                 max_intentos: int = MAX_INTENTOS):
+        self.ruta = ruta
+        self.duracion_lease = duracion_lease
+        self.max_intentos = max(1, max_intentos)
+        # isolation_level=None: las transacciones se abren explícitamente con BEGIN IMMEDIATE
+        self._db = sqlite3.connect(ruta, timeout=ESPERA_BLOQUEO_SEGUNDOS, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS trabajos (
+                clave TEXT PRIMARY KEY,
+                orden INTEGER NOT NULL,
+                norma TEXT NOT NULL,
+                estado TEXT NOT NULL DEFAULT 'pendiente',
+                intentos INTEGER NOT NULL DEFAULT 0,
+                trabajador TEXT,
+                lease_hasta REAL,
+                ultimo_error TEXT,
+                creado REAL NOT NULL,
+                actualizado REAL NOT NULL,
+                iniciado REAL,
+                terminado REAL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_trabajos_estado_orden ON trabajos(estado, orden)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS corridas (id INTEGER PRIMARY KEY AUTOINCREMENT, iniciada REAL NOT NULL)")
+        columnas = {fila[1] for fila in self._db.execute("PRAGMA table_info(trabajos)")}
+        if "corrida" not in columnas:  # bases creadas antes de las corridas
+            self._db.execute("ALTER TABLE trabajos ADD COLUMN corrida INTEGER NOT NULL DEFAULT 0")
+
+    def corrida_actual(self) -> int:
+        return self._db.execute(f"SELECT {_CORRIDA_ACTUAL}").fetchone()[0]
+
+    def encolar(self, normas: Iterable[Dict]) -> Dict[str, int]:
+        """
+        Encola las normas del CSV (en el orden recibido) en la corrida actual: las nuevas se agregan,
+        las existentes toman la norma y el orden del CSV, y las que venían de una corrida anterior
+        vuelven a pendiente. Las de corridas anteriores que no vienen en el CSV quedan retiradas.
+        Retorna {"nuevas", "reabiertas", "retiradas"}.
+        """
+        ahora = time.time()
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            corrida = self.corrida_actual()
+            fila_max, total = self._db.execute("SELECT COALESCE(MAX(orden), -1), COUNT(*) FROM trabajos").fetchone()
+            filas = []
+            for i, norma in enumerate(normas, start=fila_max + 1):
+                filas.append((clave_norma(norma), i, json.dumps(norma, ensure_ascii=False, default=str),
+                              ahora, ahora, corrida))
+            # Un trabajo en curso con lease vigente sigue siendo de quien lo reclamó
+            reabiertas = self._db.executemany(
+                "UPDATE trabajos SET estado = 'pendiente', intentos = 0, trabajador = NULL, lease_hasta = NULL, "
+                "ultimo_error = NULL WHERE clave = ? AND corrida != ? "
+                "AND NOT (estado = 'en_curso' AND lease_hasta >= ?)",
+                [(f[0], corrida, ahora) for f in filas]).rowcount
+            self._db.executemany(
+                "INSERT INTO trabajos (clave, orden, norma, creado, actualizado, corrida) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(clave) DO UPDATE SET norma = excluded.norma, orden = excluded.orden, "
+                "actualizado = excluded.actualizado, corrida = excluded.corrida", filas)
+            nuevas = self._db.execute("SELECT COUNT(*) FROM trabajos").fetchone()[0] - total
+            retiradas = self._db.execute(
+                "UPDATE trabajos SET estado = 'retirado', trabajador = NULL, lease_hasta = NULL, actualizado = ? "
+                "WHERE corrida < ? AND estado != 'retirado' AND NOT (estado = 'en_curso' AND lease_hasta >= ?)",
+                (ahora, corrida, ahora)).rowcount
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        return {"nuevas": nuevas, "reabiertas": reabiertas, "retiradas": retiradas}
+
+    def iniciar_corrida(self, forzar: bool = False) -> int:
+        """
+        Abre una corrida nueva si la actual terminó (nada pendiente ni en curso con lease vigente), o
+        siempre con `forzar`. Los trabajos vuelven a pendiente recién al encolarlos en ella (`encolar`),
+        así solo cuentan las normas del CSV de esta corrida. Retorna el número de la corrida abierta, o
+        0 si la actual sigue.
+        """
+        ahora = time.time()
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            activos = self._db.execute(
+                f"SELECT COUNT(*) FROM trabajos WHERE corrida = {_CORRIDA_ACTUAL} AND "
+                "((estado = 'pendiente' AND intentos < ?) OR (estado = 'en_curso' AND lease_hasta >= ?))",
+                (self.max_intentos, ahora)).fetchone()[0]
+            if activos and not forzar:
+                self._db.execute("COMMIT")
+                return 0
+            corrida = self._db.execute("INSERT INTO corridas (iniciada) VALUES (?)", (ahora,)).lastrowid
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        return corrida
+
+    def reclamar(self, trabajador: str, cantidad: int = 1, filtro_sql: str = "",
+                 parametros: tuple = ()) -> List[Trabajo]:
+        """
+        Toma hasta `cantidad` trabajos pendientes (o con lease vencido) de la corrida actual, en orden
+        del CSV, y los marca en_curso a nombre de `trabajador`. `filtro_sql` restringe la selección (p. ej. por clave).
+        """
+        ahora = time.time()
+        condicion = (f"(estado = 'pendiente' OR (estado = 'en_curso' AND lease_hasta < ?)) AND intentos < ? "
+                     f"AND corrida = {_CORRIDA_ACTUAL}")
+        if filtro_sql:
+            condicion += f" AND ({filtro_sql})"
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            filas = self._db.execute(
+                f"SELECT clave, orden, norma, intentos FROM trabajos WHERE {condicion} ORDER BY orden LIMIT ?",
+                (ahora, self.max_intentos, *parametros, cantidad)).fetchall()
+            self._db.executemany(
+                "UPDATE trabajos SET estado = 'en_curso', trabajador = ?, lease_hasta = ?, intentos = intentos + 1, "
+                "iniciado = ?, actualizado = ? WHERE clave = ?",
+                [(trabajador, ahora + self.duracion_lease, ahora, ahora, f[0]) for f in filas])
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        return [Trabajo(clave, orden, json.loads(norma), intentos + 1) for clave, orden, norma, intentos in filas]
+
+    def iterar(self, trabajador: str, tamano_lote: int = 1, filtro_sql: str = "",
+               parametros: tuple = ()) -> Iterator[Trabajo]:
+        """Reclama de a `tamano_lote` a medida que se consume, hasta que no queden trabajos disponibles."""
+        while True:
+            trabajos = self.reclamar(trabajador, tamano_lote, filtro_sql, parametros)
+            if not trabajos:
+                return
+            yield from trabajos
+
+    def renovar(self, trabajador: str, claves: Optional[Iterable[str]] = None) -> int:
+        """Extiende el lease de `claves` (por defecto, de todo lo que `trabajador` tiene en curso)."""
+        ahora = time.time()
+        if claves is None:
+            cursor = self._db.execute(
+                "UPDATE trabajos SET lease_hasta = ?, actualizado = ? WHERE trabajador = ? AND estado = 'en_curso'",
+                (ahora + self.duracion_lease, ahora, trabajador))
+        else:
+            cursor = self._db.executemany(
+                "UPDATE trabajos SET lease_hasta = ?, actualizado = ? "
+                "WHERE clave = ? AND trabajador = ? AND estado = 'en_curso'",
+                [(ahora + self.duracion_lease, ahora, c, trabajador) for c in claves])
+        return cursor.rowcount
+
+    def completar(self, trabajador: str, clave: str, exito: bool, error: Optional[str] = None) -> bool:
+        """
+        Marca el resultado de un trabajo. Si falló y le quedan intentos vuelve a pendiente; si no,
+        queda fallido. Retorna False si el lease ya no era de `trabajador` (otro lo reclamó).
+        """
+        ahora = time.time()
+        if exito:
+            cursor = self._db.execute(
+                "UPDATE trabajos SET estado = 'hecho', lease_hasta = NULL, ultimo_error = NULL, terminado = ?, "
+                "actualizado = ? WHERE clave = ? AND trabajador = ? AND estado = 'en_curso'",
+                (ahora, ahora, clave, trabajador))
+        else:
+            cursor = self._db.execute(
+                "UPDATE trabajos SET estado = CASE WHEN intentos >= ? THEN 'fallido' ELSE 'pendiente' END, "
+                "lease_hasta = NULL, ultimo_error = ?, terminado = ?, actualizado = ? "
+                "WHERE clave = ? AND trabajador = ? AND estado = 'en_curso'",
+                (self.max_intentos, (error or "")[:2000], ahora, ahora, clave, trabajador))
+        return cursor.rowcount == 1
+
+    def liberar(self, trabajador: str) -> int:
+        """Devuelve a pendiente lo que `trabajador` tenía en curso sin contarlo como intento (cierre ordenado)."""
+        cursor = self._db.execute(
+            "UPDATE trabajos SET estado = 'pendiente', intentos = MAX(intentos - 1, 0), lease_hasta = NULL, "
+            "actualizado = ? WHERE trabajador = ? AND estado = 'en_curso'",
+            (time.time(), trabajador))
+        return cursor.rowcount
+
+    def reintentar_fallidos(self) -> int:
+        cursor = self._db.execute(
+            f"UPDATE trabajos SET estado = 'pendiente', intentos = 0, actualizado = ? "
+            f"WHERE estado = 'fallido' AND corrida = {_CORRIDA_ACTUAL}",
+            (time.time(),))
+        return cursor.rowcount
+
+    def resumen(self) -> Dict[str, int]:
+        conteos = dict.fromkeys(ESTADOS, 0)
+        for estado, cantidad in self._db.execute("SELECT estado, COUNT(*) FROM trabajos GROUP BY estado"):
+            conteos[estado] = cantidad
+        return conteos
+
+    def cerrar(self):
+        self._db.close()
@@ -0,0 +1,214 @@
+"""
+Cliente compartido para la API interna de LeyChile (get_norma_json).
+
+Reúne en un solo lugar la traducción de URLs públicas a la API y un motor de
+descarga asíncrono que usan tanto `LeychileApiStrategy` como `Lazaro_Scrap`:
+- Un único `aiohttp.ClientSession` con pool de conexiones keep-alive.
+- Concurrencia acotada por semáforo.
+- Límite de peticiones por segundo por host, para no saturar nuevo.leychile.cl.
+- Resultados devueltos en el mismo orden que las URLs de entrada.
+- Caché en disco con revalidación condicional (ver `http_cache.py`).
+- Reintentos con backoff, circuit breaker y concurrencia adaptativa por host (ver `resiliencia.py`).
+"""
+import os
+import json
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+import aiohttp
+
+from http_cache import CacheRespuestas, canonicalizar_url, CACHE_MODO, MODOS_VALIDOS
+from resiliencia import (PoliticaReintentos, RegistroHosts, REGISTRO, ESTADOS_CONGESTION,
+                         host_de, parsear_retry_after)
+
+API_BASE = 'https://nuevo.leychile.cl/servicios/Navegar/get_norma_json'
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36',
+    'Accept': 'application/json, text/plain, */*',
+    'Accept-Language': 'es-ES,es;q=0.9',
+    'Referer': 'https://www.bcn.cl/',
+    'Connection': 'keep-alive',
+}
+
+# Configuración por defecto (sobrescribible por variables de entorno)
+CONCURRENCIA = int(os.getenv("LEYCHILE_CONCURRENCIA", "8"))
+PETICIONES_POR_SEGUNDO = float(os.getenv("LEYCHILE_PETICIONES_POR_SEGUNDO", "4"))
+TIMEOUT_SEGUNDOS = 30
+
+
+def traducir_url_api(url: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Traduce una URL pública de LeyChile a la URL de la API get_norma_json.
+    Retorna (url_api, None) si la traducción es posible o (None, mensaje_error) si no.
+    """
+    if not isinstance(url, str):
+        url = None  # pandas entrega NaN en celdas vacías
+    # 1. Si ya es una URL de API
+    if url and '/servicios/Navegar/get_norma_json' in url:
+        return canonicalizar_url(url), None
+    # 2. Si es una URL pública
+    if url and '/leychile/navegar' in url:
+        params = parse_qs(urlparse(url).query)
+        id_norma = params.get('idNorma', [None])[0]
+        if id_norma:
+            return canonicalizar_url(f'{API_BASE}?idNorma={id_norma}'), None
+        return None, "No se encontró parámetro idNorma en la URL pública."
+    return None, "URL no reconocida como pública ni de API de LeyChile."
+
+
+@dataclass
+class RespuestaApi:
+    """Resultado de una descarga: `datos` solo viene poblado si el cuerpo es JSON válido."""
+    url_api: str
+    status: Optional[int] = None
+    texto: Optional[str] = None
+    datos: Optional[Dict] = None
+    error: Optional[str] = None
+    desde_cache: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.status == 200 and self.datos is not None
+
+
+class LimitadorHost:
+    """Espacia las peticiones a un mismo host para no superar `peticiones_por_segundo`."""
+
+    def __init__(self, peticiones_por_segundo: float):
+        self.intervalo = 1.0 / peticiones_por_segundo if peticiones_por_segundo > 0 else 0.0
+        self._proximo = 0.0
+        self._lock = asyncio.Lock()
+
+    async def esperar(self):
+        if not self.intervalo:
+            return
+        async with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._proximo)
+            self._proximo = turno + self.intervalo
+        if turno > ahora:
+            await asyncio.sleep(turno - ahora)
+
+
+async def _descargar(session: aiohttp.ClientSession, semaforo: asyncio.Semaphore,
+                     limitadores: Dict[str, LimitadorHost], peticiones_por_segundo: float,
+                     url_api: str, cache: Optional[CacheRespuestas] = None,
+                     modo_cache: str = CACHE_MODO, politica: Optional[PoliticaReintentos] = None,
+                     registro: Optional[RegistroHosts] = None, concurrencia: int = CONCURRENCIA) -> RespuestaApi:
+    entrada = cache.obtener(url_api) if cache else None
+    if modo_cache == "offline":
+        if entrada is None:
+            return RespuestaApi(url_api, error="Sin copia en caché (modo offline).")
+        return _desde_cache(url_api, cache.leer_cuerpo(entrada))
+
+    politica = politica or PoliticaReintentos()
+    registro = registro or REGISTRO
+    host = host_de(url_api)
+    limitador = limitadores.setdefault(host, LimitadorHost(peticiones_por_segundo))
+    circuito = registro.circuito(host)
+    control = registro.concurrencia(host, concurrencia)
+    respuesta = None
+    for intento in range(1, politica.intentos + 1):
+        ultimo = intento == politica.intentos
+        retry_after = None
+        async with control.ranura(), semaforo:
+            # El circuito se consulta con la ranura ya tomada: mientras esta tarea esperaba turno,
+            # otras pudieron descubrir que el host está caído
+            if not circuito.permitir():
+                # Host caído: no se gasta una petición; se espera a que el circuito admita una prueba
+                respuesta = RespuestaApi(url_api, error=f"Circuito abierto para {host}: el host no responde.")
+                retry_after = circuito.espera_restante()
+            else:
+                await limitador.esperar()
+                print(f"[INFO] Consultando URL API traducida: {url_api}")
+                inicio = time.monotonic()
+                try:
+                    async with session.get(url_api, headers=CacheRespuestas.cabeceras_condicionales(entrada)) as resp:
+                        # Latencia hasta las cabeceras: el tiempo de leer el cuerpo depende del tamaño
+                        # de la norma (un código largo no es señal de congestión)
+                        latencia = time.monotonic() - inicio
+                        if resp.status == 304 and entrada is not None:
+                            circuito.registrar_exito()
+                            control.registrar_exito(latencia)
+                            return _desde_cache(url_api, cache.leer_cuerpo(entrada))
+                        texto = await resp.text()
+                        if politica.es_reintentable(resp.status):
+                            circuito.registrar_fallo()
+                            if resp.status in ESTADOS_CONGESTION:
+                                control.registrar_congestion()
+                            retry_after = parsear_retry_after(resp.headers.get("Retry-After"))
+                            respuesta = RespuestaApi(url_api, resp.status, texto, error=f"HTTP {resp.status}")
+                        else:
+                            # El host respondió: para el circuito es un éxito aunque la norma no exista
+                            circuito.registrar_exito()
+                            control.registrar_exito(latencia)
+                            if resp.status != 200:
+                                return RespuestaApi(url_api, resp.status, texto, error=f"HTTP {resp.status}")
+                            try:
+                                datos = json.loads(texto)
+                            except json.JSONDecodeError:
+                                return RespuestaApi(url_api, resp.status, texto,
+                                                    error="La API no devolvió un JSON válido. Posible bloqueo o página de error.")
+                            if cache:
+                                cache.guardar(url_api, texto, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+                            return RespuestaApi(url_api, resp.status, texto, datos)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    circuito.registrar_fallo()
+                    control.registrar_congestion()
+                    respuesta = RespuestaApi(url_api, error=str(e) or e.__class__.__name__)
+                except Exception as e:
+                    return RespuestaApi(url_api, error=str(e) or e.__class__.__name__)
+        if ultimo:
+            break
+        print(f"[WARN] {respuesta.error} en {url_api}; reintento {intento}/{politica.intentos - 1}.")
+        await asyncio.sleep(politica.espera(intento, retry_after))
+    return respuesta
+
+
+def _desde_cache(url_api: str, texto: str) -> RespuestaApi:
+    try:
+        return RespuestaApi(url_api, 200, texto, json.loads(texto), desde_cache=True)
+    except json.JSONDecodeError:
+        return RespuestaApi(url_api, 200, texto, error="Copia en caché corrupta.", desde_cache=True)
+
+
+async def descargar_normas_json(urls_api: List[str], concurrencia: int = CONCURRENCIA,
+                                peticiones_por_segundo: float = PETICIONES_POR_SEGUNDO,
+                                modo_cache: str = CACHE_MODO, politica: Optional[PoliticaReintentos] = None,
+                                registro: Optional[RegistroHosts] = None) -> List[RespuestaApi]:
+    """Descarga concurrentemente las URLs de API y devuelve las respuestas en el orden de entrada."""
+    if not urls_api:
+        return []
+    if modo_cache not in MODOS_VALIDOS:
+        raise ValueError(f"Modo de caché no soportado: {modo_cache}. Opciones: {', '.join(MODOS_VALIDOS)}")
+    cache = CacheRespuestas() if modo_cache != "desactivado" else None
+    semaforo = asyncio.Semaphore(max(1, concurrencia))
+    limitadores: Dict[str, LimitadorHost] = {}
+    conector = aiohttp.TCPConnector(limit=max(1, concurrencia), ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=TIMEOUT_SEGUNDOS)
+    try:
+        async with aiohttp.ClientSession(headers=HEADERS, connector=conector, timeout=timeout) as session:
+            tareas = [_descargar(session, semaforo, limitadores, peticiones_por_segundo, u, cache, modo_cache,
+                                 politica, registro, concurrencia)
+                      for u in urls_api]
+            respuestas = await asyncio.gather(*tareas)
+    finally:
+        if cache:
+            cache.cerrar()
+    revalidadas = sum(1 for r in respuestas if r.desde_cache)
+    if revalidadas:
+        print(f"[INFO] {revalidadas}/{len(respuestas)} respuestas servidas desde la caché local.")
+    return respuestas
+
+
+def obtener_normas_json(urls_api: List[str], concurrencia: int = CONCURRENCIA,
+                        peticiones_por_segundo: float = PETICIONES_POR_SEGUNDO,
+                        modo_cache: str = CACHE_MODO, politica: Optional[PoliticaReintentos] = None,
+                        registro: Optional[RegistroHosts] = None) -> List[RespuestaApi]:
+    """Envoltorio síncrono de `descargar_normas_json` para los puntos de entrada existentes."""
+    return asyncio.run(descargar_normas_json(urls_api, concurrencia, peticiones_por_segundo, modo_cache,
+                                             politica, registro))
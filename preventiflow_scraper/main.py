@@ -1,48 +1,256 @@
-import pandas as pd
-import sys
+"""
+Punto de entrada del scraper modular.
+
+Las dependencias pesadas se importan recién cuando hacen falta: el cliente de Supabase al guardar
+el primer lote, aiohttp (API de LeyChile) solo si hay normas de LeyChile pendientes y el pool de
+navegadores solo si queda alguna otra URL. El CSV se lee fila a fila con el módulo csv (sin
+pandas), se descartan las filas vacías y las URLs se canonicalizan y deduplican (por idNorma en
+LeyChile) antes de encolar. Benchmark de arranque: benchmarks/bench_arranque.py.
+
+Al terminar imprime el tiempo por etapa y, con METRICAS_DIR, exporta scraper.prom/scraper.json
+(ver metricas.py). Uso (desde preventiflow_scraper/):
+    python main.py [input_normas.csv] [--solo-leychile] [--listar] [--nueva-corrida]
+
+Cada ejecución continúa la corrida en curso de la cola (job_store.py); si la anterior ya terminó
+abre una nueva y vuelve a recorrer todas las normas del CSV (--nueva-corrida la abre de todos
+modos). Las normas que ya no están en el CSV quedan retiradas de la cola.
+"""
+import re
+import csv
+import time
+import argparse
 import traceback
-from strategies.leychile_api_strategy import LeychileApiStrategy
-from strategies.universal_selenium_strategy import UniversalSeleniumStrategy
-from database_manager import save_result
-import undetected_chromedriver as uc
+from itertools import chain
+from typing import Dict, Iterable, Iterator, Optional
+
+from http_cache import canonicalizar_url
+from job_store import JobStore, id_trabajador_por_defecto
+from metricas import REGISTRO, perfilador
 
 CSV_INPUT = "input_normas.csv"
+# Cantidad de resultados acumulados antes de persistirlos en un solo lote
+TAMANO_LOTE_GUARDADO = 25
+# Normas de LeyChile reclamadas por vuelta (se descargan concurrentemente por la API)
+TAMANO_LOTE_LEYCHILE = 100
+PATRON_LEYCHILE = "%bcn.cl/leychile%"
+PATRON_LEYCHILE_API = "%/servicios/navegar/get_norma_json%"
+# Claves que resuelve la API de LeyChile (URL pública o ya traducida a get_norma_json)
+FILTRO_LEYCHILE = "(clave LIKE ? OR clave LIKE ?)"
+PATRON_ID_NORMA = re.compile(r"[?&]idNorma=([^&#]+)")
+
+
+def leer_normas_csv(path_csv) -> Iterator[Dict]:
+    """
+    Entrega las filas del CSV como dicts, de a una. Las columnas se normalizan a minúsculas sin
+    espacios, las celdas vacías quedan en None y las filas sin ningún valor se descartan.
+    """
+    # utf-8-sig: los CSV exportados desde Excel traen BOM y ensucian el nombre de la primera columna
+    with open(path_csv, newline="", encoding="utf-8-sig") as f:
+        lector = csv.reader(f)
+        encabezado = next(lector, None)
+        if not encabezado:
+            return
+        columnas = [c.strip().lower() for c in encabezado]
+        for fila in lector:
+            valores = [v.strip() or None for v in fila]
+            if not any(valores):
+                continue
+            norma = dict(zip(columnas, valores))
+            for columna in columnas[len(valores):]:
+                norma[columna] = None
+            yield norma
+
+
+def clave_deduplicacion(norma: Dict) -> str:
+    """
+    LeyChile se identifica por idNorma (la API ignora idParte/idVersion), tanto en la URL pública
+    como en la de la API get_norma_json (mismo criterio que leychile_client.traducir_url_api); el
+    resto por URL canónica.
+    """
+    url = norma.get("url_publica")
+    if not url:
+        return f"nombre:{norma.get('nombre_norma') or ''}"
+    minusculas = url.lower()
+    if "bcn.cl/leychile" in minusculas or "/servicios/navegar/get_norma_json" in minusculas:
+        # Una regex en vez de urlparse + parse_qs: se evalúa para cada fila del CSV
+        coincidencia = PATRON_ID_NORMA.search(url)
+        if coincidencia:
+            return f"leychile:{coincidencia.group(1)}"
+    return url
+
+
+def normas_unicas(normas: Iterable[Dict], conteo: Optional[Dict[str, int]] = None) -> Iterator[Dict]:
+    """Canonicaliza url_publica y deja pasar solo la primera aparición de cada norma."""
+    vistas = set()
+    conteo = conteo if conteo is not None else {}
+    conteo.update(leidas=0, duplicadas=0)
+    for norma in normas:
+        conteo["leidas"] += 1
+        if norma.get("url_publica"):
+            norma["url_publica"] = canonicalizar_url(norma["url_publica"])
+        clave = clave_deduplicacion(norma)
+        if clave in vistas:
+            conteo["duplicadas"] += 1
+            print(f"[INFO] Norma duplicada en el CSV, se omite: {norma.get('nombre_norma')} ({clave})")
+            continue
+        vistas.add(clave)
+        yield norma
+
+
+def _resultado_exitoso(resultado) -> bool:
+    if not isinstance(resultado, dict) or resultado.get('status') == 'error':
+        return False
+    texto = resultado.get('texto_limpio')
+    return isinstance(texto, str) and bool(texto.strip()) and not texto.startswith("Error al procesar")
+
+
+def _completar(store, trabajador, pares):
+    """Marca cada (clave, resultado) en la cola, solo después de que el resultado quedó guardado."""
+    for clave, resultado in pares:
+        exito = _resultado_exitoso(resultado)
+        error = None if exito else str((resultado or {}).get('texto_limpio') or "Sin resultado")
+        store.completar(trabajador, clave, exito, error)
+
+
+def _guardar_lote(save_result, store, trabajador, pares):
+    """
+    Guarda un lote de (clave, resultado) y lo marca en la cola. Si el guardado falla, el error se
+    informa y las normas quedan como fallidas (se reintentan), sin cortar la corrida ni tapar otro
+    error cuando se llama desde un finally.
+    """
+    try:
+        save_result([r for _, r in pares], 'scraper_modular')
+    except Exception as e:
+        print(f"[ERROR] Fallo guardando lote de {len(pares)} normas: {e}")
+        traceback.print_exc()
+        pares = [(clave, None) for clave, _ in pares]
+    _completar(store, trabajador, pares)
+
+
+class _RenovadorLeases:
+    """Renueva los leases de lo reclamado (en vuelo o esperando el guardado) cada tercio del lease."""
+    def __init__(self, store, trabajador):
+        self.store = store
+        self.trabajador = trabajador
+        self.intervalo = store.duracion_lease / 3
+        self._proxima = time.monotonic() + self.intervalo
+
+    def __call__(self):
+        if time.monotonic() >= self._proxima:
+            self.store.renovar(self.trabajador)
+            self._proxima = time.monotonic() + self.intervalo
+
+
+class _Guardado:
+    """Importa database_manager (cliente de Supabase) recién al guardar el primer lote."""
+    def __init__(self):
+        self._save_result = None
+
+    def __call__(self, resultados, strategy_name: str = 'scraper_modular'):
+        if self._save_result is None:
+            from database_manager import save_result
+            self._save_result = save_result
+        with REGISTRO.etapa("persistencia", elementos=len(resultados)):
+            return self._save_result(resultados, strategy_name)
+
+
+def parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv", nargs="?", default=CSV_INPUT, help="CSV de normas (por defecto input_normas.csv)")
+    parser.add_argument("--solo-leychile", action="store_true", help="procesa solo las normas de LeyChile (sin navegadores)")
+    parser.add_argument("--listar", action="store_true", help="lee y deduplica el CSV, muestra las normas y termina")
+    parser.add_argument("--nueva-corrida", action="store_true",
+                        help="vuelve a pendiente todas las normas de la cola aunque la corrida anterior no haya terminado")
+    return parser.parse_args(argv)
 
 
-def leer_normas_csv(path_csv):
-    df = pd.read_csv(path_csv)
-    # Normaliza claves a minúsculas y quita espacios
-    df.columns = [c.strip().lower() for c in df.columns]
-    normas = df.to_dict(orient='records')
-    return normas
+def main(argv=None):
+    args = parsear_argumentos(argv)
+    conteo: Dict[str, int] = {}
+    normas = normas_unicas(leer_normas_csv(args.csv), conteo)
+    if args.listar:
+        for norma in normas:
+            print(f"{clave_deduplicacion(norma)}\t{norma.get('nombre_norma')}")
+        print(f"[INFO] CSV: {conteo['leidas']} normas, {conteo['duplicadas']} duplicadas.")
+        return
+    # METRICAS_PERFILADOR=1 muestrea las pilas durante la corrida (scraper.folded)
+    with perfilador("scraper"):
+        _procesar(args, normas, conteo)
+    REGISTRO.imprimir_resumen()
+    REGISTRO.exportar("scraper")
 
 
-def main():
-    normas = leer_normas_csv(CSV_INPUT)
-    estrategia_leychile = LeychileApiStrategy()
-    estrategia_universal = UniversalSeleniumStrategy()
-    driver = None
+def _procesar(args, normas: Iterable[Dict], conteo: Dict[str, int]):
+    save_result = _Guardado()
+    # La cola persiste entre corridas: lo ya hecho no se repite y varios procesos pueden vaciarla
+    store = JobStore()
+    trabajador = id_trabajador_por_defecto()
+    # Antes de encolar: las normas nuevas del CSV no deben contar como una corrida a medias
+    corrida = store.iniciar_corrida(forzar=args.nueva_corrida)
+    if corrida:
+        print(f"[INFO] Nueva corrida {corrida}: se recorren todas las normas del CSV.")
+    renovar = _RenovadorLeases(store, trabajador)
+    with REGISTRO.etapa("lectura_csv") as etapa:
+        encoladas = store.encolar(normas)
+        etapa.elementos = conteo["leidas"]
+    REGISTRO.contador("csv_normas_total", "Filas no vacías del CSV", resultado="unica").inc(
+        conteo["leidas"] - conteo["duplicadas"])
+    REGISTRO.contador("csv_normas_total", "Filas no vacías del CSV", resultado="duplicada").inc(conteo["duplicadas"])
+    print(f"[INFO] CSV: {conteo['leidas']} normas, {conteo['duplicadas']} duplicadas. "
+          f"{encoladas['nuevas']} normas nuevas en la cola, {encoladas['reabiertas']} reabiertas, "
+          f"{encoladas['retiradas']} retiradas (ya no están en el CSV). Estado: {store.resumen()}")
+    pendientes_guardar = []  # (clave, resultado)
     try:
-        driver = uc.Chrome()
-        for idx, norma in enumerate(normas):
+        # Las normas de LeyChile se resuelven por lotes en la API (descarga concurrente)
+        estrategia_leychile = None
+        while True:
+            trabajos = store.reclamar(trabajador, TAMANO_LOTE_LEYCHILE, FILTRO_LEYCHILE,
+                                     (PATRON_LEYCHILE, PATRON_LEYCHILE_API))
+            if not trabajos:
+                break
+            if estrategia_leychile is None:
+                from strategies.leychile_api_strategy import LeychileApiStrategy
+                estrategia_leychile = LeychileApiStrategy()
             try:
-                url = norma.get('url_publica', '')
-                if 'bcn.cl/leychile' in url:
-                    resultado = estrategia_leychile.run(driver, [norma])
-                # Aquí puedes añadir más estrategias específicas (ej: elif 'minsal.cl' in url: ...)
-                else:
-                    resultado = estrategia_universal.run(driver, [norma])
-                if resultado and isinstance(resultado, list):
-                    for res in resultado:
-                        save_result([res], 'scraper_modular')
-                else:
-                    print(f"[WARN] Estrategia no devolvió resultado válido para fila {idx+1}")
+                resultados = estrategia_leychile.run(None, [t.norma for t in trabajos])
+                save_result(resultados, 'scraper_modular')
             except Exception as e:
-                print(f"[ERROR] Fallo procesando norma en fila {idx+1}: {e}")
+                print(f"[ERROR] Fallo procesando lote LeyChile: {e}")
                 traceback.print_exc()
+                resultados = [None] * len(trabajos)
+            _completar(store, trabajador, [(t.clave, r) for t, r in zip(trabajos, resultados)])
+        if args.solo_leychile:
+            return
+        # El resto se reparte entre trabajadores en procesos paralelos (HTTP estático primero y
+        # navegador headless solo si la página lo necesita); cada trabajo se reclama recién
+        # cuando hay un trabajador libre
+        tareas = ((t.clave, t.norma) for t in store.iterar(trabajador, 1, f"NOT {FILTRO_LEYCHILE}",
+                                                        (PATRON_LEYCHILE, PATRON_LEYCHILE_API)))
+        primera = next(tareas, None)
+        if primera is None:
+            return
+        from browser_pool import PoolNavegadores
+        for clave, resultado in PoolNavegadores().procesar(chain([primera], tareas)):
+            # Lo que espera en pendientes_guardar o sigue en un trabajador conserva su lease
+            renovar()
+            if resultado and isinstance(resultado, list):
+                pendientes_guardar.append((clave, resultado[0]))
+                if len(pendientes_guardar) >= TAMANO_LOTE_GUARDADO:
+                    lote, pendientes_guardar = pendientes_guardar, []
+                    _guardar_lote(save_result, store, trabajador, lote)
+            else:
+                print(f"[WARN] Estrategia no devolvió resultado válido para {clave}")
+                _completar(store, trabajador, [(clave, None)])
     finally:
-        if driver:
-            driver.quit()
+        if pendientes_guardar:
+            _guardar_lote(save_result, store, trabajador, pendientes_guardar)
+        # Lo que quedó reclamado sin terminar (p. ej. Ctrl+C) vuelve a la cola para la próxima corrida
+        store.liberar(trabajador)
+        estado_cola = store.resumen()
+        for estado, cantidad in estado_cola.items():
+            REGISTRO.medidor("cola_trabajos", "Trabajos en job_store por estado", estado=estado).fijar(cantidad)
+        print(f"[INFO] Estado de la cola: {estado_cola}")
+        store.cerrar()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,404 @@
+"""
+Métricas livianas (solo biblioteca estándar) para el scraper y la vectorización.
+
+- `Contador`, `Medidor` (valor actual y máximo, p. ej. profundidad de colas) e `Histograma`
+  (buckets fijos de latencia, estilo Prometheus), con etiquetas: `REGISTRO.contador("x", etapa="descarga")`.
+- `REGISTRO.etapa(nombre)`: cronómetro por etapa (descarga, parseo, limpieza, persistencia,
+  embedding, escritura_db...). Registra latencia, elementos, bytes y errores:
+
+      with REGISTRO.etapa("descarga", elementos=len(urls)) as etapa:
+          cuerpo = ...
+          etapa.bytes += len(cuerpo)
+
+- Exportación: `a_prometheus()` (formato de texto, para el textfile collector de node_exporter),
+  `resumen()` (JSON con p50/p95/p99 y ritmo por etapa) y `exportar(prefijo)`, que escribe
+  `<prefijo>.prom` y `<prefijo>.json` en METRICAS_DIR (si está definido) de forma atómica.
+- Procesos hijos (pool de navegadores): `instantanea()` en el hijo y `combinar()` en el padre.
+- `PerfiladorMuestreo`: hook opcional (METRICAS_PERFILADOR=1) que muestrea las pilas de todos los
+  hilos cada `intervalo` segundos y escribe stacks plegados (`<prefijo>.folded`, para flamegraph.pl
+  o speedscope) junto con las funciones más vistas.
+
+Variables de entorno: METRICAS_DIR, METRICAS_PERFILADOR, METRICAS_INTERVALO_PERFILADOR.
+"""
+import os
+import sys
+import json
+import time
+import bisect
+import threading
+import contextlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+METRICAS_DIR = os.getenv("METRICAS_DIR")
+PERFILADOR_ACTIVO = os.getenv("METRICAS_PERFILADOR", "0") == "1"
+INTERVALO_PERFILADOR_SEGUNDOS = float(os.getenv("METRICAS_INTERVALO_PERFILADOR", "0.005"))
+
+# Segundos: cubren desde un parseo en memoria hasta una carga completa de Chrome
+BUCKETS_LATENCIA = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Etiquetas = Tuple[Tuple[str, str], ...]
+
+
+def _etiquetas(etiquetas: Dict) -> Etiquetas:
+    return tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _formatear_etiquetas(etiquetas: Etiquetas, extra: Tuple = ()) -> str:
+    pares = list(etiquetas) + list(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}"
+
+
+class Contador:
+    def __init__(self):
+        self.valor = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, n: float = 1.0):
+        with self._lock:
+            self.valor += n
+
+
+class Medidor:
+    def __init__(self):
+        self.valor = 0.0
+        self.maximo = 0.0
+        self._lock = threading.Lock()
+
+    def fijar(self, valor: float):
+        with self._lock:
+            self.valor = valor
+            self.maximo = max(self.maximo, valor)
+
+    def inc(self, n: float = 1.0):
+        with self._lock:
+            self.valor += n
+            self.maximo = max(self.maximo, self.valor)
+
+    def dec(self, n: float = 1.0):
+        self.inc(-n)
+
+
+class Histograma:
+    def __init__(self, buckets=BUCKETS_LATENCIA):
+        self.buckets = tuple(sorted(buckets))
+        self.conteos = [0] * (len(self.buckets) + 1)  # el último es +Inf
+        self.suma = 0.0
+        self.cantidad = 0
+        self.maximo = 0.0
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float):
+        with self._lock:
+            self.conteos[bisect.bisect_left(self.buckets, valor)] += 1
+            self.suma += valor
+            self.cantidad += 1
+            self.maximo = max(self.maximo, valor)
+
+    def cuantil(self, q: float) -> Optional[float]:
+        """Estimación por interpolación lineal dentro del bucket (como histogram_quantile de Prometheus)."""
+        if not self.cantidad:
+            return None
+        objetivo = q * self.cantidad
+        acumulado = 0
+        for i, conteo in enumerate(self.conteos):
+            if acumulado + conteo >= objetivo and conteo:
+                inferior = self.buckets[i - 1] if i > 0 else 0.0
+                superior = self.buckets[i] if i < len(self.buckets) else self.maximo
+                return inferior + (superior - inferior) * (objetivo - acumulado) / conteo
+            acumulado += conteo
+        return self.maximo
+
+
+class Etapa:
+    """Lo que el código instrumentado puede ajustar dentro de `with REGISTRO.etapa(...)`."""
+    def __init__(self, elementos: int = 1):
+        self.elementos = elementos
+        self.bytes = 0
+        self.error = False
+
+
+class Registro:
+    def __init__(self):
+        self._metricas: Dict[Tuple[str, Etiquetas], object] = {}
+        self._ayuda: Dict[str, Tuple[str, str]] = {}  # nombre -> (tipo, ayuda)
+        self._lock = threading.Lock()
+        self.inicio = time.time()
+
+    def _obtener(self, nombre: str, tipo: str, fabrica, ayuda: str, etiquetas: Dict):
+        clave = (nombre, _etiquetas(etiquetas))
+        metrica = self._metricas.get(clave)
+        if metrica is None:
+            with self._lock:
+                metrica = self._metricas.get(clave)
+                if metrica is None:
+                    metrica = self._metricas[clave] = fabrica()
+                    self._ayuda.setdefault(nombre, (tipo, ayuda))
+        return metrica
+
+    def contador(self, nombre: str, ayuda: str = "", **etiquetas) -> Contador:
+        return self._obtener(nombre, "counter", Contador, ayuda, etiquetas)
+
+    def medidor(self, nombre: str, ayuda: str = "", **etiquetas) -> Medidor:
+        return self._obtener(nombre, "gauge", Medidor, ayuda, etiquetas)
+
+    def histograma(self, nombre: str, ayuda: str = "", buckets=BUCKETS_LATENCIA, **etiquetas) -> Histograma:
+        return self._obtener(nombre, "histogram", lambda: Histograma(buckets), ayuda, etiquetas)
+
+    def observar_etapa(self, etapa: str, segundos: float, elementos: int = 1, bytes_: int = 0,
+                       error: bool = False, **etiquetas):
+        self.histograma("etapa_duracion_segundos", "Latencia por invocación de cada etapa",
+                        etapa=etapa, **etiquetas).observar(segundos)
+        self.contador("etapa_elementos_total", "Elementos procesados por etapa", etapa=etapa, **etiquetas).inc(elementos)
+        if bytes_:
+            self.contador("etapa_bytes_total", "Bytes procesados por etapa", etapa=etapa, **etiquetas).inc(bytes_)
+        if error:
+            self.contador("etapa_errores_total", "Invocaciones con error por etapa", etapa=etapa, **etiquetas).inc()
+
+    @contextlib.contextmanager
+    def etapa(self, nombre: str, elementos: int = 1, **etiquetas):
+        estado = Etapa(elementos)
+        inicio = time.perf_counter()
+        try:
+            yield estado
+        except BaseException:
+            estado.error = True
+            raise
+        finally:
+            self.observar_etapa(nombre, time.perf_counter() - inicio, estado.elementos, estado.bytes,
+                                estado.error, **etiquetas)
+
+    # --- Procesos hijos ---
+    def instantanea(self) -> Dict:
+        """Estado serializable (pickle/JSON) para enviarlo al proceso padre."""
+        with self._lock:
+            items = list(self._metricas.items())
+            ayuda = dict(self._ayuda)
+        datos = []
+        for (nombre, etiquetas), m in items:
+            if isinstance(m, Histograma):
+                estado = {"buckets": m.buckets, "conteos": list(m.conteos), "suma": m.suma,
+                          "cantidad": m.cantidad, "maximo": m.maximo}
+            elif isinstance(m, Medidor):
+                estado = {"valor": m.valor, "maximo": m.maximo}
+            else:
+                estado = {"valor": m.valor}
+            datos.append((nombre, etiquetas, ayuda[nombre][0], estado))
+        return {"metricas": datos, "ayuda": ayuda}
+
+    def combinar(self, instantanea: Dict):
+        """Suma contadores e histogramas de otro proceso; los medidores toman el último valor y el mayor máximo."""
+        ayuda = instantanea.get("ayuda", {})
+        for nombre, etiquetas, tipo, estado in instantanea.get("metricas", []):
+            texto_ayuda = ayuda.get(nombre, (tipo, ""))[1]
+            dict_etiquetas = dict(etiquetas)
+            if tipo == "histogram":
+                h = self.histograma(nombre, texto_ayuda, tuple(estado["buckets"]), **dict_etiquetas)
+                with h._lock:
+                    if h.buckets == tuple(estado["buckets"]):
+                        h.conteos = [a + b for a, b in zip(h.conteos, estado["conteos"])]
+                        h.suma += estado["suma"]
+                        h.cantidad += estado["cantidad"]
+                        h.maximo = max(h.maximo, estado["maximo"])
+            elif tipo == "gauge":
+                g = self.medidor(nombre, texto_ayuda, **dict_etiquetas)
+                with g._lock:
+                    g.valor = estado["valor"]
+                    g.maximo = max(g.maximo, estado["maximo"])
+            else:
+                self.contador(nombre, texto_ayuda, **dict_etiquetas).inc(estado["valor"])
+
+    def reiniciar(self):
+        with self._lock:
+            self._metricas.clear()
+            self._ayuda.clear()
+            self.inicio = time.time()
+
+    # --- Exportación ---
+    def a_prometheus(self) -> str:
+        with self._lock:
+            items = sorted(self._metricas.items(), key=lambda x: x[0])
+            ayuda = dict(self._ayuda)
+        lineas = []
+        maximos: Dict[str, List[str]] = {}  # el máximo de cada medidor va como familia aparte
+        anterior = None
+        for (nombre, etiquetas), m in items:
+            if nombre != anterior:
+                tipo, texto = ayuda[nombre]
+                if texto:
+                    lineas.append(f"# HELP {nombre} {texto}")
+                lineas.append(f"# TYPE {nombre} {tipo}")
+                anterior = nombre
+            if isinstance(m, Histograma):
+                acumulado = 0
+                for limite, conteo in zip(list(m.buckets) + ["+Inf"], m.conteos):
+                    acumulado += conteo
+                    lineas.append(f"{nombre}_bucket{_formatear_etiquetas(etiquetas, (('le', limite),))} {acumulado}")
+                lineas.append(f"{nombre}_sum{_formatear_etiquetas(etiquetas)} {m.suma:.6f}")
+                lineas.append(f"{nombre}_count{_formatear_etiquetas(etiquetas)} {m.cantidad}")
+            else:
+                lineas.append(f"{nombre}{_formatear_etiquetas(etiquetas)} {m.valor:g}")
+                if isinstance(m, Medidor):
+                    maximos.setdefault(f"{nombre}_maximo", []).append(
+                        f"{nombre}_maximo{_formatear_etiquetas(etiquetas)} {m.maximo:g}")
+        for nombre, muestras in maximos.items():
+            lineas.append(f"# TYPE {nombre} gauge")
+            lineas.extend(muestras)
+        return "\n".join(lineas) + "\n"
+
+    def resumen(self) -> Dict:
+        """Por etapa: invocaciones, segundos totales, p50/p95/p99 (ms), elementos, bytes, errores y ritmo."""
+        etapas: Dict[str, Dict] = {}
+        otras: Dict[str, object] = {}
+        with self._lock:
+            items = list(self._metricas.items())
+        for (nombre, etiquetas), m in items:
+            dict_etiquetas = dict(etiquetas)
+            etiqueta = ",".join(f"{k}={v}" for k, v in etiquetas if k != "etapa")
+            if "etapa" in dict_etiquetas and nombre.startswith("etapa_"):
+                clave = dict_etiquetas["etapa"] + (f"[{etiqueta}]" if etiqueta else "")
+                fila = etapas.setdefault(clave, {"invocaciones": 0, "segundos": 0.0, "elementos": 0,
+                                                 "bytes": 0, "errores": 0})
+                if isinstance(m, Histograma):
+                    fila.update(invocaciones=m.cantidad, segundos=round(m.suma, 4),
+                                p50_ms=_ms(m.cuantil(0.5)), p95_ms=_ms(m.cuantil(0.95)),
+                                p99_ms=_ms(m.cuantil(0.99)), max_ms=_ms(m.maximo))
+                elif nombre == "etapa_elementos_total":
+                    fila["elementos"] = int(m.valor)
+                elif nombre == "etapa_bytes_total":
+                    fila["bytes"] = int(m.valor)
+                elif nombre == "etapa_errores_total":
+                    fila["errores"] = int(m.valor)
+            else:
+                clave = nombre + (f"{{{etiqueta}}}" if etiqueta else "")
+                if isinstance(m, Histograma):
+                    otras[clave] = {"cantidad": m.cantidad, "suma": round(m.suma, 4)}
+                elif isinstance(m, Medidor):
+                    otras[clave] = {"valor": m.valor, "maximo": m.maximo}
+                else:
+                    otras[clave] = m.valor
+        for fila in etapas.values():
+            fila["elementos_por_segundo"] = round(fila["elementos"] / fila["segundos"], 2) if fila["segundos"] else None
+        return {"inicio": self.inicio, "duracion_segundos": round(time.time() - self.inicio, 3),
+                "etapas": dict(sorted(etapas.items(), key=lambda x: -x[1]["segundos"])),
+                "otras": dict(sorted(otras.items()))}
+
+    def imprimir_resumen(self):
+        resumen = self.resumen()
+        if not resumen["etapas"]:
+            return
+        print(f"[METRICAS] {'etapa':<28} {'n':>7} {'total s':>9} {'p50 ms':>9} {'p95 ms':>9} {'elem/s':>9} {'MB':>8} {'err':>5}")
+        for etapa, f in resumen["etapas"].items():
+            print(f"[METRICAS] {etapa:<28} {f['invocaciones']:>7} {f['segundos']:>9.2f} {_fmt(f.get('p50_ms')):>9} "
+                  f"{_fmt(f.get('p95_ms')):>9} {_fmt(f['elementos_por_segundo']):>9} {f['bytes'] / 2 ** 20:>8.2f} "
+                  f"{f['errores']:>5}")
+
+    def exportar(self, prefijo: str, directorio: Optional[str] = None) -> Optional[str]:
+        """Escribe `<prefijo>.prom` y `<prefijo>.json` (reemplazo atómico). Sin directorio ni METRICAS_DIR no hace nada."""
+        directorio = directorio or METRICAS_DIR
+        if not directorio:
+            return None
+        os.makedirs(directorio, exist_ok=True)
+        base = os.path.join(directorio, prefijo)
+        _escribir_atomico(base + ".prom", self.a_prometheus())
+        _escribir_atomico(base + ".json", json.dumps(self.resumen(), ensure_ascii=False, indent=2))
+        print(f"[INFO] Métricas exportadas en {base}.prom y {base}.json")
+        return base
+
+
+def _ms(segundos: Optional[float]) -> Optional[float]:
+    return None if segundos is None else round(1000 * segundos, 2)
+
+
+def _fmt(valor) -> str:
+    return "-" if valor is None else f"{valor:.1f}"
+
+
+def _escribir_atomico(ruta: str, contenido: str):
+    # El textfile collector puede leer en cualquier momento: nunca debe ver un archivo a medias
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write(contenido)
+    os.replace(temporal, ruta)
+
+
+class PerfiladorMuestreo:
+    """
+    Muestrea periódicamente la pila de cada hilo (sys._current_frames) desde un hilo aparte.
+    Costo bajo y constante; no requiere instrumentar el código ni dependencias externas.
+    """
+    def __init__(self, intervalo: float = INTERVALO_PERFILADOR_SEGUNDOS, profundidad: int = 64):
+        self.intervalo = intervalo
+        self.profundidad = profundidad
+        self.pilas: Counter = Counter()
+        self.muestras = 0
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def _muestrear(self):
+        propio = threading.get_ident()
+        nombres = {}
+        while not self._detener.wait(self.intervalo):
+            for t in threading.enumerate():
+                nombres[t.ident] = t.name
+            for ident, frame in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                pila = []
+                while frame is not None and len(pila) < self.profundidad:
+                    codigo = frame.f_code
+                    pila.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+                    frame = frame.f_back
+                pila.append(nombres.get(ident, str(ident)))
+                self.pilas[";".join(reversed(pila))] += 1
+            self.muestras += 1
+
+    def iniciar(self) -> "PerfiladorMuestreo":
+        self._hilo = threading.Thread(target=self._muestrear, name="perfilador-muestreo", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+
+    def funciones_mas_vistas(self, n: int = 15) -> List[Tuple[str, int]]:
+        """Funciones en la cima de la pila (tiempo propio) ordenadas por muestras."""
+        propias: Counter = Counter()
+        for pila, cuenta in self.pilas.items():
+            propias[pila.rsplit(";", 1)[-1]] += cuenta
+        return propias.most_common(n)
+
+    def escribir_folded(self, ruta: str):
+        _escribir_atomico(ruta, "".join(f"{pila} {cuenta}\n" for pila, cuenta in self.pilas.most_common()))
+
+
+@contextlib.contextmanager
+def perfilador(prefijo: str, activo: bool = PERFILADOR_ACTIVO, directorio: Optional[str] = None):
+    """Perfila el bloque si `activo`; al salir escribe `<prefijo>.folded` e imprime las funciones más vistas."""
+    if not activo:
+        yield None
+        return
+    muestreo = PerfiladorMuestreo().iniciar()
+    try:
+        yield muestreo
+    finally:
+        muestreo.detener()
+        directorio = directorio or METRICAS_DIR or "."
+        os.makedirs(directorio, exist_ok=True)
+        ruta = os.path.join(directorio, f"{prefijo}.folded")
+        muestreo.escribir_folded(ruta)
+        print(f"[PERFIL] {muestreo.muestras} muestras; stacks plegados en {ruta}")
+        for funcion, cuenta in muestreo.funciones_mas_vistas(10):
+            print(f"[PERFIL] {cuenta:>7} {funcion}")
+
+
+# Registro compartido por todo el proceso
+REGISTRO = Registro()
@@ -0,0 +1,204 @@
+"""
+Normalización compartida del texto extraído, antes de guardarlo y de embeberlo.
+
+- `normalizar_texto`: reemplaza a `limpiar_texto` (python_scraper/scraper.py) y a
+  `limpiar_texto_universal` (estrategia universal). En una sola pasada por las líneas quita
+  caracteres invisibles, colapsa espacios (incluido el espacio duro), descarta líneas vacías y
+  elimina, con expresiones compiladas, líneas enteras de "chrome" conocido (avisos de cookies,
+  "Ir al contenido", "Compartir en...", migas de pan, copyright).
+- `PlantillasDominio`: detecta por dominio las líneas que se repiten en muchas páginas (menús,
+  banners y pies que los selectores CSS no alcanzan) y las quita. Cuenta en SQLite, compartido por
+  los procesos del pool, en cuántas páginas distintas aparece cada línea. Una línea es plantilla
+  si aparece en al menos `umbral` de las páginas del dominio, una vez vistas `min_paginas`. Los
+  encabezados normativos (Artículo, Título, Capítulo...), la estructura de decretos y resoluciones
+  (VISTOS, CONSIDERANDO, RESUELVO, Ministerio de...), las fórmulas de promulgación y las líneas
+  largas nunca se quitan. Si la página entera resultara ser plantilla, se conserva tal cual.
+
+Variables de entorno: SCRAPER_QUITAR_PLANTILLAS, SCRAPER_PLANTILLAS_DOMINIO (ruta),
+SCRAPER_PLANTILLA_UMBRAL, SCRAPER_PLANTILLA_MIN_PAGINAS, SCRAPER_PLANTILLA_LARGO_MAXIMO.
+Benchmark: benchmarks/bench_normalizacion.py.
+"""
+import os
+import re
+import math
+import sqlite3
+import hashlib
+from typing import Dict, List, Optional
+
+from resiliencia import host_de
+from metricas import REGISTRO
+
+QUITAR_PLANTILLAS = os.getenv("SCRAPER_QUITAR_PLANTILLAS", "1") == "1"
+PLANTILLAS_DOMINIO_PATH = os.getenv(
+    "SCRAPER_PLANTILLAS_DOMINIO", os.path.join(os.path.dirname(os.path.abspath(__file__)), "plantillas_dominio.sqlite3"))
+UMBRAL_PLANTILLA = float(os.getenv("SCRAPER_PLANTILLA_UMBRAL", "0.6"))
+# Con pocas páginas, distintas versiones de una misma norma parecerían plantilla
+MIN_PAGINAS_PLANTILLA = int(os.getenv("SCRAPER_PLANTILLA_MIN_PAGINAS", "20"))
+LARGO_MAXIMO_PLANTILLA = int(os.getenv("SCRAPER_PLANTILLA_LARGO_MAXIMO", "200"))
+# Menús, botones y pies son frases cortas; una oración larga que se repite suele ser texto legal
+PALABRAS_MAXIMAS_PLANTILLA = 12
+# Límite de variables por sentencia de SQLite (999 en versiones antiguas)
+TAMANO_BLOQUE_SQL = 500
+
+# Caracteres de ancho cero y guion blando
+_INVISIBLES = "\u200b\u200c\u200d\u2060\ufeff\u00ad"
+# Líneas completas de chrome conocido. Se prueban con match() (anclado): fallan en el primer carácter
+_RUIDO = re.compile(r"(?:" + "|".join([
+    r"(?:ir|saltar|pasar) al contenido(?: principal)?",
+    r"(?:volver|ir) (?:arriba|al inicio)",
+    r"(?:men[úu]|buscar|cerrar|imprimir|inicio|mapa del sitio|descargar pdf|enviar por correo|compartir)",
+    r"compartir en (?:facebook|twitter|x|linkedin|whatsapp|correo)",
+    r"s[íi]guenos(?: en)?\b.{0,80}",
+    r"(?:aceptar|acepto|rechazar|configurar|personalizar)(?: todas?)?(?: las)? cookies",
+    r"pol[íi]tica de (?:privacidad|cookies)",
+    # "© 2024 ...", "Copyright © bcn.cl ...": "(c)" no, es la letra de un inciso
+    r"(?:©|copyright(?:\s*©)?)\s*(?:(?:19|20)\d{2}\b|(?:www\.)?[\w-]+(?:\.[\w-]+)*\.(?:cl|com|org|net|gov|gob)\b).{0,160}",
+    r"inicio\s*[>»›/|]\s.{0,200}",
+]) + r")$", re.IGNORECASE)
+LARGO_MAXIMO_RUIDO = 250
+# Avisos que pueden ir en cualquier parte de la línea. Solo si el texto los menciona se revisa cada
+# línea; las largas se conservan (pueden ser texto legal que habla de cookies)
+_AVISOS = ("cookies", "derechos reservados")
+_RUIDO_EN_LINEA = re.compile(r"\b(?:usamos|utilizamos|este sitio (?:usa|utiliza)) cookies\b", re.IGNORECASE)
+LARGO_MAXIMO_AVISO = 400
+# "Todos los derechos reservados" solo es aviso si cierra una línea corta ("BCN - Todos los derechos
+# reservados."); un artículo o inciso que lo menciona se conserva
+_DERECHOS_RESERVADOS = re.compile(r"todos los derechos reservados\W*$", re.IGNORECASE)
+_INCISO = re.compile(r"^\(?[a-z0-9]{1,3}[).°º-]", re.IGNORECASE)
+LARGO_MAXIMO_DERECHOS = 120
+
+# Líneas que nunca se consideran plantilla aunque se repitan entre páginas
+PATRON_PROTEGIDO = re.compile(
+    r"^(?:(?:art[íi]culo|t[íi]tulo|cap[íi]tulo|p[áa]rrafo|libro|disposici[óo]n|ley|decreto|resoluci[óo]n|nota"
+    r"|dto|dfl|vistos?|considerando|resuelv[oe]|decreta|ordena|ministerio|subsecretar[íi]a|teniendo presente)\b"
+    r"|art\.|d\.\s?[os]\.|§)"
+    r"|\b(?:an[óo]tese|publ[íi]quese|comun[íi]quese|t[óo]mese raz[óo]n)\b",
+    re.IGNORECASE)
+_DIGITOS = re.compile(r"\d+")
+
+
+def normalizar_texto(texto: Optional[str]) -> str:
+    """Texto con una línea por bloque, sin espacios sobrantes, líneas vacías ni chrome conocido."""
+    if not texto:
+        return ""
+    for caracter in _INVISIBLES:
+        if caracter in texto:
+            texto = texto.replace(caracter, "")
+    # splitlines reconoce todos los saltos (\r, \f, \u2028...) y split() colapsa cualquier espacio
+    # Unicode (\t, \u00a0, \u3000...); en CPython ambos son varias veces más rápidos que una regex
+    lineas = [" ".join(linea.split()) for linea in texto.splitlines()]
+    lineas = [l for l in lineas if l and not (len(l) <= LARGO_MAXIMO_RUIDO and _RUIDO.match(l))]
+    normalizado = "\n".join(lineas)
+    minusculas = normalizado.lower()
+    if any(aviso in minusculas for aviso in _AVISOS):
+        normalizado = "\n".join(l for l in lineas if not _aviso_en_linea(l))
+    return normalizado
+
+
+def _aviso_en_linea(linea: str) -> bool:
+    if len(linea) <= LARGO_MAXIMO_AVISO and _RUIDO_EN_LINEA.search(linea):
+        return True
+    return (len(linea) <= LARGO_MAXIMO_DERECHOS and bool(_DERECHOS_RESERVADOS.search(linea))
+            and not _INCISO.match(linea) and not PATRON_PROTEGIDO.search(linea))
+
+
+def huella_linea(linea: str) -> int:
+    """Entero de 64 bits de la línea sin mayúsculas ni dígitos concretos (fechas y contadores varían)."""
+    digest = hashlib.blake2b(_DIGITOS.sub("0", linea.casefold()).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class PlantillasDominio:
+    """Líneas repetidas entre páginas de un mismo dominio. Segura entre procesos (SQLite en WAL)."""
+
+    def __init__(self, ruta: str = PLANTILLAS_DOMINIO_PATH, umbral: float = UMBRAL_PLANTILLA,
+                 min_paginas: int = MIN_PAGINAS_PLANTILLA, largo_maximo: int = LARGO_MAXIMO_PLANTILLA):
+        self.umbral = umbral
+        self.min_paginas = max(2, min_paginas)
+        self.largo_maximo = largo_maximo
+        self._db = sqlite3.connect(ruta, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS dominios (
+                host TEXT PRIMARY KEY,
+                paginas INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS paginas (
+                host TEXT NOT NULL,
+                url TEXT NOT NULL,
+                PRIMARY KEY (host, url)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS lineas (
+                host TEXT NOT NULL,
+                huella INTEGER NOT NULL,
+                paginas INTEGER NOT NULL,
+                PRIMARY KEY (host, huella)
+            ) WITHOUT ROWID;
+        """)
+
+    def _candidata(self, linea: str) -> bool:
+        return (len(linea) <= self.largo_maximo and linea.count(" ") < PALABRAS_MAXIMAS_PLANTILLA
+                and not PATRON_PROTEGIDO.search(linea))
+
+    def _registrar(self, host: str, url: str, huellas: set) -> int:
+        """Suma la página (una sola vez por URL) a los conteos del dominio y retorna cuántas páginas lleva."""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            nueva = self._db.execute("INSERT OR IGNORE INTO paginas (host, url) VALUES (?, ?)", (host, url)).rowcount
+            if nueva:
+                self._db.execute("INSERT INTO dominios (host, paginas) VALUES (?, 1) "
+                                 "ON CONFLICT(host) DO UPDATE SET paginas = paginas + 1", (host,))
+                self._db.executemany("INSERT INTO lineas (host, huella, paginas) VALUES (?, ?, 1) "
+                                     "ON CONFLICT(host, huella) DO UPDATE SET paginas = paginas + 1",
+                                     ((host, h) for h in huellas))
+            total = self._db.execute("SELECT paginas FROM dominios WHERE host = ?", (host,)).fetchone()
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        return total[0] if total else 0
+
+    def _frecuentes(self, host: str, huellas: List[int], minimo: int) -> set:
+        frecuentes = set()
+        for i in range(0, len(huellas), TAMANO_BLOQUE_SQL):
+            bloque = huellas[i:i + TAMANO_BLOQUE_SQL]
+            filas = self._db.execute(
+                f"SELECT huella FROM lineas WHERE host = ? AND paginas >= ? AND huella IN ({','.join('?' * len(bloque))})",
+                (host, minimo, *bloque))
+            frecuentes.update(h for (h,) in filas)
+        return frecuentes
+
+    def limpiar(self, url: str, texto: str) -> str:
+        """Registra la página y devuelve `texto` (ya normalizado) sin las líneas de plantilla del dominio."""
+        if not url or not texto:
+            return texto
+        host = host_de(url)
+        lineas = texto.split("\n")
+        huellas = [huella_linea(l) if self._candidata(l) else None for l in lineas]
+        candidatas = {h for h in huellas if h is not None}
+        total = self._registrar(host, url, candidatas)
+        if total < self.min_paginas or not candidatas:
+            return texto
+        frecuentes = self._frecuentes(host, list(candidatas), max(2, math.ceil(self.umbral * total)))
+        if not frecuentes:
+            return texto
+        conservadas = [l for l, h in zip(lineas, huellas) if h not in frecuentes]
+        if not conservadas:
+            return texto
+        limpio = "\n".join(conservadas)
+        REGISTRO.contador("plantilla_caracteres_quitados_total", "Caracteres quitados por plantillas de dominio",
+                          host=host).inc(len(texto) - len(limpio))
+        return limpio
+
+    def resumen(self) -> Dict[str, Dict]:
+        """Por dominio: páginas vistas y líneas que hoy se consideran plantilla."""
+        resumen = {}
+        for host, paginas in self._db.execute("SELECT host, paginas FROM dominios ORDER BY host").fetchall():
+            minimo = max(2, math.ceil(self.umbral * paginas))
+            plantilla = self._db.execute("SELECT COUNT(*) FROM lineas WHERE host = ? AND paginas >= ?",
+                                         (host, minimo)).fetchone()[0] if paginas >= self.min_paginas else 0
+            resumen[host] = {"paginas": paginas, "lineas_plantilla": plantilla}
+        return resumen
+
+    def cerrar(self):
+        self._db.close()
@@ -0,0 +1,264 @@
+"""
+Capa de resiliencia compartida para las descargas HTTP de los scrapers.
+
+- `PoliticaReintentos`: backoff exponencial con jitter completo que respeta Retry-After
+  (segundos o fecha HTTP) en 429/503.
+- `CircuitoHost`: circuit breaker por host. Tras `umbral_fallos` fallos consecutivos se abre y
+  rechaza peticiones sin tocar la red durante `enfriamiento` segundos; luego deja pasar una sola
+  petición de prueba (semiabierto) que lo cierra o lo vuelve a abrir.
+- `ConcurrenciaAdaptativa`: límite de peticiones simultáneas por host con AIMD: crece de a poco
+  con cada éxito y se reduce a la mitad ante 429/503, timeouts o latencia muy por sobre la base.
+- `RegistroHosts`: un circuito y un control de concurrencia por host, compartidos por todas las
+  estrategias del proceso (`REGISTRO`).
+
+Se usa desde código asíncrono (`leychile_client`) y síncrono (`solicitar_con_reintentos`, usado
+por python_scraper/scraper.py). Benchmark con fallas inyectadas: benchmarks/bench_resiliencia.py.
+"""
+import os
+import time
+import random
+import asyncio
+import threading
+import contextlib
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+REINTENTOS = int(os.getenv("RESILIENCIA_REINTENTOS", "4"))
+ESPERA_BASE_SEGUNDOS = float(os.getenv("RESILIENCIA_ESPERA_BASE", "0.5"))
+ESPERA_MAXIMA_SEGUNDOS = float(os.getenv("RESILIENCIA_ESPERA_MAXIMA", "30"))
+UMBRAL_CIRCUITO = int(os.getenv("RESILIENCIA_UMBRAL_CIRCUITO", "5"))
+ENFRIAMIENTO_CIRCUITO_SEGUNDOS = float(os.getenv("RESILIENCIA_ENFRIAMIENTO", "30"))
+
+ESTADOS_REINTENTABLES = frozenset({408, 425, 429, 500, 502, 503, 504})
+# Estados que indican que el host está saturado (además de los timeouts)
+ESTADOS_CONGESTION = frozenset({429, 503})
+# Un Retry-After absurdo no debe congelar la corrida
+RETRY_AFTER_MAXIMO_SEGUNDOS = 120.0
+# Por debajo de esta latencia (segundos) nunca se considera que el host está saturado
+LATENCIA_MINIMA_CONGESTION = 1.0
+
+
+class CircuitoAbiertoError(Exception):
+    """El host está marcado como caído; la petición no se envió."""
+
+
+def parsear_retry_after(valor: Optional[str]) -> Optional[float]:
+    """Segundos indicados por una cabecera Retry-After (número o fecha HTTP), o None."""
+    if not valor:
+        return None
+    valor = valor.strip()
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        fecha = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    if fecha is None:
+        return None
+    return max(0.0, fecha.timestamp() - time.time())
+
+
+class PoliticaReintentos:
+    def __init__(self, intentos: int = REINTENTOS, base: float = ESPERA_BASE_SEGUNDOS,
+                 maximo: float = ESPERA_MAXIMA_SEGUNDOS, estados_reintentables=ESTADOS_REINTENTABLES):
+        self.intentos = max(1, intentos)
+        self.base = base
+        self.maximo = maximo
+        self.estados_reintentables = frozenset(estados_reintentables)
+
+    def es_reintentable(self, status: Optional[int]) -> bool:
+        return status in self.estados_reintentables
+
+    def espera(self, intento: int, retry_after: Optional[float] = None) -> float:
+        """Espera antes del intento `intento + 1` (jitter completo: uniforme entre 0 y el tope exponencial)."""
+        tope = min(self.maximo, self.base * (2 ** (intento - 1)))
+        espera = random.uniform(0, tope)
+        if retry_after is not None:
+            espera = max(espera, min(retry_after, RETRY_AFTER_MAXIMO_SEGUNDOS))
+        return espera
+
+
+class CircuitoHost:
+    CERRADO, ABIERTO, SEMIABIERTO = "cerrado", "abierto", "semiabierto"
+
+    def __init__(self, umbral_fallos: int = UMBRAL_CIRCUITO, enfriamiento: float = ENFRIAMIENTO_CIRCUITO_SEGUNDOS):
+        self.umbral_fallos = max(1, umbral_fallos)
+        self.enfriamiento = enfriamiento
+        self.estado = self.CERRADO
+        self.fallos_consecutivos = 0
+        self.aperturas = 0
+        self._abierto_desde = 0.0
+        self._prueba_en_curso = False
+        self._prueba_desde = 0.0
+        self._lock = threading.Lock()
+
+    def permitir(self) -> bool:
+        with self._lock:
+            if self.estado == self.CERRADO:
+                return True
+            if self.estado == self.ABIERTO and time.monotonic() - self._abierto_desde >= self.enfriamiento:
+                self.estado = self.SEMIABIERTO
+                self._prueba_en_curso = False
+            # Si la prueba anterior nunca informó (p. ej. tarea cancelada) se permite otra
+            if self.estado == self.SEMIABIERTO and (
+                    not self._prueba_en_curso or time.monotonic() - self._prueba_desde >= self.enfriamiento):
+                self._prueba_en_curso = True
+                self._prueba_desde = time.monotonic()
+                return True
+            return False
+
+    def espera_restante(self) -> float:
+        with self._lock:
+            if self.estado != self.ABIERTO:
+                return 0.0
+            return max(0.0, self.enfriamiento - (time.monotonic() - self._abierto_desde))
+
+    def registrar_exito(self):
+        with self._lock:
+            self.estado = self.CERRADO
+            self.fallos_consecutivos = 0
+            self._prueba_en_curso = False
+
+    def registrar_fallo(self):
+        with self._lock:
+            self.fallos_consecutivos += 1
+            if self.estado == self.SEMIABIERTO or self.fallos_consecutivos >= self.umbral_fallos:
+                if self.estado != self.ABIERTO:
+                    self.aperturas += 1
+                self.estado = self.ABIERTO
+                self._abierto_desde = time.monotonic()
+                self._prueba_en_curso = False
+
+
+class ConcurrenciaAdaptativa:
+    """
+    Límite AIMD de peticiones en vuelo para un host. `ranura()` es un context manager asíncrono;
+    las señales (`registrar_exito` / `registrar_congestion`) ajustan el límite.
+    """
+
+    def __init__(self, maximo: int, minimo: int = 1, factor_latencia: float = 3.0):
+        self.maximo = max(1, maximo)
+        self.minimo = max(1, min(minimo, self.maximo))
+        self.limite = float(self.maximo)
+        self.factor_latencia = factor_latencia
+        self.en_uso = 0
+        self.latencia_base: Optional[float] = None
+        self.reducciones = 0
+        self._ultima_reduccion = 0.0
+        self._liberada: Optional[asyncio.Event] = None
+        self._loop = None
+
+    @contextlib.asynccontextmanager
+    async def ranura(self):
+        # El registro vive entre varios asyncio.run: el evento se recrea en cada event loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._liberada = asyncio.Event()
+        while self.en_uso >= int(self.limite):
+            self._liberada.clear()
+            await self._liberada.wait()
+        self.en_uso += 1
+        try:
+            yield
+        finally:
+            self.en_uso -= 1
+            self._liberada.set()
+
+    def registrar_exito(self, latencia: Optional[float] = None):
+        """`latencia`: segundos hasta recibir las cabeceras (sin leer el cuerpo, que depende del tamaño)."""
+        if latencia is not None:
+            # Base = la menor latencia "típica" vista (media móvil que solo baja rápido)
+            if self.latencia_base is None or latencia < self.latencia_base:
+                self.latencia_base = latencia
+            else:
+                self.latencia_base = 0.95 * self.latencia_base + 0.05 * latencia
+            if latencia > max(self.factor_latencia * self.latencia_base, LATENCIA_MINIMA_CONGESTION):
+                self.registrar_congestion()
+                return
+        self.limite = min(self.maximo, self.limite + 1.0 / self.limite)
+
+    def registrar_congestion(self):
+        ahora = time.monotonic()
+        # Una sola reducción por "ráfaga" de señales: las peticiones que ya estaban en vuelo
+        # reportan la misma congestión
+        if ahora - self._ultima_reduccion < 1.0:
+            return
+        self._ultima_reduccion = ahora
+        self.reducciones += 1
+        self.limite = max(float(self.minimo), self.limite / 2)
+
+
+class RegistroHosts:
+    def __init__(self, umbral_fallos: int = UMBRAL_CIRCUITO, enfriamiento: float = ENFRIAMIENTO_CIRCUITO_SEGUNDOS):
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento = enfriamiento
+        self._circuitos: Dict[str, CircuitoHost] = {}
+        self._concurrencias: Dict[str, ConcurrenciaAdaptativa] = {}
+        self._lock = threading.Lock()
+
+    def circuito(self, host: str) -> CircuitoHost:
+        with self._lock:
+            if host not in self._circuitos:
+                self._circuitos[host] = CircuitoHost(self.umbral_fallos, self.enfriamiento)
+            return self._circuitos[host]
+
+    def concurrencia(self, host: str, maximo: int) -> ConcurrenciaAdaptativa:
+        with self._lock:
+            if host not in self._concurrencias:
+                self._concurrencias[host] = ConcurrenciaAdaptativa(maximo)
+            return self._concurrencias[host]
+
+    def resumen(self) -> Dict[str, Dict]:
+        hosts = set(self._circuitos) | set(self._concurrencias)
+        return {h: {"circuito": self._circuitos[h].estado if h in self._circuitos else None,
+                    "aperturas": self._circuitos[h].aperturas if h in self._circuitos else 0,
+                    "limite_concurrencia": round(self._concurrencias[h].limite, 2) if h in self._concurrencias else None}
+                for h in sorted(hosts)}
+
+
+# Registro compartido por todo el proceso: un host caído lo es para todas las estrategias
+REGISTRO = RegistroHosts()
+
+
+def host_de(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+
+def solicitar_con_reintentos(solicitar: Callable, url: str, politica: Optional[PoliticaReintentos] = None,
+                             registro: Optional[RegistroHosts] = None, **kwargs):
+    """
+    Llama `solicitar(url, **kwargs)` (p. ej. requests.get) con reintentos y circuit breaker por host.
+    Retorna la última respuesta (puede ser un estado de error no reintentable o agotado) o relanza
+    la última excepción. Lanza CircuitoAbiertoError si el host sigue caído tras los intentos.
+    """
+    politica = politica or PoliticaReintentos()
+    circuito = (registro or REGISTRO).circuito(host_de(url))
+    for intento in range(1, politica.intentos + 1):
+        ultimo = intento == politica.intentos
+        if not circuito.permitir():
+            if ultimo:
+                raise CircuitoAbiertoError(f"Circuito abierto para {host_de(url)}")
+            time.sleep(max(circuito.espera_restante(), politica.espera(intento)))
+            continue
+        try:
+            resp = solicitar(url, **kwargs)
+        except Exception:
+            circuito.registrar_fallo()
+            if ultimo:
+                raise
+            time.sleep(politica.espera(intento))
+            continue
+        if not politica.es_reintentable(resp.status_code):
+            circuito.registrar_exito()
+            return resp
+        circuito.registrar_fallo()
+        if ultimo:
+            return resp
+        retry_after = parsear_retry_after(resp.headers.get("Retry-After"))
+        resp.close()
+        print(f"[WARN] HTTP {resp.status_code} en {url}; reintento {intento}/{politica.intentos - 1}.")
+        time.sleep(politica.espera(intento, retry_after))
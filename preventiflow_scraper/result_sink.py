@@ -0,0 +1,277 @@
+"""
+Sumidero de resultados append-only: reemplaza el archivo JSON (indent=2) por llamada.
+
+- Segmentos `<prefijo>_<fecha>_<pid>_<n>.jsonl.gz`: cada llamada a `escribir` agrega un miembro
+  gzip completo con una línea JSON por resultado (una sola escritura al disco). Un archivo gzip
+  puede tener varios miembros concatenados, así que el segmento se lee con cualquier herramienta
+  (`zcat`), y si el proceso muere a mitad de una escritura solo se pierde ese último miembro.
+- El segmento rota al superar `max_bytes`; cada instancia (cada proceso) escribe sus propios
+  segmentos, así que varios procesos pueden compartir el directorio.
+- `indice.sqlite3` guarda, por clave de norma (la misma de job_store.clave_norma), el segmento,
+  el desplazamiento y largo del miembro y la línea dentro de él: `LectorResultados.obtener(clave)`
+  descomprime solo ese miembro.
+- `reproducir` recorre los segmentos en orden y entrega solo la última versión de cada norma, en
+  lotes, p. ej. para `database_manager.guardar_lote` (re-subir una corrida a Supabase).
+
+Variables de entorno: SCRAPER_RESULTADOS_DIR, SCRAPER_SEGMENTO_MAX_MB, SCRAPER_RESULTADOS_COMPRESION.
+
+Uso:
+    python result_sink.py resumen [directorio]
+    python result_sink.py mostrar <clave> [directorio]
+    python result_sink.py reproducir [directorio]      # re-sube la última versión de cada norma a Supabase
+"""
+import os
+import sys
+import json
+import gzip
+import time
+import zlib
+import sqlite3
+import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from http_cache import canonicalizar_url
+from metricas import REGISTRO
+
+RESULTADOS_DIR = os.getenv("SCRAPER_RESULTADOS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "results"))
+SEGMENTO_MAX_BYTES = int(float(os.getenv("SCRAPER_SEGMENTO_MAX_MB", "64")) * 1024 * 1024)
+# 3: casi la misma tasa que 6 (ver benchmarks/bench_sink.py) a menos de la mitad de CPU
+NIVEL_COMPRESION = int(os.getenv("SCRAPER_RESULTADOS_COMPRESION", "3"))
+EXTENSION_SEGMENTO = ".jsonl.gz"
+NOMBRE_INDICE = "indice.sqlite3"
+
+
+def clave_resultado(resultado: Dict) -> str:
+    """URL pública canónica (o `url`, en los scrapers de una sola API), o el nombre de la norma."""
+    for campo in ("url_publica", "url"):
+        url = resultado.get(campo) if isinstance(resultado, dict) else None
+        if isinstance(url, str) and url.strip():
+            return canonicalizar_url(url)
+    nombre = resultado.get("nombre_norma", "") if isinstance(resultado, dict) else ""
+    return f"nombre:{str(nombre or '').strip()}"
+
+
+def _abrir_indice(directorio: str) -> sqlite3.Connection:
+    db = sqlite3.connect(os.path.join(directorio, NOMBRE_INDICE), timeout=30, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS resultados (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            clave TEXT NOT NULL,
+            segmento TEXT NOT NULL,
+            desplazamiento INTEGER NOT NULL,
+            longitud INTEGER NOT NULL,
+            linea INTEGER NOT NULL,
+            estrategia TEXT,
+            escrito REAL NOT NULL
+        )
+    """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_resultados_clave ON resultados(clave, id)")
+    return db
+
+
+def _miembros(ruta: str) -> Iterator[Tuple[int, int, bytes]]:
+    """(desplazamiento, longitud, contenido descomprimido) de cada miembro gzip completo del segmento."""
+    with open(ruta, "rb") as f:
+        datos = f.read()
+    inicio = 0
+    while inicio < len(datos):
+        descompresor = zlib.decompressobj(wbits=31)
+        try:
+            contenido = descompresor.decompress(datos[inicio:])
+        except zlib.error:
+            print(f"[WARN] {os.path.basename(ruta)}: miembro corrupto en el byte {inicio}; se ignora el resto.")
+            return
+        if not descompresor.eof:
+            # Último miembro a medio escribir (el proceso murió): se descarta
+            print(f"[WARN] {os.path.basename(ruta)}: miembro incompleto en el byte {inicio}; se ignora.")
+            return
+        longitud = len(datos) - inicio - len(descompresor.unused_data)
+        yield inicio, longitud, contenido
+        inicio += longitud
+
+
+class SumideroResultados:
+    def __init__(self, directorio: str = RESULTADOS_DIR, prefijo: str = "resultados",
+                 max_bytes: int = SEGMENTO_MAX_BYTES, nivel_compresion: int = NIVEL_COMPRESION):
+        self.directorio = directorio
+        self.prefijo = prefijo.replace(" ", "_").lower()
+        self.max_bytes = max(1, max_bytes)
+        self.nivel_compresion = nivel_compresion
+        os.makedirs(directorio, exist_ok=True)
+        self._indice = _abrir_indice(directorio)
+        self._archivo = None
+        self._segmento = None
+        self._numero = 0
+        self._marca = f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+
+    @property
+    def segmento(self) -> Optional[str]:
+        return os.path.join(self.directorio, self._segmento) if self._segmento else None
+
+    def _rotar(self):
+        if self._archivo is not None:
+            self._archivo.close()
+        self._numero += 1
+        self._segmento = f"{self.prefijo}_{self._marca}_{self._numero:05d}{EXTENSION_SEGMENTO}"
+        self._archivo = open(os.path.join(self.directorio, self._segmento), "ab")
+
+    def escribir(self, resultados: Iterable[Dict], estrategia: Optional[str] = None,
+                 claves: Optional[List[str]] = None) -> int:
+        """Agrega los resultados como un miembro gzip y los indexa. Retorna cuántos se escribieron."""
+        resultados = [r for r in resultados if r is not None]
+        if not resultados:
+            return 0
+        claves = claves if claves is not None else [clave_resultado(r) for r in resultados]
+        ahora = time.time()
+        with REGISTRO.etapa("sumidero", elementos=len(resultados)) as etapa:
+            lineas = []
+            for clave, resultado in zip(claves, resultados):
+                registro = {"clave": clave, "estrategia": estrategia, "escrito": ahora, "resultado": resultado}
+                lineas.append(json.dumps(registro, ensure_ascii=False, default=str))
+            miembro = gzip.compress(("\n".join(lineas) + "\n").encode("utf-8"), compresslevel=self.nivel_compresion)
+
+            if self._archivo is None or self._archivo.tell() >= self.max_bytes:
+                self._rotar()
+            desplazamiento = self._archivo.tell()
+            self._archivo.write(miembro)
+            self._archivo.flush()
+            etapa.bytes = len(miembro)
+        self._indice.execute("BEGIN")
+        self._indice.executemany(
+            "INSERT INTO resultados (clave, segmento, desplazamiento, longitud, linea, estrategia, escrito) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(clave, self._segmento, desplazamiento, len(miembro), i, estrategia, ahora) for i, clave in enumerate(claves)])
+        self._indice.execute("COMMIT")
+        return len(resultados)
+
+    def cerrar(self):
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+        self._indice.close()
+
+
+class LectorResultados:
+    def __init__(self, directorio: str = RESULTADOS_DIR):
+        self.directorio = directorio
+        self._indice = _abrir_indice(directorio)
+
+    def segmentos(self) -> List[str]:
+        """Segmentos en orden de escritura (el nombre lleva fecha, pid y número)."""
+        nombres = [n for n in os.listdir(self.directorio) if n.endswith(EXTENSION_SEGMENTO)]
+        return sorted(nombres, key=lambda n: (os.path.getmtime(os.path.join(self.directorio, n)), n))
+
+    def iterar(self, segmentos: Optional[List[str]] = None) -> Iterator[Dict]:
+        """Todos los registros ({"clave", "estrategia", "escrito", "resultado"}) en orden de escritura."""
+        for nombre in segmentos or self.segmentos():
+            for _, _, contenido in _miembros(os.path.join(self.directorio, nombre)):
+                for linea in contenido.decode("utf-8").splitlines():
+                    if linea:
+                        yield json.loads(linea)
+
+    def obtener(self, clave: str) -> Optional[Dict]:
+        """Última versión guardada de una norma, leyendo solo su miembro."""
+        fila = self._indice.execute(
+            "SELECT segmento, desplazamiento, longitud, linea FROM resultados WHERE clave = ? ORDER BY id DESC LIMIT 1",
+            (clave,)).fetchone()
+        if fila is None:
+            return None
+        segmento, desplazamiento, longitud, linea = fila
+        with open(os.path.join(self.directorio, segmento), "rb") as f:
+            f.seek(desplazamiento)
+            contenido = gzip.decompress(f.read(longitud))
+        return json.loads(contenido.decode("utf-8").splitlines()[linea])
+
+    def claves(self) -> List[str]:
+        return [c for (c,) in self._indice.execute("SELECT DISTINCT clave FROM resultados ORDER BY clave")]
+
+    def reconstruir_indice(self) -> int:
+        """Rehace el índice recorriendo los segmentos (si se borró o se copiaron segmentos de otra máquina)."""
+        self._indice.execute("BEGIN")
+        self._indice.execute("DELETE FROM resultados")
+        total = 0
+        for nombre in self.segmentos():
+            for desplazamiento, longitud, contenido in _miembros(os.path.join(self.directorio, nombre)):
+                filas = []
+                for i, linea in enumerate(contenido.decode("utf-8").splitlines()):
+                    registro = json.loads(linea)
+                    filas.append((registro["clave"], nombre, desplazamiento, longitud, i,
+                                  registro.get("estrategia"), registro.get("escrito") or 0))
+                self._indice.executemany(
+                    "INSERT INTO resultados (clave, segmento, desplazamiento, longitud, linea, estrategia, escrito) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", filas)
+                total += len(filas)
+        self._indice.execute("COMMIT")
+        return total
+
+    def ultimos(self, tamano_lote: int = 200) -> Iterator[List[Dict]]:
+        """Última versión de cada norma, en lotes, leyendo los segmentos de forma secuencial."""
+        vigentes = {(s, d, l) for s, d, l in self._indice.execute(
+            "SELECT segmento, desplazamiento, linea FROM resultados WHERE id IN "
+            "(SELECT MAX(id) FROM resultados GROUP BY clave)")}
+        necesarios = {s for s, _, _ in vigentes}
+        segmentos = [s for s in self.segmentos() if s in necesarios]
+        lote = []
+        for nombre in segmentos:
+            for desplazamiento, _, contenido in _miembros(os.path.join(self.directorio, nombre)):
+                for i, linea in enumerate(contenido.decode("utf-8").splitlines()):
+                    if (nombre, desplazamiento, i) in vigentes:
+                        lote.append(json.loads(linea)["resultado"])
+                        if len(lote) >= tamano_lote:
+                            yield lote
+                            lote = []
+        if lote:
+            yield lote
+
+    def resumen(self) -> Dict:
+        filas, claves = self._indice.execute("SELECT COUNT(*), COUNT(DISTINCT clave) FROM resultados").fetchone()
+        segmentos = self.segmentos()
+        return {"segmentos": len(segmentos), "registros": filas, "normas": claves,
+                "bytes": sum(os.path.getsize(os.path.join(self.directorio, s)) for s in segmentos)}
+
+    def cerrar(self):
+        self._indice.close()
+
+
+def reproducir(directorio: str = RESULTADOS_DIR, guardar: Optional[Callable[[List[Dict]], List[Dict]]] = None,
+               tamano_lote: int = 200) -> Dict[str, int]:
+    """Envía la última versión de cada norma a `guardar` (por defecto database_manager.guardar_lote)."""
+    if guardar is None:
+        from database_manager import guardar_lote as guardar
+    lector = LectorResultados(directorio)
+    conteo: Dict[str, int] = {}
+    try:
+        for lote in lector.ultimos(tamano_lote):
+            for fila in guardar(lote) or []:
+                conteo[fila["accion"]] = conteo.get(fila["accion"], 0) + 1
+    finally:
+        lector.cerrar()
+    return conteo
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("resumen", "mostrar", "reproducir"):
+        print(__doc__)
+        sys.exit(1)
+    comando = sys.argv[1]
+    if comando == "mostrar":
+        if len(sys.argv) < 3:
+            print("Uso: python result_sink.py mostrar <clave> [directorio]")
+            sys.exit(1)
+        lector = LectorResultados(sys.argv[3] if len(sys.argv) > 3 else RESULTADOS_DIR)
+        print(json.dumps(lector.obtener(sys.argv[2]), ensure_ascii=False, indent=2))
+        lector.cerrar()
+        return
+    directorio = sys.argv[2] if len(sys.argv) > 2 else RESULTADOS_DIR
+    if comando == "resumen":
+        lector = LectorResultados(directorio)
+        print(f"[INFO] {lector.resumen()}")
+        lector.cerrar()
+    else:
+        conteo = reproducir(directorio)
+        print("[INFO] Reproducción terminada: " + ", ".join(f"{k}={v}" for k, v in sorted(conteo.items())))
+
+
+if __name__ == "__main__":
+    main()
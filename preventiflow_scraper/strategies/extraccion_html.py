@@ -0,0 +1,22 @@
+"""
+Limpieza del HTML de una página completa, compartida por UniversalSeleniumStrategy y
+StaticFirstStrategy: ambas vías entregan exactamente el mismo texto. No importa Selenium, así la
+vía estática funciona sin él instalado.
+"""
+from bs4 import BeautifulSoup
+
+from normalizacion import normalizar_texto
+
+SELECTORES_RUIDO = 'script, style, nav, header, footer, aside, .menu, .sidebar, .footer'
+
+
+def texto_de_sopa(sopa: BeautifulSoup) -> str:
+    """Texto del body sin menús, scripts ni pies de página. Modifica `sopa`."""
+    # Elimina etiquetas de script, estilo, nav, header y footer
+    for elemento in sopa.select(SELECTORES_RUIDO):
+        elemento.decompose()
+    return normalizar_texto(sopa.body.get_text() if sopa.body else "")
+
+
+def extraer_texto_html(html: str) -> str:
+    return texto_de_sopa(BeautifulSoup(html, 'html.parser'))
@@ -1,8 +1,9 @@
 from .base_strategy import BaseStrategy
 from typing import List, Dict
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse, parse_qs
+from extractor_html import ExtractorTexto
+from articulos import articulos_de_textos
+from leychile_client import traducir_url_api, obtener_normas_json
+from metricas import REGISTRO
 
 class LeychileApiStrategy(BaseStrategy):
     @property
@@ -10,6 +11,11 @@ class LeychileApiStrategy(BaseStrategy):
         return "LeyChile (API Directa)"
 
     def _procesar_json(self, datos_json: dict) -> str:
+        textos = self._textos_fragmentos(datos_json)
+        return textos if isinstance(textos, str) else '\n\n'.join(textos)
+
+    def _textos_fragmentos(self, datos_json: dict):
+        """Texto de cada fragmento de `data.html`, o el mensaje de error si la estructura no es la esperada."""
         html_list = None
         if isinstance(datos_json, dict):
             if 'data' in datos_json and isinstance(datos_json['data'], dict):
@@ -19,69 +25,63 @@ class LeychileApiStrategy(BaseStrategy):
         if not html_list or not isinstance(html_list, list):
             return "[ERROR] Estructura JSON inesperada: no se encontró 'html'"
         textos = []
+        # Un solo tokenizador para todos los fragmentos (mismo texto que BeautifulSoup.get_text)
+        extractor = ExtractorTexto()
         for fragment in html_list:
             html = fragment.get('t', '')
             if html:
-                soup = BeautifulSoup(html, 'html.parser')
-                textos.append(soup.get_text(separator=' ', strip=True))
-        return '\n\n'.join(textos)
+                textos.append(extractor.texto(html))
+        return textos
 
     def run(self, driver, normas: List[Dict]) -> List[Dict]:
-        resultados = []
-        for norma in normas:
-            url = norma.get("url_publica")
-            url_api = None
-            # 1. Si ya es una URL de API
-            if url and '/servicios/Navegar/get_norma_json' in url:
-                url_api = url
-            # 2. Si es una URL pública
-            elif url and '/leychile/navegar' in url:
-                parsed = urlparse(url)
-                params = parse_qs(parsed.query)
-                id_norma = params.get('idNorma', [None])[0]
-                if id_norma:
-                    url_api = f'https://nuevo.leychile.cl/servicios/Navegar/get_norma_json?idNorma={id_norma}'
-                else:
-                    resultado = norma.copy()
-                    resultado.update({
-                        "status": "error",
-                        "texto_limpio": "No se encontró parámetro idNorma en la URL pública.",
-                        "url_fuente_datos": None,
-                        "json_crudo": None
-                    })
-                    resultados.append(resultado)
-                    continue
-            else:
+        resultados: List[Dict] = [None] * len(normas)
+        pendientes = []  # (posición, url_api)
+        for idx, norma in enumerate(normas):
+            url_api, error = traducir_url_api(norma.get("url_publica"))
+            if error:
                 resultado = norma.copy()
                 resultado.update({
                     "status": "error",
-                    "texto_limpio": "URL no reconocida como pública ni de API de LeyChile.",
+                    "texto_limpio": error,
                     "url_fuente_datos": None,
                     "json_crudo": None
                 })
-                resultados.append(resultado)
-                continue
+                resultados[idx] = resultado
+            else:
+                pendientes.append((idx, url_api))
 
-            try:
-                resp = requests.get(url_api)
-                resp.raise_for_status()
-                datos_json = resp.json()
-                texto_limpio = self._procesar_json(datos_json)
-                resultado = norma.copy()
+        # Descarga concurrente con pool de conexiones compartido; el orden se preserva
+        with REGISTRO.etapa("descarga", elementos=len(pendientes), fuente="leychile") as etapa:
+            respuestas = obtener_normas_json([url_api for _, url_api in pendientes])
+            etapa.bytes = sum(len(r.texto or "") for r in respuestas)
+        REGISTRO.contador("descargas_desde_cache_total", "Respuestas servidas por la caché HTTP local",
+                          fuente="leychile").inc(sum(1 for r in respuestas if r.desde_cache))
+        for (idx, url_api), respuesta in zip(pendientes, respuestas):
+            resultado = normas[idx].copy()
+            if respuesta.ok:
+                with REGISTRO.etapa("parseo", fuente="leychile") as etapa:
+                    textos = self._textos_fragmentos(respuesta.datos)
+                    etapa.bytes = len(respuesta.texto or "")
+                if isinstance(textos, str):
+                    texto_limpio, articulos = textos, None
+                else:
+                    texto_limpio = '\n\n'.join(textos)
+                    # Registros por artículo: guardar_lote sincroniza solo los que cambiaron (articulos.py)
+                    with REGISTRO.etapa("parseo_articulos", fuente="leychile"):
+                        articulos = articulos_de_textos(textos)
                 resultado.update({
                     "status": "ok",
                     "texto_limpio": texto_limpio,
                     "url_fuente_datos": url_api,
-                    "json_crudo": datos_json
+                    "json_crudo": respuesta.datos,
+                    "articulos": articulos
                 })
-                resultados.append(resultado)
-            except Exception as e:
-                resultado = norma.copy()
+            else:
                 resultado.update({
                     "status": "error",
-                    "texto_limpio": f"Error al consultar API: {e}",
+                    "texto_limpio": f"Error al consultar API: {respuesta.error}",
                     "url_fuente_datos": url_api,
                     "json_crudo": None
                 })
-                resultados.append(resultado)
+            resultados[idx] = resultado
         return resultados
@@ -0,0 +1,126 @@
+"""
+Utilidades para estrategias basadas en Selenium:
+- `esperar_pagina_lista`: reemplaza el `time.sleep` fijo; retorna apenas el DOM se estabiliza
+  y la red queda inactiva (o, pasados unos segundos, con el DOM quieto aunque la página siga
+  consultando la red), con un tiempo máximo como techo.
+- `bloquear_recursos`: evita descargar imágenes, fuentes, multimedia, etc. vía DevTools (CDP).
+"""
+import os
+import time
+from typing import Iterable, List
+
+TIMEOUT_LISTA_SEGUNDOS = float(os.getenv("SCRAPER_TIMEOUT_PAGINA", "15"))
+# Tiempo que el DOM (o la red) debe permanecer sin cambios para considerar la página lista
+VENTANA_ESTABLE_SEGUNDOS = float(os.getenv("SCRAPER_VENTANA_ESTABLE", "0.5"))
+# Pasado este tiempo ya no se exige red inactiva (long-polling, sondeos, beacons periódicos nunca la
+# dejan en cero): basta con que el DOM lleve VENTANA_ESTABLE_LARGA sin cambios
+ESPERA_RED_SEGUNDOS = float(os.getenv("SCRAPER_ESPERA_RED", "3"))
+VENTANA_ESTABLE_LARGA_SEGUNDOS = float(os.getenv("SCRAPER_VENTANA_ESTABLE_LARGA", "1.5"))
+INTERVALO_SONDEO_SEGUNDOS = 0.1
+
+RECURSOS_BLOQUEADOS = [t.strip() for t in os.getenv("SCRAPER_BLOQUEAR_RECURSOS", "image,font,media").split(",") if t.strip()]
+
+PATRONES_POR_TIPO = {
+    "image": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp", "*.avif"],
+    "font": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    "media": ["*.mp4", "*.webm", "*.mp3", "*.ogg", "*.wav", "*.m4a", "*.avi", "*.mov"],
+    "stylesheet": ["*.css"],
+}
+
+# Cuenta las peticiones fetch/XHR en vuelo; se inyecta antes de que corra cualquier script de la página
+_SCRIPT_MONITOR_RED = """
+(function () {
+  if (window.__pendientesRed !== undefined) return;
+  window.__pendientesRed = 0;
+  var fin = function () { window.__pendientesRed = Math.max(0, window.__pendientesRed - 1); };
+  var fetchOriginal = window.fetch;
+  if (fetchOriginal) {
+    window.fetch = function () {
+      window.__pendientesRed++;
+      return fetchOriginal.apply(this, arguments).finally(fin);
+    };
+  }
+  var sendOriginal = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function () {
+    window.__pendientesRed++;
+    this.addEventListener('loadend', fin);
+    return sendOriginal.apply(this, arguments);
+  };
+})();
+"""
+
+_SCRIPT_ESTADO = """
+var body = document.body;
+return [
+  document.readyState,
+  body ? body.getElementsByTagName('*').length : 0,
+  body ? body.innerText.length : 0,
+  performance.getEntriesByType('resource').length,
+  window.__pendientesRed === undefined ? -1 : window.__pendientesRed
+];
+"""
+
+
+def _ejecutar_cdp(driver, comando: str, parametros: dict) -> bool:
+    try:
+        driver.execute_cdp_cmd(comando, parametros)
+        return True
+    except Exception as e:
+        print(f"[WARN] Comando DevTools '{comando}' no disponible: {e}")
+        return False
+
+
+def bloquear_recursos(driver, tipos: Iterable[str] = RECURSOS_BLOQUEADOS) -> List[str]:
+    """Bloquea por extensión los tipos de recurso indicados. Retorna los patrones aplicados."""
+    patrones = [p for tipo in tipos for p in PATRONES_POR_TIPO.get(tipo, [])]
+    if patrones and _ejecutar_cdp(driver, "Network.enable", {}):
+        if _ejecutar_cdp(driver, "Network.setBlockedURLs", {"urls": patrones}):
+            return patrones
+    return []
+
+
+def instalar_monitor_red(driver) -> bool:
+    """Registra el contador de peticiones en vuelo para todas las páginas que cargue el driver."""
+    return _ejecutar_cdp(driver, "Page.addScriptToEvaluateOnNewDocument", {"source": _SCRIPT_MONITOR_RED})
+
+
+def esperar_pagina_lista(driver, timeout: float = TIMEOUT_LISTA_SEGUNDOS,
+                         ventana_estable: float = VENTANA_ESTABLE_SEGUNDOS,
+                         intervalo: float = INTERVALO_SONDEO_SEGUNDOS,
+                         espera_red: float = ESPERA_RED_SEGUNDOS,
+                         ventana_estable_larga: float = VENTANA_ESTABLE_LARGA_SEGUNDOS) -> float:
+    """
+    Espera a que la página esté lista y retorna los segundos transcurridos.
+    Lista = readyState 'complete' y:
+    - durante `ventana_estable` segundos el DOM no cambió (cantidad de nodos y largo del texto) y la
+      red estuvo inactiva (sin fetch/XHR en vuelo ni recursos nuevos): un DOM quieto mientras un
+      fetch sigue en vuelo es un "Cargando...". La ventana de red cuenta desde que termina la
+      última petición, para dar tiempo al script que inserta la respuesta;
+    - o, pasados `espera_red` segundos, el DOM lleva `ventana_estable_larga` sin cambios aunque la
+      red siga ocupada (long-polling, sondeos periódicos).
+    Nunca espera más de `timeout`.
+    """
+    inicio = time.monotonic()
+    firma_dom = firma_red = None
+    dom_desde = red_desde = inicio
+    while True:
+        ahora = time.monotonic()
+        try:
+            estado, nodos, largo_texto, recursos, pendientes = driver.execute_script(_SCRIPT_ESTADO)
+        except Exception:
+            estado = None
+        if estado == 'complete':
+            if (nodos, largo_texto) != firma_dom:
+                firma_dom, dom_desde = (nodos, largo_texto), ahora
+            # Sin monitor (pendientes = -1) solo se observa la llegada de recursos nuevos
+            red_en_uso = pendientes > 0
+            if recursos != firma_red or red_en_uso:
+                firma_red, red_desde = recursos, ahora
+            if ahora - dom_desde >= ventana_estable and ahora - red_desde >= ventana_estable:
+                return ahora - inicio
+            if ahora - inicio >= espera_red and ahora - dom_desde >= ventana_estable_larga:
+                return ahora - inicio
+        if ahora - inicio >= timeout:
+            print(f"[WARN] La página no se estabilizó en {timeout:.1f}s; se continúa con lo disponible.")
+            return ahora - inicio
+        time.sleep(intervalo)
@@ -0,0 +1,261 @@
+"""
+Estrategia "estático primero": pide la página con una petición HTTP simple y solo abre el
+navegador (UniversalSeleniumStrategy) si el HTML recibido no alcanza.
+
+- `evaluar_suficiencia` mide el HTML estático: largo y densidad del texto limpio, marcadores de
+  contenido principal (<main>, <article>, #contenido, "Artículo N") y señales de que la página se
+  arma con JavaScript (contenedor #root/#app vacío, <noscript> que pide activar JavaScript).
+- `DecisionesDominio` recuerda por dominio (SQLite, compartido por los procesos del pool) si el
+  HTML estático sirve. Tras `UMBRAL_ESCALADOS` escalamientos seguidos el dominio pasa directo al
+  navegador, y cada `REVISAR_CADA` visitas se vuelve a probar la vía estática por si el sitio cambió.
+- El texto se extrae con la misma limpieza que la estrategia universal (incluidas las plantillas
+  por dominio de `normalizacion.py`, compartidas con la estrategia de respaldo), así que el
+  resultado no depende de la vía usada; `modo_extraccion` indica cuál fue ("estatico" o "navegador").
+
+Variables de entorno: SCRAPER_ESTATICO_MIN_CARACTERES, SCRAPER_ESTATICO_DENSIDAD_MINIMA,
+SCRAPER_ESTATICO_TIMEOUT, SCRAPER_DECISIONES_DOMINIO (ruta), SCRAPER_ESTATICO_UMBRAL_ESCALADOS,
+SCRAPER_ESTATICO_REVISAR_CADA. Benchmark: benchmarks/bench_estatico.py.
+"""
+import os
+import re
+import time
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Union
+
+import requests
+from bs4 import BeautifulSoup
+
+from .base_strategy import BaseStrategy
+from .extraccion_html import texto_de_sopa
+from resiliencia import PoliticaReintentos, host_de, solicitar_con_reintentos
+from metricas import REGISTRO
+from normalizacion import PlantillasDominio, QUITAR_PLANTILLAS
+
+MIN_CARACTERES = int(os.getenv("SCRAPER_ESTATICO_MIN_CARACTERES", "400"))
+# Texto limpio / bytes de HTML. Las páginas armadas por JS suelen quedar muy por debajo
+DENSIDAD_MINIMA = float(os.getenv("SCRAPER_ESTATICO_DENSIDAD_MINIMA", "0.02"))
+TIMEOUT_ESTATICO_SEGUNDOS = float(os.getenv("SCRAPER_ESTATICO_TIMEOUT", "10"))
+DECISIONES_DOMINIO_PATH = os.getenv(
+    "SCRAPER_DECISIONES_DOMINIO",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "decisiones_dominio.sqlite3"))
+UMBRAL_ESCALADOS = int(os.getenv("SCRAPER_ESTATICO_UMBRAL_ESCALADOS", "2"))
+REVISAR_CADA = int(os.getenv("SCRAPER_ESTATICO_REVISAR_CADA", "25"))
+# Hay vía de respaldo: no vale la pena insistir tanto como en la API de LeyChile
+INTENTOS_ESTATICO = 2
+
+MODO_ESTATICO, MODO_NAVEGADOR = "estatico", "navegador"
+
+SELECTORES_CONTENIDO = 'main, article, [role=main], #content, #contenido, .content, .contenido, #main-content'
+SELECTORES_RAIZ_SPA = '#root, #app, #__next, #___gatsby, [ng-app], [data-reactroot], app-root'
+PATRON_ARTICULO = re.compile(r'\bart[íi]culo\s+\d+', re.IGNORECASE)
+PATRON_PIDE_JS = re.compile(r'javascript', re.IGNORECASE)
+
+CABECERAS_HTML = {
+    "User-Agent": ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                   "Chrome/124.0 Safari/537.36"),
+    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "es-CL,es;q=0.9,en;q=0.5",
+}
+
+
+@dataclass
+class EvaluacionContenido:
+    suficiente: bool
+    caracteres: int
+    densidad: float
+    marcadores: List[str] = field(default_factory=list)
+    senales_js: List[str] = field(default_factory=list)
+    texto: str = ""
+
+
+def evaluar_suficiencia(html: Union[str, bytes], min_caracteres: int = MIN_CARACTERES,
+                        densidad_minima: float = DENSIDAD_MINIMA) -> EvaluacionContenido:
+    """
+    Decide si el HTML estático ya trae el contenido. Basta con texto suficiente y algún marcador
+    de contenido principal o una densidad razonable; con señales de página armada por JS se exige
+    el doble de texto (suele ser solo el esqueleto y un aviso de <noscript>).
+    """
+    sopa = BeautifulSoup(html, 'html.parser')
+    senales_js = []
+    for raiz in sopa.select(SELECTORES_RAIZ_SPA):
+        if len(raiz.get_text(strip=True)) < min_caracteres:
+            senales_js.append(f"raiz_vacia:{raiz.get('id') or raiz.name}")
+            break
+    if any(PATRON_PIDE_JS.search(n.get_text()) for n in sopa.find_all('noscript')):
+        senales_js.append("noscript")
+
+    marcadores = []
+    for nodo in sopa.select(SELECTORES_CONTENIDO):
+        if len(nodo.get_text(strip=True)) >= min_caracteres // 2:
+            marcadores.append(nodo.get('id') or nodo.name)
+            break
+
+    texto = texto_de_sopa(sopa)
+    if PATRON_ARTICULO.search(texto):
+        marcadores.append("articulo")
+    caracteres = len(texto)
+    densidad = caracteres / max(1, len(html))
+    minimo = min_caracteres * 2 if senales_js else min_caracteres
+    suficiente = caracteres >= minimo and (bool(marcadores) or densidad >= densidad_minima)
+    return EvaluacionContenido(suficiente, caracteres, round(densidad, 4), marcadores, senales_js, texto)
+
+
+class DecisionesDominio:
+    """Memoria por dominio de si el HTML estático alcanza. Segura entre procesos (SQLite en WAL)."""
+
+    def __init__(self, ruta: str = DECISIONES_DOMINIO_PATH, umbral_escalados: int = UMBRAL_ESCALADOS,
+                 revisar_cada: int = REVISAR_CADA):
+        self.umbral_escalados = max(1, umbral_escalados)
+        self.revisar_cada = max(1, revisar_cada)
+        self._db = sqlite3.connect(ruta, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS dominios (
+                host TEXT PRIMARY KEY,
+                modo TEXT NOT NULL DEFAULT 'estatico',
+                exitos_estaticos INTEGER NOT NULL DEFAULT 0,
+                escalados INTEGER NOT NULL DEFAULT 0,
+                escalados_seguidos INTEGER NOT NULL DEFAULT 0,
+                visitas INTEGER NOT NULL DEFAULT 0,
+                actualizado REAL NOT NULL
+            )
+        """)
+
+    def modo(self, host: str) -> str:
+        """Vía a usar para `host`. Un dominio marcado para navegador se vuelve a probar cada `revisar_cada` visitas."""
+        fila = self._db.execute("SELECT modo, visitas FROM dominios WHERE host = ?", (host,)).fetchone()
+        if fila is None or fila[0] == MODO_ESTATICO:
+            return MODO_ESTATICO
+        return MODO_ESTATICO if fila[1] % self.revisar_cada == 0 else MODO_NAVEGADOR
+
+    def registrar(self, host: str, estatico_suficiente: Optional[bool]):
+        """
+        True: el HTML estático alcanzó. False: hubo que escalar al navegador. None: se fue directo
+        al navegador por la decisión guardada (solo cuenta la visita).
+        """
+        ahora = time.time()
+        self._db.execute(
+            "INSERT INTO dominios (host, actualizado) VALUES (?, ?) ON CONFLICT(host) DO NOTHING", (host, ahora))
+        if estatico_suficiente is None:
+            self._db.execute("UPDATE dominios SET visitas = visitas + 1, actualizado = ? WHERE host = ?", (ahora, host))
+        elif estatico_suficiente:
+            self._db.execute(
+                "UPDATE dominios SET modo = 'estatico', exitos_estaticos = exitos_estaticos + 1, "
+                "escalados_seguidos = 0, visitas = visitas + 1, actualizado = ? WHERE host = ?", (ahora, host))
+        else:
+            self._db.execute(
+                "UPDATE dominios SET escalados = escalados + 1, escalados_seguidos = escalados_seguidos + 1, "
+                "modo = CASE WHEN escalados_seguidos + 1 >= ? THEN 'navegador' ELSE modo END, "
+                "visitas = visitas + 1, actualizado = ? WHERE host = ?", (self.umbral_escalados, ahora, host))
+
+    def resumen(self) -> Dict[str, Dict]:
+        filas = self._db.execute(
+            "SELECT host, modo, exitos_estaticos, escalados, visitas FROM dominios ORDER BY host").fetchall()
+        return {h: {"modo": m, "exitos_estaticos": e, "escalados": s, "visitas": v} for h, m, e, s, v in filas}
+
+    def cerrar(self):
+        self._db.close()
+
+
+class StaticFirstStrategy(BaseStrategy):
+    """
+    HTTP simple primero, Selenium solo si hace falta. `obtener_driver` entrega el driver a usar al
+    escalar (se llama recién entonces, para no levantar Chrome si ninguna página lo necesita); si
+    no se pasa, se usa el `driver` recibido en `run`.
+    """
+    def __init__(self, obtener_driver: Optional[Callable] = None, decisiones: Optional[DecisionesDominio] = None,
+                 respaldo: Optional[BaseStrategy] = None, politica: Optional[PoliticaReintentos] = None,
+                 timeout: float = TIMEOUT_ESTATICO_SEGUNDOS, plantillas: Optional[PlantillasDominio] = None):
+        self.obtener_driver = obtener_driver
+        self.decisiones = decisiones if decisiones is not None else DecisionesDominio()
+        self.plantillas = plantillas if plantillas is not None else (PlantillasDominio() if QUITAR_PLANTILLAS else None)
+        self._respaldo = respaldo
+        self.politica = politica or PoliticaReintentos(intentos=INTENTOS_ESTATICO)
+        self.timeout = timeout
+        self.sesion = requests.Session()
+        self.sesion.headers.update(CABECERAS_HTML)
+        self.paginas_navegador = 0
+
+    @property
+    def respaldo(self) -> BaseStrategy:
+        """UniversalSeleniumStrategy, importada recién al escalar: la vía estática no necesita Selenium."""
+        if self._respaldo is None:
+            from .universal_selenium_strategy import UniversalSeleniumStrategy
+            self._respaldo = UniversalSeleniumStrategy(plantillas=self.plantillas)
+        return self._respaldo
+
+    @property
+    def name(self) -> str:
+        return "Estático primero (HTTP + Selenium de respaldo)"
+
+    def _descargar(self, url: str) -> Optional[Union[str, bytes]]:
+        resp = solicitar_con_reintentos(self.sesion.get, url, politica=self.politica, timeout=self.timeout)
+        tipo = resp.headers.get("Content-Type", "")
+        if resp.status_code != 200 or "html" not in tipo.lower():
+            print(f"[INFO] {url}: HTTP {resp.status_code} ({tipo or 'sin Content-Type'}), se usará el navegador.")
+            return None
+        # Sin charset en la cabecera, BeautifulSoup lo detecta desde <meta> sobre los bytes
+        return resp.text if "charset" in tipo.lower() else resp.content
+
+    def _intentar_estatico(self, norma: Dict, url: str) -> Optional[Dict]:
+        """Resultado con el HTML estático, o None si hay que escalar al navegador."""
+        with REGISTRO.etapa("descarga", fuente="estatico") as etapa:
+            html = self._descargar(url)
+            etapa.bytes = len(html or "")
+        if html is None:
+            return None
+        with REGISTRO.etapa("limpieza", fuente="estatico"):
+            evaluacion = evaluar_suficiencia(html)
+        if not evaluacion.suficiente:
+            print(f"[INFO] {url}: HTML estático insuficiente ({evaluacion.caracteres} caracteres, "
+                  f"densidad {evaluacion.densidad}, señales JS {evaluacion.senales_js or 'ninguna'}); escalando.")
+            return None
+        print(f"INFO: Texto extraído exitosamente de {url} (HTTP estático).")
+        resultado = norma.copy()
+        resultado['texto_limpio'] = self.plantillas.limpiar(url, evaluacion.texto) if self.plantillas else evaluacion.texto
+        resultado['json_crudo'] = {'info': 'Extracción estática (HTTP), no hay JSON crudo.'}
+        resultado['modo_extraccion'] = MODO_ESTATICO
+        return resultado
+
+    def _con_navegador(self, driver, norma: Dict) -> List[Dict]:
+        if driver is None and self.obtener_driver is not None:
+            driver = self.obtener_driver()
+        if driver is None:
+            resultado = norma.copy()
+            resultado['texto_limpio'] = "Error al procesar: la página requiere navegador y no hay driver disponible."
+            return [resultado]
+        resultados = self.respaldo.run(driver, [norma])
+        self.paginas_navegador += 1
+        for resultado in resultados:
+            resultado['modo_extraccion'] = MODO_NAVEGADOR
+        return resultados
+
+    def run(self, driver, normas: List[Dict]) -> List[Dict]:
+        resultados = []
+        for norma in normas:
+            url = norma.get("url_publica")
+            if not url:
+                continue
+            host = host_de(url)
+            if self.decisiones.modo(host) == MODO_NAVEGADOR:
+                self.decisiones.registrar(host, None)
+                resultados.extend(self._con_navegador(driver, norma))
+                continue
+
+            print(f"--- Usando estrategia '{self.name}' para: {url} ---")
+            try:
+                resultado = self._intentar_estatico(norma, url)
+            except Exception as e:
+                # Error de red: no dice nada sobre si el sitio necesita JS, no se registra decisión
+                print(f"[WARN] Descarga estática falló para {url}: {e}; se usará el navegador.")
+                resultados.extend(self._con_navegador(driver, norma))
+                continue
+            self.decisiones.registrar(host, resultado is not None)
+            REGISTRO.contador("extracciones_total", "Páginas por vía de extracción",
+                              modo=MODO_ESTATICO if resultado is not None else "escalado").inc()
+            if resultado is not None:
+                resultados.append(resultado)
+            else:
+                resultados.extend(self._con_navegador(driver, norma))
+        return resultados
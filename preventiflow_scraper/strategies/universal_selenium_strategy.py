@@ -1,24 +1,41 @@
 from .base_strategy import BaseStrategy
 from typing import List, Dict, Optional
 from selenium import webdriver
-from bs4 import BeautifulSoup
-import time
-
-def limpiar_texto_universal(texto: str) -> str:
-    lineas = (line.strip() for line in texto.splitlines())
-    return '\n'.join(line for line in lineas if line)
+from metricas import REGISTRO
+from normalizacion import PlantillasDominio, QUITAR_PLANTILLAS
+from .extraccion_html import extraer_texto_html
+from .page_readiness import (
+    RECURSOS_BLOQUEADOS, TIMEOUT_LISTA_SEGUNDOS,
+    bloquear_recursos, instalar_monitor_red, esperar_pagina_lista,
+)
 
 class UniversalSeleniumStrategy(BaseStrategy):
     """
     Estrategia todoterreno: usa Selenium para obtener el HTML renderizado
-    y BeautifulSoup para una limpieza básica del contenido.
+    y BeautifulSoup para una limpieza básica del contenido. Con `plantillas` se quitan además las
+    líneas que el dominio repite en todas sus páginas (ver normalizacion.PlantillasDominio).
     """
+    def __init__(self, recursos_bloqueados: Optional[List[str]] = None, timeout_pagina: float = TIMEOUT_LISTA_SEGUNDOS,
+                 plantillas: Optional[PlantillasDominio] = None):
+        self.recursos_bloqueados = RECURSOS_BLOQUEADOS if recursos_bloqueados is None else recursos_bloqueados
+        self.timeout_pagina = timeout_pagina
+        self.plantillas = plantillas if plantillas is not None else (PlantillasDominio() if QUITAR_PLANTILLAS else None)
+
+    def _preparar_driver(self, driver):
+        """Aplica una sola vez por driver el bloqueo de recursos y el monitor de red."""
+        if getattr(driver, "_preparado_universal", False):
+            return
+        bloquear_recursos(driver, self.recursos_bloqueados)
+        instalar_monitor_red(driver)
+        driver._preparado_universal = True
+
     @property
     def name(self) -> str:
         return "Universal (Selenium Básico)"
 
     def run(self, driver: webdriver.Chrome, normas: List[Dict]) -> List[Dict]:
         resultados = []
+        self._preparar_driver(driver)
         for norma in normas:
             url = norma.get("url_publica")
             if not url:
@@ -28,18 +45,17 @@ class UniversalSeleniumStrategy(BaseStrategy):
             resultado_actual = norma.copy() # Copiamos los metadatos de entrada
 
             try:
-                driver.get(url)
-                # Damos un par de segundos para que el JavaScript inicial cargue
-                time.sleep(3)
-                
-                sopa = BeautifulSoup(driver.page_source, 'html.parser')
-                
-                # Elimina etiquetas de script, estilo, nav, header y footer
-                elementos_a_eliminar = sopa.select('script, style, nav, header, footer, aside, .menu, .sidebar, .footer')
-                for elemento in elementos_a_eliminar:
-                    elemento.decompose()
+                with REGISTRO.etapa("descarga", fuente="navegador") as etapa:
+                    driver.get(url)
+                    # Esperamos solo lo necesario: DOM estable o red inactiva (con techo de timeout_pagina)
+                    esperar_pagina_lista(driver, timeout=self.timeout_pagina)
+                    html = driver.page_source
+                    etapa.bytes = len(html)
 
-                texto_extraido = limpiar_texto_universal(sopa.body.get_text() if sopa.body else "")
+                with REGISTRO.etapa("limpieza", fuente="navegador"):
+                    texto_extraido = extraer_texto_html(html)
+                    if self.plantillas:
+                        texto_extraido = self.plantillas.limpiar(url, texto_extraido)
                 
                 if texto_extraido:
                     print(f"INFO: Texto extraído exitosamente de {url}.")
@@ -2,65 +2,110 @@ import os
 import sys
 import time
 import uuid
-import json
-import datetime
 from typing import List, Dict, Any, Optional
 
 import requests
-import json
-import sys
-import os
-import datetime
+
+try:
+    import ijson
+except ImportError:  # el modo streaming es opcional
+    ijson = None
+
+# Módulos compartidos con preventiflow_scraper (reintentos con backoff y circuit breaker, sumidero
+# de resultados, normalización). Este script es un punto de entrada: agrega la ruta una sola vez.
+RUTA_PREVENTIFLOW = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "preventiflow_scraper")
+if RUTA_PREVENTIFLOW not in sys.path:
+    sys.path.insert(0, RUTA_PREVENTIFLOW)
+from resiliencia import solicitar_con_reintentos
+from result_sink import SumideroResultados
+from normalizacion import normalizar_texto
+
+RESULTADOS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+VIGENCIA_CLAVES = ["esVigente", "estadoNorma", "vigencia"]
+
+
+def _decidir_vigencia(data):
+    """
+    Validación flexible y robusta de vigencia.
+    Retorna (vigente, clave_encontrada, valor_vigencia); vigente puede ser True, False o None (no verificable).
+    """
+    valor_vigencia = None
+    clave_encontrada = None
+    vigente = None
+    # 1. Buscar en el nivel raíz
+    for k in VIGENCIA_CLAVES:
+        if k in data:
+            valor_vigencia = data[k]
+            clave_encontrada = k
+            break
+    # 2. Si no está en la raíz, buscar en el primer nivel de hijos
+    if valor_vigencia is None:
+        for v in data.values():
+            if isinstance(v, dict):
+                for k in VIGENCIA_CLAVES:
+                    if k in v:
+                        valor_vigencia = v[k]
+                        clave_encontrada = k
+                        break
+            if valor_vigencia is not None:
+                break
+    # 3. Lógica robusta de validación
+    if clave_encontrada == "vigencia" and isinstance(valor_vigencia, dict):
+        fin_vigencia = valor_vigencia.get("fin_vigencia", None)
+        if fin_vigencia in (None, "", "0000-00-00"):
+            vigente = True
+        else:
+            vigente = False
+    elif clave_encontrada == "esVigente":
+        vigente = bool(valor_vigencia)
+    elif clave_encontrada == "estadoNorma" and isinstance(valor_vigencia, str):
+        if "VIGENTE" in valor_vigencia.upper():
+            vigente = True
+        elif "NO VIGENTE" in valor_vigencia.upper():
+            vigente = False
+    return vigente, clave_encontrada, valor_vigencia
+
+
+def _leer_json_streaming(resp):
+    """
+    Construye el JSON a medida que llega el cuerpo, sin guardar los bytes crudos ni el texto decodificado.
+    Si `esVigente` aparece en la raíz con un valor falso, la decisión ya es definitiva (es la clave
+    de mayor prioridad del paso 1): se corta la descarga y se retorna (objeto_parcial, decision).
+    En cualquier otro caso retorna (objeto_completo, None).
+    """
+    resp.raw.decode_content = True
+    constructor = ijson.ObjectBuilder()
+    for prefijo, evento, valor in ijson.parse(resp.raw, use_float=True):
+        constructor.event(evento, valor)
+        if prefijo == "esVigente" and evento in ("boolean", "number", "string") and not valor:
+            return constructor.value, (False, "esVigente", valor)
+    return constructor.value, None
+
 
 # --- FUNCIÓN PRINCIPAL DE EXTRACCIÓN ---
 # --- FUNCIÓN PRINCIPAL DE EXTRACCIÓN CON CONTROL DE VIGENCIA CORREGIDO ---
-def extraer_json_de_api(url):
+def extraer_json_de_api(url, streaming=True):
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
     }
+    streaming = streaming and ijson is not None
     try:
-        resp = requests.get(url, headers=headers, timeout=30)
-        if resp.status_code != 200:
-            print(f"[ERROR] Código de estado inesperado: {resp.status_code}")
-            return None
-        data = resp.json()
-        # --- Validación flexible y robusta de vigencia ---
-        vigencia_claves = ["esVigente", "estadoNorma", "vigencia"]
-        valor_vigencia = None
-        clave_encontrada = None
-        id_norma = data.get("idNorma") or data.get("IdNorma") or "(sin id)"
-        vigente = None
-        # 1. Buscar en el nivel raíz
-        for k in vigencia_claves:
-            if k in data:
-                valor_vigencia = data[k]
-                clave_encontrada = k
-                break
-        # 2. Si no está en la raíz, buscar en el primer nivel de hijos
-        if valor_vigencia is None:
-            for v in data.values():
-                if isinstance(v, dict):
-                    for k in vigencia_claves:
-                        if k in v:
-                            valor_vigencia = v[k]
-                            clave_encontrada = k
-                            break
-                if valor_vigencia is not None:
-                    break
-        # 3. Lógica robusta de validación
-        if clave_encontrada == "vigencia" and isinstance(valor_vigencia, dict):
-            fin_vigencia = valor_vigencia.get("fin_vigencia", None)
-            if fin_vigencia in (None, "", "0000-00-00"):
-                vigente = True
+        resp = solicitar_con_reintentos(requests.get, url, headers=headers, timeout=30, stream=streaming)
+        try:
+            if resp.status_code != 200:
+                print(f"[ERROR] Código de estado inesperado: {resp.status_code}")
+                return None
+            decision = None
+            if streaming:
+                data, decision = _leer_json_streaming(resp)
             else:
-                vigente = False
-        elif clave_encontrada == "esVigente":
-            vigente = bool(valor_vigencia)
-        elif clave_encontrada == "estadoNorma" and isinstance(valor_vigencia, str):
-            if "VIGENTE" in valor_vigencia.upper():
-                vigente = True
-            elif "NO VIGENTE" in valor_vigencia.upper():
-                vigente = False
+                data = resp.json()
+        finally:
+            # En modo streaming cierra la conexión aunque queden bytes sin leer (aborta la descarga)
+            resp.close()
+        vigente, clave_encontrada, valor_vigencia = decision or _decidir_vigencia(data)
+        id_norma = data.get("idNorma") or data.get("IdNorma") or "(sin id)"
         # 4. Decisión
         if vigente is True:
             return data
@@ -76,14 +121,12 @@ def extraer_json_de_api(url):
 
 # --- GUARDADO DE RESULTADOS ---
 def save_result(data, url):
-    now = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    basename = f"leychileapi_{now}.json"
-    outdir = os.path.join(os.path.dirname(__file__), "results")
-    os.makedirs(outdir, exist_ok=True)
-    path = os.path.join(outdir, basename)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump({"url": url, "data": data}, f, ensure_ascii=False, indent=2)
-    print(f"[INFO] Resultado guardado en: {path}")
+    sumidero = SumideroResultados(RESULTADOS_DIR, prefijo="leychileapi")
+    try:
+        sumidero.escribir([{"url": url, "data": data}], estrategia="leychileapi")
+        print(f"[INFO] Resultado guardado en: {sumidero.segmento}")
+    finally:
+        sumidero.cerrar()
 
 # --- MAIN ---
 if __name__ == "__main__":
@@ -133,18 +176,13 @@ def save_result(strategy: str, urls: List[str], data: List[Dict[str, Any]]):
     except Exception as e:
         print(f"[SUPABASE] Error al guardar en Supabase: {e}")
 
-    # Guardar archivo local
-    now = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"results/{strategy}_{now}.json"
-    os.makedirs("results", exist_ok=True)
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    print(f"[LOCAL] Resultado exportado: {filename}")
-
-def limpiar_texto(texto: str) -> str:
-    """Función simple para limpiar texto de espacios extra."""
-    lineas = (line.strip() for line in texto.splitlines())
-    return '\n'.join(line for line in lineas if line)
+    # Guardar archivo local (segmento JSONL comprimido, ver preventiflow_scraper/result_sink.py)
+    sumidero = SumideroResultados(RESULTADOS_DIR, prefijo=strategy)
+    try:
+        sumidero.escribir(data, estrategia=strategy)
+        print(f"[LOCAL] Resultado exportado: {sumidero.segmento}")
+    finally:
+        sumidero.cerrar()
 
 # --- ESTRATEGIAS DE SCRAPING ---
 
@@ -189,7 +227,7 @@ def leychile_scraper(driver: webdriver.Chrome, url: str) -> dict:
 
         # Extraer el texto limpio
         texto = contenedor.get_attribute("innerText")
-        texto_limpio = limpiar_texto(texto)
+        texto_limpio = normalizar_texto(texto)
         print("DEBUG: Extracción exitosa.")
         return {"url": url, "status": "ok", "content": texto_limpio}
     except Exception as e:
@@ -0,0 +1,28 @@
+-- Migration: near-duplicate marker for bibliotecalegal (preventiflow_scraper/duplicados.py)
+-- Una misma ley llega por varias URLs (página pública, API, espejos). Al guardar, el scraper
+-- marca la copia con duplicado_de = nombre_norma de la norma original (similitud MinHash >= 0.9)
+-- y lazaro_vector/vectorize_database.py no la vectoriza.
+-- Sin foreign key: original y copia pueden llegar en el mismo upsert, en cualquier orden.
+-- Safe to run multiple times
+alter table public.bibliotecalegal add column if not exists duplicado_de text;
+
+create index if not exists idx_bibliotecalegal_duplicado_de
+  on public.bibliotecalegal(duplicado_de) where duplicado_de is not null;
+
+-- Una norma que pasa a ser duplicado deja de aparecer en match_fragmentos
+create or replace function public.limpiar_fragmentos_duplicado()
+returns trigger
+language plpgsql
+as $$
+begin
+  delete from public.bibliotecalegal_fragmentos where norma_id = new.id;
+  return new;
+end;
+$$;
+
+drop trigger if exists trg_bibliotecalegal_duplicado_de on public.bibliotecalegal;
+create trigger trg_bibliotecalegal_duplicado_de
+  after update of duplicado_de on public.bibliotecalegal
+  for each row
+  when (new.duplicado_de is not null and old.duplicado_de is distinct from new.duplicado_de)
+  execute function public.limpiar_fragmentos_duplicado();
@@ -0,0 +1,13 @@
+-- Migration: content hash for change detection in bibliotecalegal
+-- El scraper compara hash_contenido antes de escribir: si no cambió, no hay UPDATE;
+-- si cambió, reescribe la fila y deja embedding en NULL para que vectorize_database.py
+-- solo vuelva a vectorizar las normas modificadas.
+-- Las filas existentes quedan con hash_contenido NULL: la primera vez que el scraper las ve
+-- (database_manager._completar_hashes_legado) calcula el hash desde su contenido guardado; si no
+-- cambió solo escribe el hash, y el embedding se conserva salvo que cambie texto_limpio.
+-- (El hash no se puede calcular en SQL: usa el JSON canónico de Python, no jsonb::text.)
+-- Safe to run multiple times
+alter table public.bibliotecalegal add column if not exists hash_contenido text;
+alter table public.bibliotecalegal add column if not exists contenido_actualizado_en timestamptz;
+
+create index if not exists idx_bibliotecalegal_nombre_norma on public.bibliotecalegal(nombre_norma);
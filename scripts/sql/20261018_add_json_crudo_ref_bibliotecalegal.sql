@@ -0,0 +1,12 @@
+-- Migration: raw payload reference for bibliotecalegal (preventiflow_scraper/almacen_crudos.py)
+-- El JSON crudo de cada norma se guarda una sola vez, comprimido, en el almacén local del
+-- scraper (direccionado por el sha256 del JSON canónico) y la fila lleva solo
+-- json_crudo_ref = 'sha256:<hex>'. json_crudo queda en NULL en las filas nuevas o actualizadas;
+-- las existentes se vacían con: python almacen_crudos.py --migrar
+-- hash_contenido se sigue calculando sobre el payload completo, así que no cambia.
+-- Safe to run multiple times
+alter table public.bibliotecalegal add column if not exists json_crudo_ref text;
+alter table public.bibliotecalegal alter column json_crudo drop not null;
+
+create index if not exists idx_bibliotecalegal_json_crudo_ref
+  on public.bibliotecalegal(json_crudo_ref) where json_crudo_ref is not null;
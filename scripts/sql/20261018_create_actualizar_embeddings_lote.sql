@@ -0,0 +1,19 @@
+-- Bulk write-back of embeddings for lazaro_vector/embedding_pipeline.py
+-- Recibe un arreglo JSON [{"id": "<uuid>", "embedding": [..768 floats..]}, ...]
+-- y actualiza todas las filas en una sola sentencia. Retorna la cantidad de filas actualizadas.
+-- Safe to run multiple times
+create or replace function public.actualizar_embeddings_lote(filas jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+  actualizadas integer;
+begin
+  update public.bibliotecalegal b
+     set embedding = (f->>'embedding')::vector
+    from jsonb_array_elements(filas) as f
+   where b.id = (f->>'id')::uuid;
+  get diagnostics actualizadas = row_count;
+  return actualizadas;
+end;
+$$;
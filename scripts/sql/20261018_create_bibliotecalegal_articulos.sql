@@ -0,0 +1,140 @@
+-- Article-level storage for LeyChile normas (preventiflow_scraper/articulos.py)
+-- Un registro por artículo (id estable como 'art-12-bis' o 'art-t-1', encabezado, texto y hash).
+-- database_manager.guardar_lote compara la versión nueva con la guardada y envía solo lo
+-- agregado, modificado, eliminado o reubicado: una modificación de la ley reescribe y
+-- re-vectoriza solo los artículos tocados (embedding en NULL hasta que
+-- lazaro_vector/vectorize_database.py con VECTORIZAR_ARTICULOS=1 los procese). La fila de la
+-- norma en bibliotecalegal se sigue reescribiendo completa y su embedding queda en NULL.
+-- Safe to run multiple times
+create extension if not exists vector;
+
+-- Huella de la estructura completa (articulos.huella_articulos): si no cambió no se consulta nada más
+alter table public.bibliotecalegal add column if not exists hash_articulos text;
+
+create table if not exists public.bibliotecalegal_articulos (
+  id bigserial primary key,
+  norma_id uuid not null references public.bibliotecalegal(id) on delete cascade,
+  articulo text not null,
+  orden integer not null,
+  encabezado text,
+  texto text not null,
+  hash_texto text not null,
+  embedding vector(768),
+  actualizado_en timestamptz not null default now(),
+  unique (norma_id, articulo)
+);
+
+create index if not exists idx_bibliotecalegal_articulos_pendientes
+  on public.bibliotecalegal_articulos(id) where embedding is null;
+create index if not exists idx_bibliotecalegal_articulos_embedding
+  on public.bibliotecalegal_articulos using hnsw (embedding vector_cosine_ops);
+
+-- Aplica en bloque las diferencias de varias normas. Recibe
+-- [{"nombre_norma", "hash_articulos",
+--   "upserts": [{"articulo", "orden", "encabezado", "texto", "hash_texto"}, ...],
+--   "eliminados": ["art-3", ...],
+--   "reubicados": [{"articulo", "id_anterior", "orden", "encabezado", "texto"}, ...]}, ...]
+-- Un reubicado conserva su embedding; "texto" solo viene si fue renumerado (cambia la etiqueta
+-- "Artículo N"). Al intercalar o derogar un artículo los renumerados forman una cadena
+-- (art-4 -> art-5, art-5 -> art-6...): primero se apartan con un prefijo '~~' que ningún id usa y
+-- después se les asigna el id nuevo, para no chocar con la restricción única.
+-- Retorna la cantidad de artículos escritos o borrados.
+create or replace function public.aplicar_diferencias_articulos(filas jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+  f jsonb;
+  nid uuid;
+  n integer;
+  cambios integer := 0;
+begin
+  for f in select * from jsonb_array_elements(filas) loop
+    select id into nid from public.bibliotecalegal where nombre_norma = f->>'nombre_norma';
+    if nid is null then
+      continue;
+    end if;
+
+    delete from public.bibliotecalegal_articulos a
+     where a.norma_id = nid
+       and a.articulo in (select jsonb_array_elements_text(coalesce(f->'eliminados', '[]'::jsonb)));
+    get diagnostics n = row_count;
+    cambios := cambios + n;
+
+    update public.bibliotecalegal_articulos a
+       set articulo = '~~' || (r->>'articulo'),
+           orden = (r->>'orden')::integer,
+           encabezado = r->>'encabezado',
+           texto = coalesce(r->>'texto', a.texto)
+      from jsonb_array_elements(coalesce(f->'reubicados', '[]'::jsonb)) as r
+     where a.norma_id = nid and a.articulo = r->>'id_anterior';
+    update public.bibliotecalegal_articulos a
+       set articulo = substr(a.articulo, 3)
+     where a.norma_id = nid and a.articulo like '~~%';
+
+    insert into public.bibliotecalegal_articulos (norma_id, articulo, orden, encabezado, texto, hash_texto)
+    select nid, u->>'articulo', (u->>'orden')::integer, u->>'encabezado', u->>'texto', u->>'hash_texto'
+      from jsonb_array_elements(coalesce(f->'upserts', '[]'::jsonb)) as u
+    on conflict (norma_id, articulo) do update
+       set orden = excluded.orden,
+           encabezado = excluded.encabezado,
+           texto = excluded.texto,
+           hash_texto = excluded.hash_texto,
+           embedding = null,
+           actualizado_en = now();
+    get diagnostics n = row_count;
+    cambios := cambios + n;
+
+    update public.bibliotecalegal set hash_articulos = f->>'hash_articulos' where id = nid;
+  end loop;
+  return cambios;
+end;
+$$;
+
+-- Escritura en bloque de los embeddings por artículo: [{"id": <bigint>, "embedding": [..768..]}, ...]
+create or replace function public.actualizar_embeddings_articulos_lote(filas jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+  actualizadas integer;
+begin
+  update public.bibliotecalegal_articulos a
+     set embedding = (f->>'embedding')::vector
+    from jsonb_array_elements(filas) as f
+   where a.id = (f->>'id')::bigint;
+  get diagnostics actualizadas = row_count;
+  return actualizadas;
+end;
+$$;
+
+-- Búsqueda top-k de artículos por similitud coseno
+create or replace function public.match_articulos(
+  query_embedding vector(768),
+  match_threshold float,
+  match_count int
+)
+returns table (
+  id bigint,
+  norma_id uuid,
+  nombre_norma text,
+  articulo text,
+  encabezado text,
+  texto text,
+  similarity float
+)
+language sql stable
+as $$
+  select a.id,
+         a.norma_id,
+         b.nombre_norma,
+         a.articulo,
+         a.encabezado,
+         a.texto,
+         1 - (a.embedding <=> query_embedding) as similarity
+    from public.bibliotecalegal_articulos a
+    join public.bibliotecalegal b on b.id = a.norma_id
+   where 1 - (a.embedding <=> query_embedding) > match_threshold
+   order by a.embedding <=> query_embedding
+   limit match_count;
+$$;
@@ -0,0 +1,84 @@
+-- Chunk-level embeddings for bibliotecalegal (lazaro_vector/chunking.py + embedding_pipeline.py)
+-- Un vector por fragmento (cortado por artículos, con solapamiento) en lugar de un único vector
+-- promediado por norma, para que la búsqueda devuelva pasajes y no leyes completas.
+-- Safe to run multiple times
+create extension if not exists vector;
+
+create table if not exists public.bibliotecalegal_fragmentos (
+  id bigserial primary key,
+  norma_id uuid not null references public.bibliotecalegal(id) on delete cascade,
+  orden integer not null,
+  encabezado text,
+  texto text not null,
+  hash_texto text not null,
+  embedding vector(768),
+  creado_en timestamptz not null default now(),
+  unique (norma_id, orden)
+);
+
+create index if not exists idx_bibliotecalegal_fragmentos_embedding
+  on public.bibliotecalegal_fragmentos using hnsw (embedding vector_cosine_ops);
+
+-- Reemplaza en bloque los fragmentos de varias normas y marca la norma como vectorizada.
+-- Recibe [{"id": "<uuid>", "embedding": [..768..], "fragmentos": [{"orden", "encabezado",
+-- "texto", "hash_texto", "embedding"}, ...]}, ...]. El embedding de la norma (promedio) se
+-- mantiene para match_normativas y como marca de "ya vectorizada".
+create or replace function public.guardar_fragmentos_lote(filas jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+  insertados integer;
+begin
+  delete from public.bibliotecalegal_fragmentos fr
+   using jsonb_array_elements(filas) as f
+   where fr.norma_id = (f->>'id')::uuid;
+
+  insert into public.bibliotecalegal_fragmentos (norma_id, orden, encabezado, texto, hash_texto, embedding)
+  select (f->>'id')::uuid,
+         (fr->>'orden')::integer,
+         fr->>'encabezado',
+         fr->>'texto',
+         fr->>'hash_texto',
+         (fr->>'embedding')::vector
+    from jsonb_array_elements(filas) as f,
+         jsonb_array_elements(f->'fragmentos') as fr;
+  get diagnostics insertados = row_count;
+
+  update public.bibliotecalegal b
+     set embedding = (f->>'embedding')::vector
+    from jsonb_array_elements(filas) as f
+   where b.id = (f->>'id')::uuid;
+
+  return insertados;
+end;
+$$;
+
+-- Búsqueda top-k de pasajes por similitud coseno
+create or replace function public.match_fragmentos(
+  query_embedding vector(768),
+  match_threshold float,
+  match_count int
+)
+returns table (
+  id bigint,
+  norma_id uuid,
+  nombre_norma text,
+  encabezado text,
+  texto text,
+  similarity float
+)
+language sql stable
+as $$
+  select fr.id,
+         fr.norma_id,
+         b.nombre_norma,
+         fr.encabezado,
+         fr.texto,
+         1 - (fr.embedding <=> query_embedding) as similarity
+    from public.bibliotecalegal_fragmentos fr
+    join public.bibliotecalegal b on b.id = fr.norma_id
+   where 1 - (fr.embedding <=> query_embedding) > match_threshold
+   order by fr.embedding <=> query_embedding
+   limit match_count;
+$$;
@@ -0,0 +1,6 @@
+-- Migration: unique conflict target for bulk upserts into bibliotecalegal
+-- database_manager.guardar_lote escribe con upsert(on_conflict='nombre_norma'), lo que
+-- requiere un índice único. Si hay duplicados previos, depurarlos antes de aplicar:
+--   select nombre_norma, count(*) from public.bibliotecalegal group by 1 having count(*) > 1;
+drop index if exists public.idx_bibliotecalegal_nombre_norma;
+create unique index if not exists uq_bibliotecalegal_nombre_norma on public.bibliotecalegal(nombre_norma);
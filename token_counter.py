@@ -1,9 +1,153 @@
+"""
+Conteo de tokens (tiktoken) para presupuestar costos de embeddings y LLM a escala de corpus.
+
+- `obtener_codificador`: codificador cacheado por modelo (cargar el BPE cuesta ~100 ms).
+- `contar_tokens_lote`: cuenta muchos textos en procesos trabajadores, cada uno con su propio
+  codificador cargado una sola vez.
+- `dividir_por_tokens`: corta un texto en ventanas de a lo sumo N tokens (con solapamiento),
+  devolviendo subcadenas exactas del original.
+- `reporte_tokens`: recorre bibliotecalegal.texto_limpio por cursor y escribe un CSV por norma
+  (caracteres, tokens, fragmentos necesarios para un presupuesto dado) antes de llamar a una API.
+
+Uso:
+    python token_counter.py                      # ejemplo de pregunta/respuesta
+    python token_counter.py --reporte reporte_tokens.csv [--max-tokens 2048] [--workers 4]
+"""
+import os
+import csv
+import argparse
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
 import tiktoken
 
+# Usa el modelo de codificación de OpenAI que más se aproxime a GPT-4o/GPT-5
+MODELO_POR_DEFECTO = "gpt-4o"
+CODIFICACION_RESPALDO = "o200k_base"
+WORKERS = int(os.getenv("TOKENS_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+TAMANO_PAGINA = int(os.getenv("TOKENS_TAMANO_PAGINA", "200"))
+# Por debajo de esta cantidad de textos no compensa arrancar procesos
+MINIMO_PARA_PROCESOS = 64
+
+
+@lru_cache(maxsize=None)
+def obtener_codificador(modelo: str = MODELO_POR_DEFECTO) -> tiktoken.Encoding:
+    try:
+        return tiktoken.encoding_for_model(modelo)
+    except KeyError:
+        return tiktoken.get_encoding(CODIFICACION_RESPALDO)
+
+
+def contar_tokens(texto: Optional[str], modelo: str = MODELO_POR_DEFECTO) -> int:
+    if not texto:
+        return 0
+    # encode_ordinary: no falla si el texto contiene algo como "<|endoftext|>"
+    return len(obtener_codificador(modelo).encode_ordinary(texto))
+
+
+def _contar_bloque(textos: List[Optional[str]], modelo: str) -> List[int]:
+    return [contar_tokens(t, modelo) for t in textos]
+
+
+def contar_tokens_lote(textos: List[Optional[str]], modelo: str = MODELO_POR_DEFECTO, workers: int = WORKERS,
+                       ejecutor: Optional[ProcessPoolExecutor] = None) -> List[int]:
+    """Cuenta tokens de `textos` (en el mismo orden) repartiendo bloques entre procesos."""
+    if ejecutor is None and (workers <= 1 or len(textos) < MINIMO_PARA_PROCESOS):
+        return _contar_bloque(textos, modelo)
+    propio = ejecutor is None
+    ejecutor = ejecutor or ProcessPoolExecutor(max_workers=workers)
+    try:
+        partes = max(1, workers * 4)
+        tamano = max(1, -(-len(textos) // partes))
+        bloques = [textos[i:i + tamano] for i in range(0, len(textos), tamano)]
+        conteos: List[int] = []
+        for resultado in ejecutor.map(_contar_bloque, bloques, [modelo] * len(bloques)):
+            conteos.extend(resultado)
+        return conteos
+    finally:
+        if propio:
+            ejecutor.shutdown()
+
+
+def dividir_por_tokens(texto: str, max_tokens: int = 2048, solapamiento: int = 0,
+                       modelo: str = MODELO_POR_DEFECTO) -> List[str]:
+    """Ventanas de a lo sumo `max_tokens` tokens; cada una repite los últimos `solapamiento` de la anterior."""
+    if not texto:
+        return []
+    if solapamiento >= max_tokens:
+        raise ValueError("El solapamiento debe ser menor que max_tokens")
+    codificador = obtener_codificador(modelo)
+    tokens = codificador.encode_ordinary(texto)
+    if len(tokens) <= max_tokens:
+        return [texto]
+    # Posición en caracteres de cada token, para cortar el texto original sin re-decodificar
+    decodificado, inicios = codificador.decode_with_offsets(tokens)
+    if decodificado != texto:
+        # No debería ocurrir (el BPE es reversible); se cae a decodificar cada ventana
+        return [codificador.decode(tokens[i:i + max_tokens])
+                for i in range(0, len(tokens), max_tokens - solapamiento)]
+    inicios.append(len(texto))
+    fragmentos = []
+    paso = max_tokens - solapamiento
+    for i in range(0, len(tokens), paso):
+        fin = min(i + max_tokens, len(tokens))
+        fragmentos.append(texto[inicios[i]:inicios[fin]])
+        if fin == len(tokens):
+            break
+    return fragmentos
+
+
+def leer_textos(supabase, tamano_pagina: int = TAMANO_PAGINA) -> Iterator[List[Dict]]:
+    """Páginas de bibliotecalegal (id, nombre_norma, texto_limpio) ordenadas por id, con cursor."""
+    ultimo_id = None
+    while True:
+        consulta = supabase.table("bibliotecalegal").select("id, nombre_norma, texto_limpio")
+        if ultimo_id is not None:
+            consulta = consulta.gt("id", ultimo_id)
+        response = consulta.order("id").limit(tamano_pagina).execute()
+        filas = response.data if hasattr(response, 'data') else response["data"]
+        if not filas:
+            return
+        yield filas
+        ultimo_id = filas[-1]["id"]
+        if len(filas) < tamano_pagina:
+            return
+
+
+def reporte_tokens(supabase, ruta_csv: str, modelo: str = MODELO_POR_DEFECTO, max_tokens: int = 2048,
+                   workers: int = WORKERS, tamano_pagina: int = TAMANO_PAGINA) -> Dict[str, int]:
+    """Escribe un CSV con los tokens de cada norma y retorna los totales del corpus."""
+    totales = {"normas": 0, "normas_sin_texto": 0, "caracteres": 0, "tokens": 0, "fragmentos": 0, "max_tokens_norma": 0}
+    ejecutor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        with open(ruta_csv, "w", newline="", encoding="utf-8") as f:
+            escritor = csv.writer(f)
+            escritor.writerow(["id", "nombre_norma", "caracteres", "tokens", "fragmentos"])
+            for filas in leer_textos(supabase, tamano_pagina):
+                textos = [fila.get("texto_limpio") if isinstance(fila.get("texto_limpio"), str) else None
+                          for fila in filas]
+                conteos = contar_tokens_lote(textos, modelo, workers, ejecutor)
+                for fila, texto, tokens in zip(filas, textos, conteos):
+                    fragmentos = -(-tokens // max_tokens)
+                    escritor.writerow([fila["id"], fila.get("nombre_norma"), len(texto or ""), tokens, fragmentos])
+                    totales["normas"] += 1
+                    totales["normas_sin_texto"] += 0 if texto else 1
+                    totales["caracteres"] += len(texto or "")
+                    totales["tokens"] += tokens
+                    totales["fragmentos"] += fragmentos
+                    totales["max_tokens_norma"] = max(totales["max_tokens_norma"], tokens)
+                print(f"[TOKENS] {totales['normas']} normas - {totales['tokens']} tokens")
+    finally:
+        if ejecutor is not None:
+            ejecutor.shutdown()
+    return totales
+
+
 # Ejemplo de pregunta y respuesta (puedes reemplazar por cualquier texto)
-pregunta = "El Decreto Supremo N° 44 (MINTRA, 2023) deroga los decretos N° 40 y N° 54 de 1969, que regulaban la prevención de riesgos y los comités paritarios, respectivamente, y establece un nuevo reglamento. Sin embargo, este decreto no detalla un plan de acción para la constitución de un departamento de prevención.\n\nPor lo tanto, te proporcionaré un plan de acción basado en mi conocimiento general de buenas prácticas y la normativa general chilena, no específicamente del DS N° 44, ya que este no lo detalla:"
+PREGUNTA_EJEMPLO = "El Decreto Supremo N° 44 (MINTRA, 2023) deroga los decretos N° 40 y N° 54 de 1969, que regulaban la prevención de riesgos y los comités paritarios, respectivamente, y establece un nuevo reglamento. Sin embargo, este decreto no detalla un plan de acción para la constitución de un departamento de prevención.\n\nPor lo tanto, te proporcionaré un plan de acción basado en mi conocimiento general de buenas prácticas y la normativa general chilena, no específicamente del DS N° 44, ya que este no lo detalla:"
 
-respuesta = """
+RESPUESTA_EJEMPLO = """
 **Plan de Acción para la Fundación del Departamento de Prevención de Riesgos en una Constructora:**
 
 **Fase 1: Diagnóstico y Planificación:**
@@ -38,13 +182,33 @@ respuesta = """
 **Recuerda:** Esta información proviene de mi entrenamiento general y no del DS N° 44 específicamente. Es fundamental consultar la normativa vigente y las guías de la autoridad competente para asegurar el cumplimiento legal.
 """
 
-# Usa el modelo de codificación de OpenAI que más se aproxime a GPT-4o/GPT-5
-encoding = tiktoken.encoding_for_model("gpt-4o")
 
-pregunta_tokens = len(encoding.encode(pregunta))
-respuesta_tokens = len(encoding.encode(respuesta))
-total_tokens = pregunta_tokens + respuesta_tokens
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reporte", metavar="CSV", help="Reporte de tokens por norma de bibliotecalegal")
+    parser.add_argument("--modelo", default=MODELO_POR_DEFECTO)
+    parser.add_argument("--max-tokens", type=int, default=2048, help="presupuesto de tokens por fragmento")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+
+    if not args.reporte:
+        pregunta_tokens = contar_tokens(PREGUNTA_EJEMPLO, args.modelo)
+        respuesta_tokens = contar_tokens(RESPUESTA_EJEMPLO, args.modelo)
+        total_tokens = pregunta_tokens + respuesta_tokens
+
+        print(f"Tokens pregunta: {pregunta_tokens}")
+        print(f"Tokens respuesta: {respuesta_tokens}")
+        print(f"Tokens totales: {total_tokens}")
+        return
+
+    from dotenv import load_dotenv
+    from supabase import create_client
+    load_dotenv()
+    supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+    totales = reporte_tokens(supabase, args.reporte, args.modelo, args.max_tokens, args.workers)
+    print(f"[FIN] {totales}")
+    print(f"[FIN] Reporte por norma en {args.reporte}")
+
 
-print(f"Tokens pregunta: {pregunta_tokens}")
-print(f"Tokens respuesta: {respuesta_tokens}")
-print(f"Tokens totales: {total_tokens}")
+if __name__ == "__main__":
+    main()